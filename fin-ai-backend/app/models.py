@@ -45,6 +45,14 @@ class UserRegister(UserCreate):
     model_config = ConfigDict(populate_by_name=True)
 
 
+class UserProfileUpdate(BaseModel):
+    """Profile fields a user may change; fields left out are not touched."""
+    name: Optional[str] = None
+    dateOfBirth: Optional[datetime.date] = None
+    occupation: Optional[str] = None
+    currentSalary: Optional[float] = Field(default=None, gt=0)
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -101,6 +109,7 @@ class SuggestedStock(BaseModel):
     name: Optional[str] = None
     price: Optional[float] = None
     beta: Optional[float] = None
+    correlation: Optional[float] = None
 
 
 class RiskProfile(BaseModel):
@@ -108,8 +117,44 @@ class RiskProfile(BaseModel):
     price: Optional[float] = None
     volatility: float
     beta: Optional[float] = None
+    correlation: Optional[float] = None
+    benchmark: Optional[str] = None
     user_salary: float
     risk_score: float
     risk_level: str
     suggestion_message: str
-    suggested_stocks: List[SuggestedStock] = []
\ No newline at end of file
+    suggested_stocks: List[SuggestedStock] = []
+
+class PortfolioHolding(BaseModel):
+    ticker: str
+    shares: Optional[float] = None
+    value: Optional[float] = None
+
+
+class PortfolioRiskRequest(BaseModel):
+    holdings: List[PortfolioHolding]
+    confidence: float = Field(default=0.95, gt=0.5, lt=1.0)
+    horizon_days: int = Field(default=1, ge=1, le=30)
+
+
+class RiskEstimate(BaseModel):
+    var: float
+    cvar: float
+    var_percent: float
+    cvar_percent: float
+
+
+class PortfolioRiskResponse(BaseModel):
+    total_value: float
+    confidence: float
+    horizon_days: int
+    weights: dict
+    historical: RiskEstimate
+    monte_carlo: RiskEstimate
+    observations: int
+    simulated_paths: int
+    missing_tickers: List[str] = []
+
+
+class WatchlistRequest(BaseModel):
+    tickers: List[str]
@@ -1,20 +1,24 @@
 #/Users/jwils/Developer/code/7th sem project Finance AI/financialai/fin-ai-backend/app/routes/auth.py
+import logging
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import JSONResponse
-from app.models import UserLogin, UserRegister, UserOut
+from app.models import UserLogin, UserRegister, UserOut, UserProfileUpdate
 from app.services.mongo_service import (
     register_user as register_user_db, 
     authenticate_user,
+    update_user_profile,
     get_user_by_id_str,
-    get_db_user
+    UserAlreadyExistsError,
 )
+from app.services.password_service import client_ip
 from app.services.auth_service import (
     create_access_token,
     get_current_user,
     create_auth_cookie,
     clear_auth_cookie
 )
-import traceback
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -29,31 +33,28 @@ async def test_endpoint():
 
 
 @router.post("/register")
-async def register_user(user_data: UserRegister): 
+async def register_user(user_data: UserRegister, request: Request):
     """Registers a new user."""
     try:
-        print(f"📝 Registration attempt for: {user_data.email}")
+        logger.debug("Registration attempt for: %s", user_data.email)
         
-        # Check if user already exists
-        existing_user = await get_db_user(user_data.email)
-        if existing_user:
-            print(f"⚠️  User already exists: {user_data.email}")
+        # Register the user (one insert; the unique email index rejects duplicates)
+        try:
+            user = await register_user_db(user_data, client_ip(request))
+        except UserAlreadyExistsError:
             raise HTTPException(
                 status_code=409, 
                 detail="User with this email already exists"
             )
-
-        # Register the user
-        user = await register_user_db(user_data)
         
         if not user:
-            print(f"❌ Failed to create user: {user_data.email}")
+            logger.error("Failed to create user: %s", user_data.email)
             raise HTTPException(
                 status_code=500, 
                 detail="Failed to create user"
             )
         
-        print(f"✅ User registered successfully: {user['email']}")
+        logger.info("User registered successfully: %s", user['email'])
         
         return JSONResponse(
             content={
@@ -66,8 +67,7 @@ async def register_user(user_data: UserRegister):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Registration error: {e}")
-        traceback.print_exc()
+        logger.error("Registration error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Registration failed: {str(e)}"
@@ -75,15 +75,15 @@ async def register_user(user_data: UserRegister):
 
 
 @router.post("/login")
-async def login_for_access_token(form_data: UserLogin):
+async def login_for_access_token(form_data: UserLogin, request: Request):
     """Authenticates user and sets auth cookie."""
     try:
-        print(f"🔐 Login attempt for: {form_data.email}")
+        logger.debug("Login attempt for: %s", form_data.email)
         
-        user = await authenticate_user(form_data.email, form_data.password)
+        user = await authenticate_user(form_data.email, form_data.password, client_ip(request))
         
         if not user:
-            print(f"⚠️  Invalid credentials for: {form_data.email}")
+            logger.warning("Invalid credentials for: %s", form_data.email)
             raise HTTPException(
                 status_code=401,
                 detail="Invalid email or password",
@@ -106,16 +106,14 @@ async def login_for_access_token(form_data: UserLogin):
         cookie_string = create_auth_cookie(access_token)
         response.headers["Set-Cookie"] = cookie_string
         
-        print(f"✅ User logged in: {user['email']}")
-        print(f"🍪 Cookie set: {cookie_string[:50]}...")
+        logger.info("User logged in: %s", user['email'])
         
         return response
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Login error: {e}")
-        traceback.print_exc()
+        logger.error("Login error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Login failed: {str(e)}"
@@ -132,11 +130,11 @@ async def logout_user():
         )
         response.headers["Set-Cookie"] = clear_auth_cookie()
         
-        print("👋 User logged out")
+        logger.info("User logged out")
         
         return response
     except Exception as e:
-        print(f"❌ Logout error: {e}")
+        logger.error("Logout error: %s", e)
         raise HTTPException(
             status_code=500, 
             detail="Logout failed"
@@ -147,25 +145,41 @@ async def logout_user():
 async def read_user_me(request: Request, current_user: dict = Depends(get_current_user)):
     """Returns the currently authenticated user's details."""
     try:
-        user_data = await get_user_by_id_str(str(current_user["_id"]))
-        
-        if not user_data:
-            raise HTTPException(
-                status_code=404, 
-                detail="User not found"
-            )
-        
         return UserOut(
-            id=str(user_data["_id"]),
-            email=user_data["email"],
-            name=user_data.get("name", "")
+            id=str(current_user["_id"]),
+            email=current_user["email"],
+            name=current_user.get("name", "")
         )
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Get user error: {e}")
-        traceback.print_exc()
+        logger.error("Get user error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500, 
             detail="Failed to fetch user data"
-        )
\ No newline at end of file
+        )
+
+
+@router.patch("/user", response_model=UserOut)
+async def update_user_me(update: UserProfileUpdate, current_user: dict = Depends(get_current_user)):
+    """Updates the current user's profile fields (only those sent)."""
+    fields = update.model_dump(exclude_unset=True, exclude_none=True)
+    if not fields:
+        raise HTTPException(status_code=400, detail="No profile fields to update")
+    try:
+        user_id = str(current_user["_id"])
+        if not await update_user_profile(user_id, fields):
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # The caches were just invalidated, so this reads the new document
+        user = await get_user_by_id_str(user_id)
+        logger.info("Profile updated: %s (%s)", user_id, ", ".join(sorted(fields)))
+        return UserOut(id=user_id, email=user["email"], name=user.get("name", ""))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Profile update error: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to update profile"
+        )
@@ -1,15 +1,24 @@
 # fin-ai-backend/app/routes/chatbot.py
+import logging
+import json
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from app.services.chatbot_service import (
     generate_chatbot_response, 
-    get_investment_recommendations
+    get_cached_investment_recommendations,
+    prepare_chat,
+    record_turn,
+    stream_llm,
 )
-from app.services.mongo_service import get_user_by_id_str
+from app.services.answer_cache import answer_cache
+from app.services.llm_gateway import gateway, set_llm_caller
 from app.services.auth_service import get_current_user  # ⭐ Import your existing auth
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -20,6 +29,7 @@ class Message(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None
     conversation_history: Optional[List[Message]] = None
 
 
@@ -39,7 +49,7 @@ async def get_current_user_id(current_user: dict = Depends(get_current_user)):
 @router.post("/query")
 async def chat_query(
     chat_request: ChatRequest,
-    user_id: str = Depends(get_current_user_id)  # ⭐ Use dependency injection
+    user: dict = Depends(get_current_user)  # ⭐ Use dependency injection
 ):
     """
     Handle chatbot queries with personalized responses.
@@ -47,18 +57,16 @@ async def chat_query(
     Endpoint: POST /api/chatbot/query
     Body: {
         "message": "User's question",
-        "conversation_history": [
+        "session_id": "returned by the previous reply; omit to start a new conversation",
+        "conversation_history": [  (only read when there is no session_id)
             {"role": "user", "content": "Previous message"},
             {"role": "assistant", "content": "Previous response"}
         ]
     }
     """
+    user_id = str(user["_id"])
+    set_llm_caller(user_id, "chatbot.query")
     try:
-        # Validate user exists
-        user = await get_user_by_id_str(user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
         # Convert conversation history to dict format if provided
         history = None
         if chat_request.conversation_history:
@@ -67,8 +75,10 @@ async def chat_query(
         # Generate response
         result = await generate_chatbot_response(
             user_id=user_id,
+            user_data=user,
             user_message=chat_request.message,
-            conversation_history=history
+            conversation_history=history,
+            session_id=chat_request.session_id
         )
         
         if result.get("error"):
@@ -76,6 +86,8 @@ async def chat_query(
         
         return {
             "response": result["response"],
+            "session_id": result.get("session_id"),
+            "cached": result.get("cached", False),
             "stock_data": result.get("stock_data"),
             "user_name": result.get("user_name"),
             "timestamp": str(datetime.now())
@@ -84,49 +96,109 @@ async def chat_query(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error in chat_query endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error in chat_query endpoint: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=500, 
+            detail="An error occurred while processing your request"
+        )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/query/stream")
+async def chat_query_stream(
+    chat_request: ChatRequest,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Same as /query, streamed as server-sent events while the model generates.
+    
+    Endpoint: POST /api/chatbot/query/stream
+    Events:
+        meta  {"session_id": ..., "cached": bool, "stock_data": ..., "user_name": ...}   (once, before any text)
+        token {"text": "..."}                         (repeated)
+        done  {"timestamp": "..."}                     or  error {"detail": "..."}
+    """
+    user_id = str(user["_id"])
+    set_llm_caller(user_id, "chatbot.query_stream")
+
+    history = None
+    if chat_request.conversation_history:
+        history = [msg.dict() for msg in chat_request.conversation_history]
+
+    try:
+        plan = await prepare_chat(user, chat_request.message, chat_request.session_id, history)
+    except Exception as e:
+        logger.error("Error in chat_query_stream endpoint: %s", e)
         raise HTTPException(
             status_code=500, 
             detail="An error occurred while processing your request"
         )
 
+    async def events():
+        yield _sse("meta", {
+            "session_id": plan["session_id"],
+            "cached": plan["cached_answer"] is not None,
+            "stock_data": plan["stock_data"],
+            "user_name": user.get("name"),
+        })
+        if plan["cached_answer"] is not None:
+            await record_turn(plan, user_id, chat_request.message, plan["cached_answer"])
+            yield _sse("token", {"text": plan["cached_answer"]})
+            yield _sse("done", {"timestamp": str(datetime.now())})
+            return
+
+        parts = []
+        try:
+            async for text in stream_llm(plan["prompt"]):
+                parts.append(text)
+                yield _sse("token", {"text": text})
+        except Exception as e:
+            logger.error("Error streaming chatbot response: %s", e)
+            yield _sse("error", {"detail": "I apologize, but I encountered an error processing your request. Please try again."})
+            return
+        await record_turn(plan, user_id, chat_request.message, "".join(parts))
+        yield _sse("done", {"timestamp": str(datetime.now())})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.get("/recommendations")
-async def get_recommendations(user_id: str = Depends(get_current_user_id)):
+async def get_recommendations(user: dict = Depends(get_current_user)):
     """
     Get personalized investment recommendations.
+    Served from the per-profile cache; stale entries are refreshed in the background.
     
     Endpoint: GET /api/chatbot/recommendations
     """
+    set_llm_caller(str(user["_id"]), "chatbot.recommendations")
     try:
-        # Validate user exists
-        user = await get_user_by_id_str(user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        # Cached (or freshly generated) recommendations
+        result = await get_cached_investment_recommendations(user)
         
-        # Generate recommendations
-        recommendations = await get_investment_recommendations(user_id)
-        
-        if not recommendations:
+        if not result:
             raise HTTPException(
                 status_code=500, 
                 detail="Could not generate recommendations"
             )
         
         return {
-            "recommendations": recommendations,
+            "recommendations": result["text"],
             "user_name": user.get("name"),
-            "generated_at": str(datetime.now())
+            "generated_at": str(result["generated_at"]),
+            "stale": result["stale"]
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error in get_recommendations endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error in get_recommendations endpoint: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while generating recommendations"
@@ -134,18 +206,13 @@ async def get_recommendations(user_id: str = Depends(get_current_user_id)):
 
 
 @router.get("/user-profile")
-async def get_user_profile(user_id: str = Depends(get_current_user_id)):
+async def get_user_profile(user: dict = Depends(get_current_user)):
     """
     Get current user's profile information for the chatbot.
     
     Endpoint: GET /api/chatbot/user-profile
     """
     try:
-        # Get user data
-        user = await get_user_by_id_str(user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
         # Return relevant profile data (exclude sensitive info like password)
         return {
             "name": user.get("name"),
@@ -158,8 +225,28 @@ async def get_user_profile(user_id: str = Depends(get_current_user_id)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error in get_user_profile endpoint: {e}")
+        logger.error("Error in get_user_profile endpoint: %s", e)
         raise HTTPException(
             status_code=500,
             detail="An error occurred while fetching user profile"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(user_id: str = Depends(get_current_user_id)):
+    """
+    Semantic answer cache counters (hits, misses, bypassed, hit rate).
+    
+    Endpoint: GET /api/chatbot/cache-stats
+    """
+    return answer_cache.metrics()
+
+
+@router.get("/llm-usage")
+async def get_llm_usage(user_id: str = Depends(get_current_user_id)):
+    """
+    LLM requests, tokens and latency for the current user, per backend and route.
+    
+    Endpoint: GET /api/chatbot/llm-usage
+    """
+    return gateway.usage_report(user=user_id)
@@ -2,8 +2,11 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List
 import os
+import asyncio
 import requests
-from app.services.sentiment_service import get_sentiment, SentimentResult
+from app.services.sentiment_service import get_sentiment_async, SentimentResult
+from app.services.llm_gateway import set_llm_caller
+from app.services.news_index import schedule_ingest
 from app.models import SentimentResponse
 
 router = APIRouter(tags=["news"])
@@ -37,12 +40,12 @@ async def search_news(symbol: str = Query(..., description="Ticker symbol, e.g.
 
     data = resp.json()
     articles = data.get("articles", [])[:page_size]
+    schedule_ingest(articles, symbol_upper)
+    texts = [f"{a.get('title') or ''}. {a.get('description') or ''}" for a in articles]
+    set_llm_caller(None, "news.search")
+    sentiments = await asyncio.gather(*(get_sentiment_async(text) for text in texts))
     results = []
-    for a in articles:
-        title = a.get("title") or ""
-        desc = a.get("description") or ""
-        text = f"{title}. {desc}"
-        sentiment = get_sentiment(text)
+    for text, sentiment in zip(texts, sentiments):
         results.append({
             "symbol": symbol_upper,
             "text": text,
@@ -1,22 +1,56 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends, Request
 from app.services.risk_service import generate_risk_profile
-from app.models import RiskProfile
+from app.services.portfolio_risk_service import compute_portfolio_risk
+from app.services.recommendation_engine import get_recommendations
+from app.models import RiskProfile, PortfolioRiskRequest, PortfolioRiskResponse, WatchlistRequest
 from app.services.auth_service import get_current_user
-from app.services.mongo_service import get_user_by_id_str
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["risk"])
 
+
+@router.post("/portfolio", response_model=PortfolioRiskResponse)
+async def get_portfolio_risk(body: PortfolioRiskRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Historical and Monte Carlo VaR/CVaR for a portfolio of holdings.
+    """
+    try:
+        return await compute_portfolio_risk(body)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("/risk/portfolio: %s", e)
+        raise HTTPException(status_code=500, detail="Portfolio risk analysis failed")
+
+
+@router.post("/recommendations")
+async def get_watchlist_recommendations(body: WatchlistRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Buy/hold/sell recommendations for a watchlist, computed concurrently.
+    """
+    try:
+        salary = current_user.get("currentSalary")
+        if salary is None:
+            raise HTTPException(status_code=400, detail="User salary (CTC) not set. Please update profile.")
+
+        return {"recommendations": await get_recommendations(body.tickers, float(salary))}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("/risk/recommendations: %s", e)
+        raise HTTPException(status_code=500, detail="Recommendations failed")
+
+
 @router.get("/{ticker}", response_model=RiskProfile)
 async def get_risk(ticker: str, request: Request, current_user: dict = Depends(get_current_user)):
     """
     Get risk profile for a ticker for the authenticated user.
     """
     try:
-        user = await get_user_by_id_str(str(current_user["_id"]))
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        salary = user.get("currentSalary")
+        salary = current_user.get("currentSalary")
         if salary is None:
             raise HTTPException(status_code=400, detail="User salary (CTC) not set. Please update profile.")
         
@@ -26,5 +60,5 @@ async def get_risk(ticker: str, request: Request, current_user: dict = Depends(g
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] /risk/{ticker}: {e}")
+        logger.error("/risk/%s: %s", ticker, e)
         raise HTTPException(status_code=500, detail="Risk analysis failed")
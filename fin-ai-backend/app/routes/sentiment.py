@@ -1,6 +1,7 @@
 # app/routes/sentiment.py
 from fastapi import APIRouter, HTTPException, Query
-from app.services.sentiment_service import get_sentiment
+from app.services.sentiment_service import get_sentiment_async
+from app.services.llm_gateway import set_llm_caller
 from app.models import SentimentResponse
 
 router = APIRouter(tags=["sentiment"])
@@ -8,7 +9,8 @@ router = APIRouter(tags=["sentiment"])
 @router.get("/analyze", response_model=SentimentResponse)
 async def analyze_text(text: str = Query(..., min_length=1)):
     try:
-        sentiment = get_sentiment(text)
+        set_llm_caller(None, "sentiment.analyze")
+        sentiment = await get_sentiment_async(text)
         return {
             "symbol": None,
             "text": text,
@@ -1,15 +1,22 @@
+import logging
 from fastapi import APIRouter, HTTPException, Query
 from typing import List
 from datetime import datetime, timedelta
 import os
+import asyncio
 import requests
 import yfinance as yf
 import numpy as np
 import pandas as pd
 
 from app.models import NewsItemOut
-from app.services.sentiment_service import get_sentiment
+from app.services.sentiment_service import get_sentiment_async
+from app.services.llm_gateway import set_llm_caller
+from app.services.news_index import schedule_ingest
 from app.services.yfinance_service import get_ticker_info_async, get_stock_news_async
+from app.services.logging_service import sampled
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["stock"])
 
@@ -24,7 +31,7 @@ async def get_stock_data_endpoint(
     """Fetch stock price data for charts"""
     try:
         ticker = ticker.upper()
-        print(f"📊 Fetching {ticker} data: period={period}, interval={interval}")
+        logger.debug("Fetching %s data: period=%s, interval=%s", ticker, period, interval)
         
         # Download data
         df = yf.download(ticker, period=period, interval=interval, progress=False)
@@ -32,9 +39,7 @@ async def get_stock_data_endpoint(
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data found for '{ticker}'")
         
-        print(f"   DataFrame shape: {df.shape}")
-        print(f"   DataFrame columns: {df.columns.tolist()}")
-        print(f"   DataFrame index: {df.index.name}")
+        logger.debug("Downloaded %s rows for %s", len(df), ticker, extra={"columns": [str(c) for c in df.columns]})
         
         data = []
         
@@ -55,7 +60,7 @@ async def get_stock_data_endpoint(
                         close_val = close_val.iloc[0]
                     close_price = float(close_val)
                 else:
-                    print(f"⚠️ 'Close' not in columns: {df.columns.tolist()}")
+                    logger.warning("'Close' not in columns: %s", df.columns.tolist())
                     continue
                 
                 # Handle Volume
@@ -74,24 +79,20 @@ async def get_stock_data_endpoint(
                 })
                 
             except Exception as e:
-                print(f"⚠️ Error processing row at {idx}: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.warning("Error processing row at %s: %s", idx, e, extra=sampled())
                 continue
         
         if not data:
-            print(f"❌ No data points processed from {len(df)} rows")
+            logger.error("No data points processed from %s rows", len(df))
             raise HTTPException(status_code=404, detail=f"Could not process data for '{ticker}'")
         
-        print(f"✅ Successfully processed {len(data)} data points for {ticker}")
+        logger.debug("Processed %s data points for %s", len(data), ticker)
         return {"data": data, "ticker": ticker, "period": period, "interval": interval}
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error fetching stock data: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error fetching stock data: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to fetch data for '{ticker}': {str(e)}")
 
 # -------------------- Stock Core Metrics --------------------
@@ -122,7 +123,7 @@ def get_stock_data(ticker: str) -> dict:
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] get_stock_data({ticker}): {e}")
+        logger.error("get_stock_data(%s): %s", ticker, e)
         raise HTTPException(status_code=404, detail=f"Could not fetch market data for {ticker}")
 
 
@@ -160,7 +161,7 @@ async def stock_history(
         return data
 
     except Exception as e:
-        print(f"[ERROR] stock_history({ticker}): {e}")
+        logger.error("stock_history(%s): %s", ticker, e)
         raise HTTPException(status_code=500, detail="Failed to fetch stock history")
 
 
@@ -186,7 +187,7 @@ def fetch_news_from_newsapi(ticker: str, company_name: str = None) -> List[dict]
         }
         resp = requests.get(url, params=params, timeout=8)
         if resp.status_code != 200:
-            print(f"[WARN] NewsAPI returned {resp.status_code}")
+            logger.warning("NewsAPI returned %s", resp.status_code)
             return []
 
         items = []
@@ -204,7 +205,7 @@ def fetch_news_from_newsapi(ticker: str, company_name: str = None) -> List[dict]
         return items
 
     except Exception as e:
-        print(f"[ERROR] fetch_news_from_newsapi: {e}")
+        logger.error("fetch_news_from_newsapi: %s", e)
         return []
 
 
@@ -247,11 +248,13 @@ async def get_stock_news(ticker: str):
             unique.append(it)
 
         # limit to 10 and annotate sentiment
+        schedule_ingest(unique, ticker)
         unique = unique[:10]
+        texts = [f"{u.get('title','')} {u.get('description','')}".strip() for u in unique]
+        set_llm_caller(None, "stock.news")
+        sentiments = await asyncio.gather(*(get_sentiment_async(text) for text in texts))
         out = []
-        for u in unique:
-            text = f"{u.get('title','')} {u.get('description','')}".strip()
-            sentiment = get_sentiment(text) if text else "Neutral"
+        for u, sentiment in zip(unique, sentiments):
             s_val = sentiment.value if hasattr(sentiment, "value") else str(sentiment)
             published = u.get("publishedAt")
             if not isinstance(published, str):
@@ -267,5 +270,5 @@ async def get_stock_news(ticker: str):
         return out
 
     except Exception as e:
-        print(f"[ERROR] get_stock_news route: {e}")
+        logger.error("get_stock_news route: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch stock news")
@@ -1,81 +1,38 @@
 # /app/routes/stock_prediction.py
+import logging
 from fastapi import APIRouter, HTTPException, Depends, Request
-import os
-import joblib
-import asyncio
 import numpy as np
 from datetime import datetime
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-from scipy.special import softmax
 
-from app.services.yfinance_service import fetch_stock_data_async, get_stock_news_async
+from app.services.yfinance_service import fetch_stock_data_async
 from app.services.auth_service import get_current_user
 from app.services.mongo_service import get_user_by_id_str
+from app.services.model_registry import get_active_model, load_active_model
+from app.services.sentiment_store import get_latest_sentiment
+from app.services.signal_service import recommend_action
 from app.models import UserInDB
 
-router = APIRouter(tags=["stock_prediction"])
-
-MODEL_PATH = os.getenv("PREDICTION_MODEL_PATH", "./models/stock_predictor.joblib")
+logger = logging.getLogger(__name__)
 
-# caching globals
-_model_data = None
-_sentiment_tokenizer = None
-_sentiment_model = None
+router = APIRouter(tags=["stock_prediction"])
 
 
 def load_model():
-    """Load trained model and scaler (cached)."""
-    global _model_data
-    if _model_data is None:
-        if not os.path.exists(MODEL_PATH):
-            raise FileNotFoundError(f"Prediction model not found at {MODEL_PATH}")
-        _model_data = joblib.load(MODEL_PATH)
-    return _model_data
-
-
-def load_sentiment_model():
-    """Load FinBERT (cached)."""
-    global _sentiment_tokenizer, _sentiment_model
-    if _sentiment_tokenizer is None or _sentiment_model is None:
-        _sentiment_tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
-        _sentiment_model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
-        _sentiment_model.eval()
-    return _sentiment_tokenizer, _sentiment_model
-
-
-def get_sentiment_score_sync(text: str) -> float:
-    """Synchronous FinBERT inference for a string; returns score in [-1,1]."""
-    if not text or not text.strip():
-        return 0.0
-    try:
-        tokenizer, model = load_sentiment_model()
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512, padding=True)
-        with torch.no_grad():
-            outputs = model(**inputs)
-            scores = outputs.logits[0].detach().cpu().numpy()
-            probs = softmax(scores)
-        # positive - negative
-        return float(probs[2] - probs[0])
-    except Exception as e:
-        print(f"[WARN] FinBERT local inference failed: {e}")
-        return 0.0
+    """Return the trained model and scaler currently active in the model registry."""
+    return get_active_model()["model_data"]
 
 
 async def get_realtime_sentiment(symbol: str) -> float:
-    """Aggregate sentiment from yfinance news (async) using FinBERT."""
+    """
+    Latest daily news sentiment from the sentiment store. FinBERT runs in the
+    store's background refresher, not in the request path; symbols with no
+    recent entry score neutral until the refresher has filled them.
+    """
     try:
-        raw_news = await get_stock_news_async(symbol)
-        if not raw_news:
-            return 0.0
-        sentiments = []
-        for n in raw_news[:10]:
-            text = f"{n.get('title','')} {n.get('summary','')}"
-            s = await asyncio.to_thread(get_sentiment_score_sync, text)
-            sentiments.append(s)
-        return float(np.mean(sentiments)) if sentiments else 0.0
+        score = await get_latest_sentiment(symbol)
+        return score if score is not None else 0.0
     except Exception as e:
-        print(f"[WARN] get_realtime_sentiment({symbol}) failed: {e}")
+        logger.warning("get_realtime_sentiment(%s) failed: %s", symbol, e)
         return 0.0
 
 
@@ -110,31 +67,14 @@ def calculate_technical_indicators(df):
     return df
 
 
-def recommend_action(prediction_proba, sentiment: float, rsi: float) -> str:
-    """Map model probability + sentiment + RSI to action."""
-    try:
-        confidence = max(prediction_proba)
-        prediction = 1 if prediction_proba[1] > prediction_proba[0] else 0
-        if prediction == 1 and confidence > 0.75 and sentiment > 0.3 and rsi < 70:
-            return "Strong Buy"
-        elif prediction == 1 and confidence > 0.60 and sentiment > 0:
-            return "Buy"
-        elif prediction == 0 and confidence > 0.75 and sentiment < -0.3 and rsi > 30:
-            return "Strong Sell"
-        elif prediction == 0 and confidence > 0.60 and sentiment < 0:
-            return "Sell"
-        else:
-            return "Hold"
-    except Exception:
-        return "Hold"
-
-
 @router.get("/{symbol}")
 async def predict_stock(symbol: str, request: Request, current_user: dict = Depends(get_current_user)):
     """Endpoint to make stock predictions using saved model + sentiment + tech indicators."""
     symbol = symbol.upper()
     try:
-        model_data = load_model()
+        active = await load_active_model()
+        model_data = active["model_data"]
+        model_version = active["version"]
         technical_model = model_data.get("technical_model")
         scaler = model_data.get("scaler")
 
@@ -197,10 +137,11 @@ async def predict_stock(symbol: str, request: Request, current_user: dict = Depe
             },
             "recommendation": recommendation,
             "recommendation_explanation": "",  # keep simple or call get_explanation
+            "model_version": model_version,
             "timestamp": datetime.utcnow().isoformat()
         }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] predict_stock({symbol}): {e}")
+        logger.error("predict_stock(%s): %s", symbol, e)
         raise HTTPException(status_code=500, detail="Prediction failed")
@@ -0,0 +1,130 @@
+# /app/services/answer_cache.py
+import os
+import re
+import time
+import numpy as np
+from typing import Dict, Optional
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+MIN_WORDS = 3
+
+# Words that make a question about the user, or dependent on earlier turns
+PERSONAL_WORDS = {"i", "i'm", "im", "i've", "me", "my", "mine", "myself", "we", "our", "us"}
+CONTEXT_WORDS = {"that", "this", "it", "those", "these", "above", "previous", "earlier", "again", "more", "else"}
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def is_generic_question(message: str, user_name: Optional[str] = None) -> bool:
+    """
+    True for self-contained, non-personal questions ("What is a P/E ratio?")
+    whose answer can be shared between users. The caller still has to check
+    that no ticker is mentioned.
+    """
+    words = _WORD_RE.findall(message.lower())
+    if len(words) < MIN_WORDS:
+        return False
+    if PERSONAL_WORDS.intersection(words) or CONTEXT_WORDS.intersection(words):
+        return False
+    if user_name and any(part.lower() in words for part in user_name.split() if len(part) > 1):
+        return False
+    return True
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by unit-length question embeddings. Lookup is one
+    matrix-vector product over the live entries; a hit needs cosine
+    similarity >= threshold and an unexpired entry.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, ttl: float = TTL_SECONDS,
+                 max_entries: int = MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim) float32
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._inserted = np.zeros(0, dtype=np.float64)
+        self._answers = []
+        self._questions = []
+        self._size = 0
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+
+    def __len__(self):
+        return self._size
+
+    def _ensure_capacity(self, dim: int):
+        if self._vectors is None:
+            self._vectors = np.zeros((64, dim), dtype=np.float32)
+            self._expires = np.zeros(64, dtype=np.float64)
+            self._inserted = np.zeros(64, dtype=np.float64)
+        elif self._size == len(self._vectors):
+            grow = len(self._vectors)
+            self._vectors = np.vstack([self._vectors, np.zeros((grow, dim), dtype=np.float32)])
+            self._expires = np.concatenate([self._expires, np.zeros(grow)])
+            self._inserted = np.concatenate([self._inserted, np.zeros(grow)])
+
+    def _compact(self, now: float):
+        """Drop expired entries, then the oldest ones beyond max_entries."""
+        n = self._size
+        keep = np.flatnonzero(self._expires[:n] > now)
+        if len(keep) > self.max_entries - 1:
+            keep = keep[np.argsort(self._inserted[keep])[-(self.max_entries - 1):]]
+            keep.sort()
+        if len(keep) == n:
+            return
+        m = len(keep)
+        self._vectors[:m] = self._vectors[keep]
+        self._expires[:m] = self._expires[keep]
+        self._inserted[:m] = self._inserted[keep]
+        self._answers = [self._answers[i] for i in keep]
+        self._questions = [self._questions[i] for i in keep]
+        self._size = m
+
+    def lookup(self, embedding: np.ndarray) -> Optional[str]:
+        now = time.time()
+        if self._size:
+            sims = self._vectors[:self._size] @ embedding
+            sims[self._expires[:self._size] <= now] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] >= self.threshold:
+                self.stats["hits"] += 1
+                return self._answers[best]
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, embedding: np.ndarray, question: str, answer: str):
+        now = time.time()
+        self._ensure_capacity(len(embedding))
+        if self._size >= self.max_entries or (self._size and self._expires[0] <= now):
+            self._compact(now)
+        i = self._size
+        self._vectors[i] = embedding
+        self._expires[i] = now + self.ttl
+        self._inserted[i] = now
+        self._answers.append(answer)
+        self._questions.append(question)
+        self._size += 1
+        self.stats["stores"] += 1
+
+    def record_bypass(self):
+        self.stats["bypassed"] += 1
+
+    def metrics(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        total = lookups + self.stats["bypassed"]
+        return {
+            **self.stats,
+            "entries": self._size,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "llm_calls_avoided_rate": round(self.stats["hits"] / total, 4) if total else 0.0,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+        }
+
+
+answer_cache = SemanticAnswerCache()
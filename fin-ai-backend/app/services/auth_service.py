@@ -1,27 +1,17 @@
 #/Users/jwils/Developer/code/7th sem project Finance AI/financialai/fin-ai-backend/app/services/auth_service.py
+import logging
 import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import jwt, JWTError
 from fastapi import HTTPException, status, Request
-from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def get_password_hash(password: str) -> str:
-    """Hashes a password."""
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifies a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
-
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Creates a new JWT access token."""
@@ -60,24 +50,24 @@ async def get_current_user(request: Request) -> dict:
     token = request.cookies.get("authToken")
     
     if token is None:
-        print("⚠️  No auth token found in cookies")
+        logger.debug("No auth token found in cookies")
         raise credentials_exception
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            print("⚠️  No user ID in token payload")
+            logger.warning("No user ID in token payload")
             raise credentials_exception
             
     except JWTError as e:
-        print(f"❌ JWT Error: {e}")
+        logger.warning("JWT Error: %s", e)
         raise credentials_exception
 
     user = await get_user_by_id_str(user_id)
     
     if user is None:
-        print(f"⚠️  User not found for ID: {user_id}")
+        logger.warning("User not found for ID: %s", user_id)
         raise credentials_exception
         
     return user
\ No newline at end of file
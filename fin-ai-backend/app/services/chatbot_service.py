@@ -1,20 +1,191 @@
 # fin-ai-backend/app/services/chatbot_service.py
+import logging
 import os
+import json
+import time
+import asyncio
+import httpx
 import google.generativeai as genai
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict
 from dotenv import load_dotenv
 import yfinance as yf
 from app.services.mongo_service import get_user_by_id_str
+from app.services.symbol_index import get_symbol_index
+from app.services.llm_gateway import UpstreamError, gateway
+from app.services.conversation_store import (
+    new_session_id,
+    get_conversation,
+    append_turns,
+    turns_to_summarize,
+    apply_summary,
+)
+from app.services.answer_cache import ANSWER_CACHE_ENABLED, answer_cache, is_generic_question
+from app.services.embedding_service import embed_text
+from app.services.shared_cache import shared_get, shared_set
+from app.services.news_index import NEWS_INDEX_ENABLED, news_index, search_news
+from app.services.recommendation_cache import (
+    FRESH_SECONDS as RECOMMENDATIONS_FRESH_SECONDS,
+    profile_hash,
+    age_seconds,
+    get_recommendations_doc,
+    save_recommendations,
+)
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
+# Optional REST endpoint override, e.g. http://127.0.0.1:8765 for fake_llm_server.py
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+STOCK_DATA_CACHE_SECONDS = float(os.getenv("CHAT_STOCK_DATA_CACHE_SECONDS", "60"))
+CONTEXT_CACHE_SIZE = int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", "1024"))
+SUMMARY_MAX_WORDS = 150
+NEWS_CONTEXT_K = int(os.getenv("CHAT_NEWS_CONTEXT_K", "5"))
+
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
+if not GEMINI_API_KEY and not GEMINI_API_ENDPOINT:
     raise ValueError("GEMINI_API_KEY environment variable is not set!")
 
 genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.5-flash-lite')
+model = genai.GenerativeModel(GEMINI_MODEL)
+
+_http_client = None
+
+# symbol -> (monotonic fetch time, stock data or None)
+_stock_data_cache = {}
+_stock_data_inflight = {}
+# (user id, profile fields) -> rendered system context; small LRU
+_context_cache: "OrderedDict[tuple, str]" = OrderedDict()
+# session_id -> running summarization task
+_compacting: Dict[str, asyncio.Task] = {}
+# user_id -> running background recommendation refresh
+_regenerating: Dict[str, asyncio.Task] = {}
+
+
+# ===============================
+#          LLM CALLS
+# ===============================
+
+def _rest_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            base_url=GEMINI_API_ENDPOINT,
+            timeout=httpx.Timeout(GEMINI_TIMEOUT_SECONDS, connect=5.0),
+        )
+    return _http_client
+
+
+def _chunk_text(payload: dict) -> str:
+    """Text of the first candidate in a GenerateContentResponse JSON chunk."""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+
+def _usage_from_metadata(metadata, usage: dict):
+    """Copy token counts from Gemini usage metadata (SDK object or REST JSON) into `usage`."""
+    if not metadata:
+        return
+    if isinstance(metadata, dict):
+        prompt_tokens = metadata.get("promptTokenCount")
+        completion_tokens = metadata.get("candidatesTokenCount")
+    else:
+        prompt_tokens = getattr(metadata, "prompt_token_count", None)
+        completion_tokens = getattr(metadata, "candidates_token_count", None)
+    if prompt_tokens:
+        usage["prompt_tokens"] = int(prompt_tokens)
+    if completion_tokens:
+        usage["completion_tokens"] = int(completion_tokens)
+
+
+async def _rest_stream(prompt: str, usage: dict):
+    """streamGenerateContent over REST with server-sent events (alt=sse)."""
+    body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    async with _rest_client().stream(
+        "POST",
+        f"/v1beta/models/{GEMINI_MODEL}:streamGenerateContent",
+        params={"alt": "sse"},
+        headers={"x-goog-api-key": GEMINI_API_KEY or ""},
+        json=body,
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            payload = json.loads(line[5:])
+            if payload.get("error"):
+                # The API reports failures after the stream started as an error event
+                error = payload["error"]
+                raise UpstreamError(error.get("code") or 500, error.get("message") or "stream failed")
+            _usage_from_metadata(payload.get("usageMetadata"), usage)
+            text = _chunk_text(payload)
+            if text:
+                yield text
+
+
+async def _gemini_stream(prompt: str, usage: dict):
+    """Gemini backend for the gateway: streamed text."""
+    if GEMINI_API_ENDPOINT:
+        async for text in _rest_stream(prompt, usage):
+            yield text
+        return
+
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        _usage_from_metadata(getattr(chunk, "usage_metadata", None), usage)
+        try:
+            text = chunk.text
+        except ValueError:
+            continue  # chunk without text parts (finish reason / safety metadata only)
+        if text:
+            yield text
+
+
+async def _gemini_generate(prompt: str):
+    """Gemini backend for the gateway: (complete text, token usage)."""
+    usage: dict = {}
+    if GEMINI_API_ENDPOINT:
+        text = "".join([t async for t in _rest_stream(prompt, usage)])
+        return text, usage
+    response = await model.generate_content_async(prompt)
+    _usage_from_metadata(getattr(response, "usage_metadata", None), usage)
+    return response.text, usage
+
+
+gateway.register(
+    "gemini",
+    generate=_gemini_generate,
+    stream=_gemini_stream,
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    timeout=GEMINI_TIMEOUT_SECONDS,
+)
+
+
+async def stream_llm(prompt: str):
+    """Yield response text as it is generated, through the LLM gateway."""
+    async for text in gateway.stream("gemini", prompt):
+        yield text
+
+
+async def generate_llm(prompt: str) -> str:
+    """Complete response text for a prompt, through the LLM gateway."""
+    return await gateway.generate("gemini", prompt)
+
+
+async def close_llm_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 def get_stock_data(symbol: str):
@@ -44,7 +215,7 @@ def get_stock_data(symbol: str):
             "dividend_yield": info.get('dividendYield', 'N/A'),
         }
     except Exception as e:
-        print(f"❌ Error fetching stock data: {e}")
+        logger.error("Error fetching stock data: %s", e)
         return None
 
 
@@ -60,10 +231,34 @@ def calculate_age(date_of_birth):
         age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
         return age
     except Exception as e:
-        print(f"❌ Error calculating age: {e}")
+        logger.error("Error calculating age: %s", e)
         return None
 
 
+def get_system_context(user_data: dict) -> str:
+    """
+    create_personalized_context, cached per user. The key includes every
+    profile field the context uses, so a profile update renders a new one.
+    """
+    key = (
+        str(user_data.get('_id')),
+        user_data.get('name'),
+        str(user_data.get('dateOfBirth')),
+        user_data.get('occupation'),
+        user_data.get('currentSalary'),
+        user_data.get('email'),
+    )
+    context = _context_cache.get(key)
+    if context is not None:
+        _context_cache.move_to_end(key)
+        return context
+    context = create_personalized_context(user_data)
+    _context_cache[key] = context
+    if len(_context_cache) > CONTEXT_CACHE_SIZE:
+        _context_cache.popitem(last=False)
+    return context
+
+
 def create_personalized_context(user_data: dict):
     """Create a personalized context for the chatbot based on user data."""
     try:
@@ -108,94 +303,278 @@ Remember: You're not just an AI, you're {user_data.get('name')}'s personal finan
 """
         return context
     except Exception as e:
-        print(f"❌ Error creating personalized context: {e}")
+        logger.error("Error creating personalized context: %s", e)
         return "You are a helpful Financial AI Assistant."
 
 
-async def generate_chatbot_response(user_id: str, user_message: str, conversation_history: list = None):
+async def get_stock_data_cached(symbol: str):
+    """
+    get_stock_data off the event loop, cached for STOCK_DATA_CACHE_SECONDS here
+    and in the shared cache tier. Concurrent requests for the same symbol share one fetch.
+    """
+    cached = _stock_data_cache.get(symbol)
+    if cached and time.monotonic() - cached[0] < STOCK_DATA_CACHE_SECONDS:
+        return cached[1]
+
+    task = _stock_data_inflight.get(symbol)
+    if task is None:
+        task = asyncio.create_task(_load_stock_data(symbol))
+        _stock_data_inflight[symbol] = task
+        task.add_done_callback(lambda _t: _stock_data_inflight.pop(symbol, None))
+    data, age = await asyncio.shield(task)
+    _stock_data_cache[symbol] = (time.monotonic() - age, data)
+    return data
+
+
+async def _load_stock_data(symbol: str):
+    hit = await shared_get("chat_stock_data", symbol)
+    if hit is not None:
+        return hit
+    data = await asyncio.to_thread(get_stock_data, symbol)
+    await shared_set("chat_stock_data", symbol, data, STOCK_DATA_CACHE_SECONDS)
+    return data, 0.0
+
+
+async def fetch_stock_data_for(symbols: list) -> dict:
+    """Stock data for several symbols concurrently, through the cache."""
+    results = await asyncio.gather(*(get_stock_data_cached(s) for s in symbols))
+    return {symbol: data for symbol, data in zip(symbols, results) if data}
+
+
+async def relevant_news(user_message: str) -> list:
+    """Top indexed headlines for a message; [] if the index is empty or embedding fails."""
+    if not NEWS_INDEX_ENABLED or not len(news_index):
+        return []
+    try:
+        return search_news(await embed_text(user_message), k=NEWS_CONTEXT_K)
+    except Exception as e:
+        logger.warning("News retrieval failed: %s", e)
+        return []
+
+
+async def build_chat_prompt(user_data: dict, user_message: str, conversation_history: list = None,
+                            summary: str = None, max_history: int = 10):
+    """
+    Prompt for one chat turn: personalized context, summary of earlier turns,
+    recent history, real-time data for any stocks mentioned, the most relevant
+    indexed news headlines and the user's message.
+
+    Returns:
+        tuple: (prompt, stock_data or None)
+    """
+    # Check if user is asking about a specific stock
+    stock_data = None
+    stock_symbols = extract_stock_symbols(user_message)
+    if stock_symbols:
+        stock_data = await fetch_stock_data_for(stock_symbols)
+
+    # Personalized context (rendered once per user profile)
+    system_context = get_system_context(user_data)
+
+    # Build the conversation for Gemini
+    chat_messages = [system_context]
+
+    if summary:
+        chat_messages.append(f"SUMMARY OF THE CONVERSATION SO FAR:\n{summary}\n")
+
+    # Add conversation history if provided
+    if conversation_history:
+        for msg in conversation_history[-max_history:]:  # Last messages for context
+            role = msg.get('role', 'user')
+            content = msg.get('content', '')
+            if role == 'user':
+                chat_messages.append(f"User: {content}")
+            else:
+                chat_messages.append(f"Assistant: {content}")
+
+    # Add stock data context if available
+    if stock_data:
+        stock_context = "\n\nREAL-TIME STOCK DATA:\n"
+        for symbol, data in stock_data.items():
+            stock_context += f"""
+{symbol}:
+- Current Price: ${data['current_price']}
+- Previous Close: ${data['previous_close']}
+- Day Range: ${data['day_low']} - ${data['day_high']}
+- 52-Week Range: ${data['fifty_two_week_low']} - ${data['fifty_two_week_high']}
+- P/E Ratio: {data['pe_ratio']}
+- Market Cap: {data['market_cap']}
+- Volume: {data['volume']}
+"""
+        chat_messages.append(stock_context)
+
+    # Add relevant recent headlines from the news index, if any
+    headlines = await relevant_news(user_message)
+    if headlines:
+        news_context = "\n\nRELEVANT RECENT NEWS:\n"
+        for item in headlines:
+            news_context += f"- {item['title']} ({item['source']}, {item['publishedAt']})\n"
+        chat_messages.append(news_context)
+
+    # Add current user message
+    chat_messages.append(f"User: {user_message}")
+    chat_messages.append("Assistant: ")
+
+    return "\n".join(chat_messages), stock_data
+
+
+GENERIC_CONTEXT = """
+You are a Financial AI Assistant answering a general question about finance or investing.
+Explain clearly and concisely in simple terms, with a short example where it helps.
+Do not assume anything about the reader's personal situation.
+"""
+
+
+async def _generic_answer_lookup(user_data: dict, user_message: str):
+    """
+    For generic questions: (embedding, cached answer or None). For anything
+    personal, ticker-specific or context-dependent: (None, None).
+    """
+    if not ANSWER_CACHE_ENABLED:
+        return None, None
+    if extract_stock_symbols(user_message) or not is_generic_question(user_message, user_data.get('name')):
+        answer_cache.record_bypass()
+        return None, None
+    try:
+        embedding = await embed_text(user_message)
+    except Exception as e:
+        logger.warning("Question embedding failed, answer cache bypassed: %s", e)
+        answer_cache.record_bypass()
+        return None, None
+    return embedding, answer_cache.lookup(embedding)
+
+
+async def prepare_chat(user_data: dict, user_message: str, session_id: str = None,
+                       conversation_history: list = None):
+    """
+    Plan for a chat turn. Generic questions are answered from the semantic
+    answer cache or with a shareable, non-personal prompt. Otherwise, with a
+    session_id the stored summary and recent turns are used and the client's
+    history is ignored; without one a new session is started from the
+    client's history.
+
+    Returns:
+        dict: session_id, prompt (None on a cache hit), stock_data,
+              cached_answer, embedding (set when the answer may be cached)
+    """
+    user_id = str(user_data["_id"])
+    plan = {"session_id": session_id or new_session_id(), "prompt": None, "stock_data": None,
+            "cached_answer": None, "embedding": None}
+
+    embedding, cached_answer = await _generic_answer_lookup(user_data, user_message)
+    if embedding is not None:
+        plan["embedding"] = embedding
+        plan["cached_answer"] = cached_answer
+        if cached_answer is None:
+            plan["prompt"] = f"{GENERIC_CONTEXT}\nUser: {user_message}\nAssistant: "
+        return plan
+
+    if session_id:
+        conversation = await get_conversation(session_id, user_id)
+        plan["prompt"], plan["stock_data"] = await build_chat_prompt(
+            user_data, user_message, conversation["turns"],
+            summary=conversation.get("summary"), max_history=len(conversation["turns"]),
+        )
+    else:
+        plan["prompt"], plan["stock_data"] = await build_chat_prompt(user_data, user_message, conversation_history)
+    return plan
+
+
+async def compact_conversation(session_id: str, user_id: str):
+    """Fold the oldest turns of a long session into its rolling summary."""
+    conversation = await get_conversation(session_id, user_id)
+    folded = turns_to_summarize(conversation)
+    if not folded:
+        return
+    transcript = "\n".join(
+        f"{'User' if t.get('role') == 'user' else 'Assistant'}: {t.get('content', '')}" for t in folded
+    )
+    prompt = f"""Update the running summary of a conversation between a user and their financial assistant.
+Keep facts about the user's goals, holdings, constraints and any advice already given.
+Write at most {SUMMARY_MAX_WORDS} words, plain text.
+
+CURRENT SUMMARY:
+{conversation.get('summary') or '(none)'}
+
+NEW MESSAGES:
+{transcript}
+
+UPDATED SUMMARY:"""
+    summary = (await generate_llm(prompt)).strip()
+    if summary:
+        await apply_summary(session_id, conversation.get("summary_version", 0), summary, folded)
+
+
+def _schedule_compaction(session_id: str, user_id: str):
+    task = _compacting.get(session_id)
+    if task is None or task.done():
+        task = asyncio.create_task(compact_conversation(session_id, user_id))
+        _compacting[session_id] = task
+        task.add_done_callback(lambda _t: _compacting.pop(session_id, None))
+
+
+async def record_turn(plan: dict, user_id: str, user_message: str, reply: str):
+    """
+    Store a finished exchange, summarize the session in the background when it
+    gets long, and cache freshly generated answers to generic questions.
+    """
+    session_id = plan["session_id"]
+    if plan.get("embedding") is not None and plan.get("cached_answer") is None and reply:
+        answer_cache.store(plan["embedding"], user_message, reply)
+    try:
+        await append_turns(session_id, user_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": reply},
+        ])
+        _schedule_compaction(session_id, user_id)
+    except Exception as e:
+        logger.warning("Could not store conversation turn for session %s: %s", session_id, e)
+
+
+async def generate_chatbot_response(user_id: str, user_message: str, conversation_history: list = None,
+                                    session_id: str = None, user_data: dict = None):
     """
     Generate a personalized chatbot response using Gemini API.
     
     Args:
         user_id: MongoDB user ID
         user_message: The user's current message
-        conversation_history: List of previous messages for context
+        conversation_history: List of previous messages (only used without a session)
+        session_id: Server-side conversation to continue
+        user_data: The user document, when the caller already has it
     
     Returns:
-        dict: Response containing the AI's reply and any relevant stock data
+        dict: Response containing the AI's reply, the session_id and any relevant stock data
     """
     try:
-        # Get user data from MongoDB
-        user_data = await get_user_by_id_str(user_id)
+        # Get user data from MongoDB (unless the route already loaded it)
+        if user_data is None:
+            user_data = await get_user_by_id_str(user_id)
         if not user_data:
             return {
                 "response": "I couldn't retrieve your user profile. Please ensure you're logged in.",
                 "error": True
             }
         
-        # Check if user is asking about a specific stock
-        stock_data = None
-        stock_symbols = extract_stock_symbols(user_message)
-        if stock_symbols:
-            stock_data = {}
-            for symbol in stock_symbols:
-                data = get_stock_data(symbol)
-                if data:
-                    stock_data[symbol] = data
-        
-        # Create personalized context
-        system_context = create_personalized_context(user_data)
-        
-        # Build the conversation for Gemini
-        chat_messages = [system_context]
+        plan = await prepare_chat(user_data, user_message, session_id, conversation_history)
         
-        # Add conversation history if provided
-        if conversation_history:
-            for msg in conversation_history[-10:]:  # Last 10 messages for context
-                role = msg.get('role', 'user')
-                content = msg.get('content', '')
-                if role == 'user':
-                    chat_messages.append(f"User: {content}")
-                else:
-                    chat_messages.append(f"Assistant: {content}")
-        
-        # Add stock data context if available
-        if stock_data:
-            stock_context = "\n\nREAL-TIME STOCK DATA:\n"
-            for symbol, data in stock_data.items():
-                stock_context += f"""
-{symbol}:
-- Current Price: ${data['current_price']}
-- Previous Close: ${data['previous_close']}
-- Day Range: ${data['day_low']} - ${data['day_high']}
-- 52-Week Range: ${data['fifty_two_week_low']} - ${data['fifty_two_week_high']}
-- P/E Ratio: {data['pe_ratio']}
-- Market Cap: {data['market_cap']}
-- Volume: {data['volume']}
-"""
-            chat_messages.append(stock_context)
-        
-        # Add current user message
-        chat_messages.append(f"User: {user_message}")
-        chat_messages.append("Assistant: ")
-        
-        # Generate response using Gemini
-        full_prompt = "\n".join(chat_messages)
-        response = model.generate_content(full_prompt)
-        
-        ai_response = response.text
+        # Generate response using Gemini (unless the answer cache had it)
+        ai_response = plan["cached_answer"]
+        if ai_response is None:
+            ai_response = await generate_llm(plan["prompt"])
+        await record_turn(plan, user_id, user_message, ai_response)
         
         return {
             "response": ai_response,
-            "stock_data": stock_data,
+            "session_id": plan["session_id"],
+            "cached": plan["cached_answer"] is not None,
+            "stock_data": plan["stock_data"],
             "user_name": user_data.get('name'),
             "error": False
         }
         
     except Exception as e:
-        print(f"❌ Error generating chatbot response: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error generating chatbot response: %s", e, exc_info=True)
         return {
             "response": "I apologize, but I encountered an error processing your request. Please try again.",
             "error": True
@@ -204,66 +583,21 @@ async def generate_chatbot_response(user_id: str, user_message: str, conversatio
 
 def extract_stock_symbols(message: str):
     """
-    Extract potential stock symbols from user message.
-    Looks for common patterns like: AAPL, GOOGL, TSLA, etc.
+    Extract stock symbols mentioned in the user message.
+    Only symbols in the known ticker universe are returned: tickers written
+    as AAPL or $AAPL, and company names such as "apple" or "hdfc bank".
     """
-    import re
-    
-    # Common patterns for stock mentions
-    patterns = [
-        r'\b([A-Z]{1,5})\b',  # 1-5 uppercase letters
-        r'\$([A-Z]{1,5})\b',  # $ followed by symbol
-    ]
-    
-    symbols = set()
-    for pattern in patterns:
-        matches = re.findall(pattern, message.upper())
-        symbols.update(matches)
-    
-    # Filter out common words that might be matched
-    common_words = {'I', 'A', 'AI', 'IN', 'ON', 'AT', 'TO', 'FOR', 'THE', 'IS', 'IT', 'OR', 'AND', 'BUT'}
-    symbols = {s for s in symbols if s not in common_words}
-    
-    # Common stock symbols mentioned in context
-    stock_keywords = {
-        'apple': 'AAPL',
-        'microsoft': 'MSFT',
-        'google': 'GOOGL',
-        'amazon': 'AMZN',
-        'tesla': 'TSLA',
-        'meta': 'META',
-        'facebook': 'META',
-        'netflix': 'NFLX',
-        'nvidia': 'NVDA',
-        'reliance': 'RELIANCE.NS',
-        'tcs': 'TCS.NS',
-        'infosys': 'INFY.NS',
-        'wipro': 'WIPRO.NS',
-        'hdfc': 'HDFCBANK.NS',
-        'icici': 'ICICIBANK.NS',
-    }
-    
-    message_lower = message.lower()
-    for keyword, symbol in stock_keywords.items():
-        if keyword in message_lower:
-            symbols.add(symbol)
-    
-    return list(symbols)[:3]  # Limit to 3 stocks per query
+    return get_symbol_index().extract(message, limit=3)  # Limit to 3 stocks per query
 
 
-async def get_investment_recommendations(user_id: str):
-    """Generate personalized investment recommendations based on user profile."""
-    try:
-        user_data = await get_user_by_id_str(user_id)
-        if not user_data:
-            return None
-        
-        age = calculate_age(user_data.get('dateOfBirth'))
-        salary = user_data.get('currentSalary', 0)
-        
-        context = create_personalized_context(user_data)
-        
-        prompt = f"""{context}
+async def generate_investment_recommendations(user_data: dict) -> str:
+    """One Gemini call for personalized investment recommendations."""
+    age = calculate_age(user_data.get('dateOfBirth'))
+    salary = user_data.get('currentSalary', 0)
+    
+    context = get_system_context(user_data)
+    
+    prompt = f"""{context}
 
 Based on {user_data.get('name')}'s profile (Age: {age}, Salary: ₹{salary:,}), provide:
 
@@ -275,10 +609,71 @@ Based on {user_data.get('name')}'s profile (Age: {age}, Salary: ₹{salary:,}),
 
 Be specific with numbers and reasoning. Format the response clearly with sections.
 """
+    
+    return await generate_llm(prompt)
+
+
+async def _regenerate_recommendations(user_data: dict, user_id: str, digest: str):
+    try:
+        text = await generate_investment_recommendations(user_data)
+        if text:
+            await save_recommendations(user_id, digest, text)
+    except Exception as e:
+        logger.warning("Background recommendation refresh failed for %s: %s", user_id, e)
+
+
+def _schedule_recommendations_refresh(user_data: dict, user_id: str, digest: str):
+    task = _regenerating.get(user_id)
+    if task is None or task.done():
+        task = asyncio.create_task(_regenerate_recommendations(user_data, user_id, digest))
+        _regenerating[user_id] = task
+        task.add_done_callback(lambda _t: _regenerating.pop(user_id, None))
+
+
+async def get_cached_investment_recommendations(user_data: dict):
+    """
+    Recommendations keyed by a hash of the profile fields they are rendered from.
+    Fresh ones are returned as is; stale ones are returned immediately and
+    regenerated in the background; a new or changed profile generates inline.
+
+    Returns:
+        dict: text, generated_at, stale (bool) — or None if generation failed
+    """
+    user_id = str(user_data["_id"])
+    digest = profile_hash(user_data)
+    try:
+        doc = await get_recommendations_doc(user_id, digest)
+    except Exception as e:
+        logger.warning("Recommendation cache read failed: %s", e)
+        doc = None
+
+    if doc:
+        stale = age_seconds(doc) > RECOMMENDATIONS_FRESH_SECONDS
+        if stale:
+            _schedule_recommendations_refresh(user_data, user_id, digest)
+        return {"text": doc["text"], "generated_at": doc["generated_at"], "stale": stale}
+
+    text = await generate_investment_recommendations(user_data)
+    if not text:
+        return None
+    try:
+        doc = await save_recommendations(user_id, digest, text)
+    except Exception as e:
+        logger.warning("Recommendation cache write failed: %s", e)
+        doc = {"generated_at": datetime.now(timezone.utc)}
+    return {"text": text, "generated_at": doc["generated_at"], "stale": False}
+
+
+async def get_investment_recommendations(user_id: str):
+    """Generate personalized investment recommendations based on user profile."""
+    try:
+        user_data = await get_user_by_id_str(user_id)
+        if not user_data:
+            return None
         
-        response = model.generate_content(prompt)
-        return response.text
+        result = await get_cached_investment_recommendations(user_data)
+        return result["text"] if result else None
         
     except Exception as e:
-        print(f"❌ Error generating investment recommendations: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error generating investment recommendations: %s", e)
+        return None
@@ -0,0 +1,75 @@
+# /app/services/conversation_store.py
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List
+from pymongo import ASCENDING
+
+from app.services.mongo_service import db
+
+# One document per chat session:
+#   {_id: session_id, user_id, summary, summary_version, turns: [{id, role, content, at}], created_at, updated_at}
+# `summary` covers every turn already removed from `turns`.
+conversations_collection = db["conversations"]
+
+KEEP_TURNS = int(os.getenv("CHAT_KEEP_TURNS", "6"))
+SUMMARIZE_AFTER_TURNS = int(os.getenv("CHAT_SUMMARIZE_AFTER_TURNS", "12"))
+CONVERSATION_TTL_DAYS = int(os.getenv("CHAT_CONVERSATION_TTL_DAYS", "30"))
+
+
+async def ensure_conversation_indexes():
+    await conversations_collection.create_index([("user_id", ASCENDING)])
+    await conversations_collection.create_index(
+        [("updated_at", ASCENDING)], expireAfterSeconds=CONVERSATION_TTL_DAYS * 86400
+    )
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+async def get_conversation(session_id: str, user_id: str) -> Dict:
+    """The user's session, or an empty one (sessions of other users are never returned)."""
+    doc = await conversations_collection.find_one(
+        {"_id": session_id, "user_id": user_id},
+        {"summary": 1, "summary_version": 1, "turns": 1},
+    )
+    return doc or {"_id": session_id, "summary": "", "summary_version": 0, "turns": []}
+
+
+async def append_turns(session_id: str, user_id: str, turns: List[Dict[str, str]]):
+    """Append messages ({role, content}) to a session, creating it if needed."""
+    now = datetime.now(timezone.utc)
+    await conversations_collection.update_one(
+        {"_id": session_id, "user_id": user_id},
+        {
+            "$push": {"turns": {"$each": [{**t, "id": uuid.uuid4().hex, "at": now} for t in turns]}},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"summary": "", "summary_version": 0, "created_at": now},
+        },
+        upsert=True,
+    )
+
+
+def turns_to_summarize(conversation: Dict) -> List[Dict]:
+    """Oldest turns to fold into the summary, or [] while the session is short."""
+    turns = conversation.get("turns") or []
+    if len(turns) <= SUMMARIZE_AFTER_TURNS:
+        return []
+    return turns[:-KEEP_TURNS]
+
+
+async def apply_summary(session_id: str, previous_version: int, summary: str, folded: List[Dict]) -> bool:
+    """
+    Replace the summary and drop the turns it now covers. Only applies if no
+    other compaction ran in between (summary_version unchanged).
+    """
+    result = await conversations_collection.update_one(
+        {"_id": session_id, "summary_version": previous_version},
+        {
+            "$set": {"summary": summary},
+            "$inc": {"summary_version": 1},
+            "$pull": {"turns": {"id": {"$in": [t["id"] for t in folded]}}},
+        },
+    )
+    return result.modified_count == 1
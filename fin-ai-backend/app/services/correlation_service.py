@@ -0,0 +1,157 @@
+# /app/services/correlation_service.py
+import os
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Dict, List, Optional
+
+CORRELATION_WINDOW = int(os.getenv("RISK_CORRELATION_WINDOW", "126"))
+MIN_OVERLAP = 40
+
+
+class RollingCorrelation:
+    """
+    Pairwise correlation over the last `window` daily returns of a fixed set of
+    tickers, kept as running sums so a new bar costs one O(N^2) update instead
+    of a recompute over the whole window.
+
+    Days where a ticker has no return are masked out pairwise: for each pair
+    (i, j) the sums only cover days where both traded.
+
+        count[i, j] = days both present
+        sum_x[i, j] = sum of x_i over those days  (sum_x[j, i] is the sum of x_j)
+        sum_xx[i, j] = sum of x_i^2 over those days
+        sum_xy[i, j] = sum of x_i * x_j over those days
+
+    The sums are rebuilt from the retained window every `window` updates so
+    add/subtract rounding cannot accumulate.
+    """
+
+    def __init__(self, tickers: List[str], window: int = CORRELATION_WINDOW):
+        self.tickers = list(tickers)
+        self.index: Dict[str, int] = {t: i for i, t in enumerate(self.tickers)}
+        self.window = window
+        self.days = deque()  # (date, values, mask), oldest first
+        self._updates_since_rebuild = 0
+        self._reset_sums()
+
+    def copy(self) -> "RollingCorrelation":
+        """
+        Independent copy. The refresher syncs a copy and publishes it whole, so
+        readers on the event loop never see a tracker mid-update.
+        """
+        clone = type(self).__new__(type(self))
+        clone.tickers = list(self.tickers)
+        clone.index = dict(self.index)
+        clone.window = self.window
+        # Day entries are never modified in place, so the tuples can be shared
+        clone.days = deque(self.days)
+        clone._updates_since_rebuild = self._updates_since_rebuild
+        clone.count = self.count.copy()
+        clone.sum_x = self.sum_x.copy()
+        clone.sum_xx = self.sum_xx.copy()
+        clone.sum_xy = self.sum_xy.copy()
+        return clone
+
+    def _reset_sums(self):
+        n = len(self.tickers)
+        self.count = np.zeros((n, n), dtype=np.float64)
+        self.sum_x = np.zeros((n, n), dtype=np.float64)
+        self.sum_xx = np.zeros((n, n), dtype=np.float64)
+        self.sum_xy = np.zeros((n, n), dtype=np.float64)
+
+    def _apply(self, values: np.ndarray, mask: np.ndarray, sign: float):
+        m = mask.astype(np.float64)
+        self.count += sign * np.outer(m, m)
+        self.sum_x += sign * np.outer(values, m)
+        self.sum_xx += sign * np.outer(values * values, m)
+        self.sum_xy += sign * np.outer(values, values)
+
+    def _rebuild(self):
+        self._reset_sums()
+        for _, values, mask in self.days:
+            self._apply(values, mask, 1.0)
+        self._updates_since_rebuild = 0
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return self.days[-1][0] if self.days else None
+
+    def push(self, day, row: np.ndarray):
+        """Add one day of returns (aligned with self.tickers, NaN = missing); drops the oldest day past the window."""
+        row = np.asarray(row, dtype=np.float64)
+        mask = ~np.isnan(row)
+        values = np.where(mask, row, 0.0)
+        self.days.append((pd.Timestamp(day), values, mask))
+        self._apply(values, mask, 1.0)
+        while len(self.days) > self.window:
+            _, old_values, old_mask = self.days.popleft()
+            self._apply(old_values, old_mask, -1.0)
+
+        self._updates_since_rebuild += 1
+        if self._updates_since_rebuild >= self.window:
+            self._rebuild()
+
+    def pop_latest(self):
+        """Remove the newest day (used when a partial bar is revised)."""
+        if self.days:
+            _, values, mask = self.days.pop()
+            self._apply(values, mask, -1.0)
+
+    def sync(self, returns: pd.DataFrame) -> int:
+        """
+        Bring the window up to date with a (date x ticker) returns frame.
+        Only days from the current last date onward are applied; the last day
+        is re-applied because an intraday bar may have changed since.
+        Returns the number of days pushed.
+        """
+        frame = returns.reindex(columns=self.tickers)
+        last = self.last_date
+        if last is not None:
+            if last not in frame.index:
+                # Gap or different calendar: start over from the frame
+                self.days.clear()
+                self._reset_sums()
+                last = None
+            else:
+                self.pop_latest()
+        new_rows = frame if last is None else frame[frame.index >= last]
+        new_rows = new_rows.tail(self.window)
+        values = new_rows.to_numpy(dtype=np.float64)
+        for day, row in zip(new_rows.index, values):
+            self.push(day, row)
+        return len(new_rows)
+
+    def correlations_for(self, ticker: str) -> Optional[pd.Series]:
+        """Correlation of one tracked ticker with every tracked ticker: one row and one column of the sums."""
+        i = self.index.get(ticker)
+        if i is None:
+            return None
+        n = self.count[i]
+        sx, sy = self.sum_x[i], self.sum_x[:, i]
+        sxx, syy = self.sum_xx[i], self.sum_xx[:, i]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * self.sum_xy[i] - sx * sy
+            var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+            corr = cov / np.sqrt(var)
+        corr[(n < MIN_OVERLAP) | ~np.isfinite(corr)] = np.nan
+        return pd.Series(corr, index=self.tickers)
+
+    def correlations_with(self, returns: pd.Series) -> pd.Series:
+        """Correlation of an untracked return series with every tracked ticker over the retained window."""
+        if not self.days:
+            return pd.Series(np.nan, index=self.tickers)
+        dates = pd.DatetimeIndex([d for d, _, _ in self.days])
+        X = np.stack([v for _, v, _ in self.days])
+        M = np.stack([m for _, _, m in self.days])
+        y = returns.reindex(dates).to_numpy(dtype=np.float64)[:, None]
+        mask = M & ~np.isnan(y)
+        n = mask.sum(axis=0)
+        x0 = np.where(mask, X, 0.0)
+        y0 = np.where(mask, y, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * (x0 * y0).sum(axis=0) - x0.sum(axis=0) * y0.sum(axis=0)
+            var = (n * (x0 * x0).sum(axis=0) - x0.sum(axis=0) ** 2) * (n * (y0 * y0).sum(axis=0) - y0.sum(axis=0) ** 2)
+            corr = cov / np.sqrt(var)
+        corr[(n < MIN_OVERLAP) | ~np.isfinite(corr)] = np.nan
+        return pd.Series(corr, index=self.tickers)
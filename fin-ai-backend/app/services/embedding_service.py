@@ -0,0 +1,57 @@
+# /app/services/embedding_service.py
+import os
+import asyncio
+import numpy as np
+from typing import List
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_MAX_TOKENS = 256
+
+# caching globals
+_embedding_tokenizer = None
+_embedding_model = None
+
+
+def load_embedding_model():
+    """Load the sentence-embedding model (cached)."""
+    global _embedding_tokenizer, _embedding_model
+    if _embedding_tokenizer is None or _embedding_model is None:
+        # Imported lazily so processes that never embed do not load torch
+        from transformers import AutoTokenizer, AutoModel
+        _embedding_tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+        _embedding_model = AutoModel.from_pretrained(EMBEDDING_MODEL_NAME)
+        _embedding_model.eval()
+    return _embedding_tokenizer, _embedding_model
+
+
+def embed_texts_sync(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+    """
+    Unit-length sentence embeddings, shape (len(texts), dim), float32.
+    Mean pooling over the token embeddings, ignoring padding.
+    """
+    import torch
+    tokenizer, model = load_embedding_model()
+    out = []
+    for i in range(0, len(texts), batch_size):
+        batch = [t or "" for t in texts[i:i + batch_size]]
+        inputs = tokenizer(batch, return_tensors="pt", truncation=True, max_length=EMBEDDING_MAX_TOKENS, padding=True)
+        with torch.no_grad():
+            tokens = model(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(tokens.dtype)
+        pooled = (tokens * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        pooled = torch.nn.functional.normalize(pooled, p=2, dim=1)
+        out.append(pooled.cpu().numpy().astype(np.float32))
+    if not out:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.concatenate(out, axis=0)
+
+
+async def embed_texts(texts: List[str]) -> np.ndarray:
+    """embed_texts_sync off the event loop."""
+    return await asyncio.to_thread(embed_texts_sync, texts)
+
+
+async def embed_text(text: str) -> np.ndarray:
+    """Embedding of a single text, shape (dim,)."""
+    return (await embed_texts([text]))[0]
@@ -0,0 +1,155 @@
+# /app/services/finbert_service.py
+import logging
+import os
+import time
+import socket
+import struct
+from typing import List
+from scipy.special import softmax
+
+logger = logging.getLogger(__name__)
+
+FINBERT_MODEL_NAME = "ProsusAI/finbert"
+
+# Optional sidecar (finbert_worker.py) that holds the only FinBERT copy for all
+# uvicorn workers. Empty path = always score in-process.
+FINBERT_SOCKET_PATH = os.getenv("FINBERT_SOCKET_PATH", "")
+FINBERT_SOCKET_TIMEOUT = float(os.getenv("FINBERT_SOCKET_TIMEOUT", "10"))
+FINBERT_RETRY_SECONDS = float(os.getenv("FINBERT_RETRY_SECONDS", "30"))
+
+# caching globals
+_sentiment_tokenizer = None
+_sentiment_model = None
+
+
+def load_sentiment_model():
+    """Load FinBERT (cached)."""
+    global _sentiment_tokenizer, _sentiment_model
+    if _sentiment_tokenizer is None or _sentiment_model is None:
+        # Imported lazily so workers that only use the sidecar never load torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        _sentiment_tokenizer = AutoTokenizer.from_pretrained(FINBERT_MODEL_NAME)
+        _sentiment_model = AutoModelForSequenceClassification.from_pretrained(FINBERT_MODEL_NAME)
+        _sentiment_model.eval()
+    return _sentiment_tokenizer, _sentiment_model
+
+
+def get_sentiment_score_sync(text: str) -> float:
+    """Synchronous FinBERT inference for a string; returns score in [-1,1]."""
+    if not text or not text.strip():
+        return 0.0
+    try:
+        import torch
+        tokenizer, model = load_sentiment_model()
+        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512, padding=True)
+        with torch.no_grad():
+            outputs = model(**inputs)
+            scores = outputs.logits[0].detach().cpu().numpy()
+            probs = softmax(scores)
+        # positive - negative
+        return float(probs[2] - probs[0])
+    except Exception as e:
+        logger.warning("FinBERT local inference failed: %s", e)
+        return 0.0
+
+
+def score_texts_sync(texts: List[str], batch_size: int = 16) -> List[float]:
+    """
+    Batched FinBERT inference; one score in [-1,1] per text (0.0 for empty text).
+    Inference errors propagate: a neutral 0.0 would be indistinguishable from a real score.
+    """
+    import torch
+    tokenizer, model = load_sentiment_model()
+    scores: List[float] = []
+    for i in range(0, len(texts), batch_size):
+        batch = [t if t and t.strip() else "" for t in texts[i:i + batch_size]]
+        inputs = tokenizer(batch, return_tensors="pt", truncation=True, max_length=512, padding=True)
+        with torch.no_grad():
+            logits = model(**inputs).logits.detach().cpu().numpy()
+        probs = softmax(logits, axis=1)
+        scores.extend(0.0 if not t else float(p[2] - p[0]) for t, p in zip(batch, probs))
+    return scores
+
+
+# ===============================
+#     SIDECAR WIRE PROTOCOL
+# ===============================
+# Request:  uint32 N, then N x (uint32 byte length + UTF-8 text)
+# Response: uint32 N, then N x float32 score
+#           or ERROR_MARKER, then uint32 byte length + UTF-8 error message
+# All integers/floats big-endian. A connection may carry several requests.
+
+_U32 = struct.Struct("!I")
+ERROR_MARKER = 0xFFFFFFFF
+
+
+class SidecarInferenceError(RuntimeError):
+    """The sidecar is reachable but could not score the request."""
+
+
+def encode_request(texts: List[str]) -> bytes:
+    parts = [_U32.pack(len(texts))]
+    for text in texts:
+        data = (text or "").encode("utf-8")
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def encode_response(scores: List[float]) -> bytes:
+    return _U32.pack(len(scores)) + struct.pack(f"!{len(scores)}f", *scores)
+
+
+def encode_error(message: str) -> bytes:
+    data = message.encode("utf-8")
+    return _U32.pack(ERROR_MARKER) + _U32.pack(len(data)) + data
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("FinBERT sidecar closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+# Monotonic time until which the sidecar is considered down
+_sidecar_down_until = 0.0
+
+
+def score_texts_remote(texts: List[str], socket_path: str = FINBERT_SOCKET_PATH) -> List[float]:
+    """Score texts on the FinBERT sidecar over its Unix socket. Raises on any failure."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(FINBERT_SOCKET_TIMEOUT)
+        sock.connect(socket_path)
+        sock.sendall(encode_request(texts))
+        (count,) = _U32.unpack(_recv_exact(sock, 4))
+        if count == ERROR_MARKER:
+            (length,) = _U32.unpack(_recv_exact(sock, 4))
+            raise SidecarInferenceError(_recv_exact(sock, length).decode("utf-8", errors="replace"))
+        if count != len(texts):
+            raise ValueError(f"FinBERT sidecar returned {count} scores for {len(texts)} texts")
+        return list(struct.unpack(f"!{count}f", _recv_exact(sock, 4 * count)))
+
+
+def score_texts(texts: List[str]) -> List[float]:
+    """
+    Score texts on the sidecar when configured and reachable, otherwise in-process.
+    After a sidecar connection failure, in-process scoring is used for
+    FINBERT_RETRY_SECONDS; an inference error only falls back for this call.
+    Raises if in-process inference fails too.
+    """
+    global _sidecar_down_until
+    if not texts:
+        return []
+    if FINBERT_SOCKET_PATH and time.monotonic() >= _sidecar_down_until:
+        try:
+            return score_texts_remote(texts)
+        except SidecarInferenceError as e:
+            logger.warning("FinBERT sidecar inference failed, scoring in-process: %s", e)
+        except Exception as e:
+            _sidecar_down_until = time.monotonic() + FINBERT_RETRY_SECONDS
+            logger.warning("FinBERT sidecar unavailable, scoring in-process: %s", e)
+    return score_texts_sync(texts)
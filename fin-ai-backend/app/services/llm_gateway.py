@@ -0,0 +1,248 @@
+# /app/services/llm_gateway.py
+import logging
+import os
+import time
+import random
+import asyncio
+import hashlib
+import contextvars
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX_SECONDS = 8.0
+
+# Exception class names (from google.api_core / grpc) worth retrying, matched by
+# name so the gateway does not import every client library
+RETRYABLE_ERROR_NAMES = {
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "TooManyRequests", "Aborted",
+}
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# (user, route) the current request's LLM calls are attributed to. Background
+# tasks created while handling a request inherit it.
+_caller: contextvars.ContextVar[Tuple[str, str]] = contextvars.ContextVar("llm_caller", default=("anonymous", "unknown"))
+
+# generate(prompt) -> (text, usage or None); stream(prompt, usage) yields text and may fill usage
+GenerateFn = Callable[[str], Awaitable[Tuple[str, Optional[dict]]]]
+StreamFn = Callable[[str, dict], AsyncIterator[str]]
+
+
+def set_llm_caller(user: Optional[str], route: str):
+    """Attribute LLM calls made from the current context to (user, route)."""
+    _caller.set((user or "anonymous", route))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) when the backend reports none."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+class UpstreamError(Exception):
+    """An error the LLM API reported in its response body (e.g. an SSE error event)."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    if isinstance(error, UpstreamError):
+        return error.status_code in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+@dataclass
+class Backend:
+    name: str
+    generate: GenerateFn
+    stream: Optional[StreamFn]
+    semaphore: asyncio.Semaphore
+    timeout: float
+
+
+@dataclass
+class UsageCounter:
+    requests: int = 0
+    coalesced: int = 0
+    errors: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms_total: float = 0.0
+    latency_ms_max: float = 0.0
+
+    def as_dict(self) -> dict:
+        served = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_ms_avg": round(self.latency_ms_total / served, 1) if served > 0 else 0.0,
+            "latency_ms_max": round(self.latency_ms_max, 1),
+        }
+
+
+@dataclass
+class _CallResult:
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+    retries: int = 0
+
+
+class LLMGateway:
+    """
+    Single entry point for every LLM call in the app:
+      * per-backend concurrency limit (semaphore) and per-attempt timeout
+      * identical prompts already in flight on the same backend share one call
+      * retries with exponential backoff and jitter on transient errors
+      * token / latency counters per (backend, user, route)
+    """
+
+    def __init__(self):
+        self.backends: Dict[str, Backend] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.usage: Dict[Tuple[str, str, str], UsageCounter] = {}
+
+    def register(self, name: str, generate: GenerateFn, stream: Optional[StreamFn] = None,
+                 max_concurrency: int = 8, timeout: float = 60.0):
+        self.backends[name] = Backend(name, generate, stream, asyncio.Semaphore(max_concurrency), timeout)
+
+    def _counter(self, backend: str) -> UsageCounter:
+        user, route = _caller.get()
+        key = (backend, user, route)
+        counter = self.usage.get(key)
+        if counter is None:
+            counter = self.usage[key] = UsageCounter()
+        return counter
+
+    @staticmethod
+    async def _backoff(attempt: int):
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+        await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def _call(self, backend: Backend, prompt: str) -> _CallResult:
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                async with backend.semaphore:
+                    text, usage = await asyncio.wait_for(backend.generate(prompt), backend.timeout)
+                usage = usage or {}
+                return _CallResult(
+                    text=text,
+                    prompt_tokens=usage.get("prompt_tokens") or estimate_tokens(prompt),
+                    completion_tokens=usage.get("completion_tokens") or estimate_tokens(text),
+                    retries=attempt,
+                )
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS - 1 or not is_retryable(e):
+                    raise
+                logger.warning("LLM %s attempt %s failed (%s), retrying", backend.name, attempt + 1, type(e).__name__)
+                await self._backoff(attempt)
+
+    async def generate(self, backend_name: str, prompt: str) -> str:
+        """Complete text for a prompt. Concurrent identical prompts share one backend call."""
+        backend = self.backends[backend_name]
+        counter = self._counter(backend_name)
+        counter.requests += 1
+        start = time.perf_counter()
+
+        key = (backend_name, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        task = self._inflight.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.create_task(self._call(backend, prompt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            counter.coalesced += 1
+
+        try:
+            result = await asyncio.shield(task)
+        except Exception:
+            counter.errors += 1
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        counter.latency_ms_total += elapsed_ms
+        counter.latency_ms_max = max(counter.latency_ms_max, elapsed_ms)
+        if leader:
+            # Tokens are only spent once per coalesced group
+            counter.retries += result.retries
+            counter.prompt_tokens += result.prompt_tokens
+            counter.completion_tokens += result.completion_tokens
+        return result.text
+
+    async def stream(self, backend_name: str, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield text as it is generated. Holds a concurrency slot for the whole
+        stream; retries only happen before the first chunk has been yielded.
+        Streams are never coalesced.
+        """
+        backend = self.backends[backend_name]
+        if backend.stream is None:
+            yield await self.generate(backend_name, prompt)
+            return
+
+        counter = self._counter(backend_name)
+        counter.requests += 1
+        start = time.perf_counter()
+        parts = []
+        usage: dict = {}
+        try:
+            async with backend.semaphore:
+                for attempt in range(MAX_ATTEMPTS):
+                    stream = backend.stream(prompt, usage)
+                    try:
+                        # Each chunk, including the first, must arrive within the backend timeout
+                        while True:
+                            try:
+                                text = await asyncio.wait_for(stream.__anext__(), backend.timeout)
+                            except StopAsyncIteration:
+                                break
+                            parts.append(text)
+                            yield text
+                        break
+                    except Exception as e:
+                        if parts or attempt == MAX_ATTEMPTS - 1 or not is_retryable(e):
+                            raise
+                        counter.retries += 1
+                        logger.warning("LLM %s stream attempt %s failed (%s), retrying", backend.name, attempt + 1, type(e).__name__)
+                        await self._backoff(attempt)
+                    finally:
+                        await stream.aclose()
+        except Exception:
+            counter.errors += 1
+            raise
+        finally:
+            text = "".join(parts)
+            counter.prompt_tokens += usage.get("prompt_tokens") or estimate_tokens(prompt)
+            counter.completion_tokens += usage.get("completion_tokens") or estimate_tokens(text)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            counter.latency_ms_total += elapsed_ms
+            counter.latency_ms_max = max(counter.latency_ms_max, elapsed_ms)
+
+    def usage_report(self, user: Optional[str] = None) -> dict:
+        """Counters grouped as {backend: {route: {...}}}, optionally for one user only."""
+        report: Dict[str, Dict[str, dict]] = {}
+        for (backend, u, route), counter in self.usage.items():
+            if user is not None and u != user:
+                continue
+            key = route if user is not None else f"{u}:{route}"
+            report.setdefault(backend, {})[key] = counter.as_dict()
+        return report
+
+
+gateway = LLMGateway()
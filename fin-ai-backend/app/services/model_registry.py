@@ -0,0 +1,167 @@
+# /app/services/model_registry.py
+import logging
+import os
+import json
+import fcntl
+import asyncio
+import secrets
+import joblib
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Registry layout:
+#   <REGISTRY_DIR>/manifest.json          {"active": "v...", "versions": [{...}, ...]}
+#   <REGISTRY_DIR>/<version>/model.joblib
+REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "./models/registry")
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".manifest.lock"
+ARTIFACT_NAME = "model.joblib"
+POLL_INTERVAL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "30"))
+
+# Pre-registry artifact, used until a version is published
+LEGACY_MODEL_PATH = os.getenv("PREDICTION_MODEL_PATH", "./models/stock_predictor.joblib")
+
+# Currently served model: {"version": str, "model_data": dict}.
+# Replaced as a whole, so readers always see a consistent pair.
+_active = None
+_load_lock = asyncio.Lock()
+
+
+# ===============================
+#        MANIFEST / PUBLISH
+# ===============================
+
+def read_manifest(registry_dir: str = REGISTRY_DIR) -> dict:
+    """Return the registry manifest, or an empty one if nothing was published yet."""
+    path = os.path.join(registry_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"active": None, "versions": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest: dict, registry_dir: str):
+    """Write the manifest via temp file + rename so readers never see a partial file."""
+    path = os.path.join(registry_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _manifest_lock(registry_dir: str):
+    """Exclusive lock on the registry (flock), held across a manifest read-modify-write."""
+    with open(os.path.join(registry_dir, LOCK_NAME), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def publish_model(model_data: dict, registry_dir: str = REGISTRY_DIR, metadata: dict = None) -> str:
+    """
+    Store model_data as a new version and make it active.
+    The artifact is dumped uncompressed so workers can memory-map its arrays.
+    """
+    os.makedirs(registry_dir, exist_ok=True)
+    # Microseconds plus a random suffix: two publishes in the same instant must not collide
+    version = f"{datetime.utcnow().strftime('v%Y%m%d%H%M%S%f')}-{secrets.token_hex(3)}"
+
+    tmp_dir = os.path.join(registry_dir, f".{version}.tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    joblib.dump(model_data, os.path.join(tmp_dir, ARTIFACT_NAME))
+    os.replace(tmp_dir, os.path.join(registry_dir, version))
+
+    # Concurrent publishers must not each append to the same old manifest
+    with _manifest_lock(registry_dir):
+        manifest = read_manifest(registry_dir)
+        manifest["versions"].append({
+            "version": version,
+            "created_at": datetime.utcnow().isoformat(),
+            "artifact": f"{version}/{ARTIFACT_NAME}",
+            **(metadata or {}),
+        })
+        manifest["active"] = version
+        _write_manifest(manifest, registry_dir)
+    return version
+
+
+def version_metadata(version: str, registry_dir: str = REGISTRY_DIR) -> dict:
+    """Manifest entry of one version (created_at, train_end, ...), or {} if it is not in the registry."""
+    for entry in read_manifest(registry_dir)["versions"]:
+        if entry["version"] == version:
+            return entry
+    return {}
+
+
+# ===============================
+#        LOADING / SERVING
+# ===============================
+
+def load_version(version: str, registry_dir: str = REGISTRY_DIR) -> dict:
+    """Load one registry version; numpy arrays are memory-mapped read-only and shared between workers."""
+    path = os.path.join(registry_dir, version, ARTIFACT_NAME)
+    return joblib.load(path, mmap_mode="r")
+
+
+def _load_initial() -> dict:
+    manifest = read_manifest()
+    if manifest.get("active"):
+        version = manifest["active"]
+        return {"version": version, "model_data": load_version(version)}
+    if not os.path.exists(LEGACY_MODEL_PATH):
+        raise FileNotFoundError(f"Prediction model not found in {REGISTRY_DIR} or at {LEGACY_MODEL_PATH}")
+    return {"version": "legacy", "model_data": joblib.load(LEGACY_MODEL_PATH)}
+
+
+def get_active_model() -> dict:
+    """
+    Return {"version", "model_data"} for the model currently being served,
+    loading it synchronously on first use (scripts; the app uses load_active_model).
+    """
+    global _active
+    if _active is None:
+        _active = _load_initial()
+    return _active
+
+
+async def load_active_model() -> dict:
+    """
+    Like get_active_model, but a first load runs in a thread. Awaited at startup,
+    so requests normally just read `_active`; concurrent callers share one load.
+    """
+    global _active
+    if _active is None:
+        async with _load_lock:
+            if _active is None:
+                _active = await asyncio.to_thread(_load_initial)
+    return _active
+
+
+async def watch_registry(interval: float = POLL_INTERVAL_SECONDS):
+    """
+    Background task: poll the manifest and hot-swap the served model when a new
+    version becomes active. Loading happens off the event loop; requests keep
+    using the previous model until the new one is fully loaded.
+    """
+    global _active
+    while True:
+        try:
+            manifest = await asyncio.to_thread(read_manifest)
+            version = manifest.get("active")
+            current = _active["version"] if _active else None
+            if version and version != current:
+                model_data = await asyncio.to_thread(load_version, version)
+                _active = {"version": version, "model_data": model_data}
+                logger.info("Prediction model switched %s -> %s", current, version)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("watch_registry: %s", e)
+        await asyncio.sleep(interval)
@@ -1,22 +1,113 @@
 #/Users/jwils/Developer/code/7th sem project Finance AI/financialai/fin-ai-backend/app/services/mongo_service.py
+import logging
 import motor.motor_asyncio
-from passlib.context import CryptContext
+import threading
+from fastapi import HTTPException
+from pymongo import ASCENDING, monitoring
+from pymongo.errors import DuplicateKeyError
 from app.models import UserRegister
 from bson import ObjectId
 import os
 from dotenv import load_dotenv
 from datetime import datetime, date
+from app.services.user_cache import get_user_cached, invalidate_user
+from app.services.password_service import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from .env
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("MONGO_DB_NAME", "Financial-AI-Authentication")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "10"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "1"))
 
 if not MONGO_URI:
     raise ValueError("MONGODB_URI environment variable is not set!")
 
-print(f"🔗 Connecting to MongoDB: {DB_NAME}")
+logger.info("Connecting to MongoDB: %s", DB_NAME)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters from pymongo's CMAP events. Events arrive on
+    driver threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_ms_total = 0.0
+        self.checkout_wait_ms_max = 0.0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        # `duration` (seconds waited) is only reported by newer pymongo versions
+        wait_ms = (getattr(event, "duration", None) or 0.0) * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.checkout_wait_ms_total += wait_ms
+            self.checkout_wait_ms_max = max(self.checkout_wait_ms_max, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "min_pool_size": MONGO_MIN_POOL_SIZE,
+                "open_connections": self.open,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_wait_ms_avg": round(self.checkout_wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_wait_ms_max": round(self.checkout_wait_ms_max, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+
+pool_metrics = PoolMetrics()
 
 # Single client instance with proper pooling
 client = motor.motor_asyncio.AsyncIOMotorClient(
@@ -25,38 +116,51 @@ client = motor.motor_asyncio.AsyncIOMotorClient(
     connectTimeoutMS=5000,
     socketTimeoutMS=5000,
     retryWrites=True,
-    maxPoolSize=10,
-    minPoolSize=1
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    event_listeners=[pool_metrics],
 )
 
 db = client[DB_NAME]
 users_collection = db["users"]
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Projections per access pattern: only login needs the password hash
+LOGIN_PROJECTION = {"email": 1, "name": 1, "hashed_password": 1}
+PROFILE_PROJECTION = {"hashed_password": 0}
+
+
+class UserAlreadyExistsError(Exception):
+    """Registration hit the unique email index."""
+
 
+async def ensure_user_indexes():
+    """Unique email: duplicate registrations are rejected by the insert itself."""
+    await users_collection.create_index([("email", ASCENDING)], unique=True)
 
-async def get_db_user(email: str):
-    """Retrieve a user by email."""
+
+async def get_db_user(email: str, projection: dict = None):
+    """Retrieve a user by email (all fields unless a projection is given)."""
     try:
-        print(f"🔍 Searching for user: {email}")
-        user = await users_collection.find_one({"email": email})
+        logger.debug("Searching for user: %s", email)
+        user = await users_collection.find_one({"email": email}, projection)
         if user:
-            print(f"✅ User found: {email}")
+            logger.debug("User found: %s", email)
         else:
-            print(f"⚠️  User not found: {email}")
+            logger.debug("User not found: %s", email)
         return user
     except Exception as e:
-        print(f"❌ Error getting user by email: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error getting user by email: %s", e, exc_info=True)
         return None
 
 
-async def register_user(user_data: UserRegister):
-    """Register a new user with all form fields."""
+async def register_user(user_data: UserRegister, client_ip: str = None):
+    """
+    Register a new user with all form fields in a single insert.
+    Raises UserAlreadyExistsError when the email is taken.
+    """
     try:
-        print(f"🔐 Hashing password for: {user_data.email}")
-        hashed_password = pwd_context.hash(user_data.password)
+        logger.debug("Hashing password for: %s", user_data.email)
+        hashed_password = await hash_password(user_data.password, client_ip)
         
         # Convert date to datetime if needed
         dob = user_data.dateOfBirth
@@ -74,57 +178,89 @@ async def register_user(user_data: UserRegister):
             "created_at": datetime.now()
         }
         
-        print(f"💾 Inserting user into database: {user_data.email}")
-        print(f"📅 Date of birth type: {type(dob)}")
+        logger.debug("Inserting user into database: %s", user_data.email)
         
-        # Insert the complete user document
-        result = await users_collection.insert_one(user_dict)
+        # Insert the complete user document; the unique email index catches duplicates
+        try:
+            result = await users_collection.insert_one(user_dict)
+        except DuplicateKeyError:
+            raise UserAlreadyExistsError(user_data.email)
         
-        print(f"✅ User inserted with ID: {result.inserted_id}")
+        logger.info("User inserted with ID: %s", result.inserted_id)
         
-        # Find and return the newly created user
-        new_user = await users_collection.find_one({"_id": result.inserted_id})
-        return new_user
+        # insert_one set _id on the dict; no need to read the user back
+        user_dict.pop("hashed_password")
+        return user_dict
+    except UserAlreadyExistsError:
+        logger.warning("User already exists: %s", user_data.email)
+        raise
     except Exception as e:
-        print(f"❌ Error registering user: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error registering user: %s", e, exc_info=True)
         raise
 
 
-async def authenticate_user(email: str, password: str):
-    """Authenticate user credentials."""
+async def authenticate_user(email: str, password: str, client_ip: str = None):
+    """Authenticate user credentials. Raises 429 when the password pool is saturated."""
     try:
-        print(f"🔍 Looking up user: {email}")
-        user = await get_db_user(email)
+        logger.debug("Looking up user: %s", email)
+        user = await get_db_user(email, LOGIN_PROJECTION)
         
         if not user:
-            print(f"⚠️  User not found: {email}")
+            logger.warning("User not found: %s", email)
             return None
             
-        print(f"🔐 Verifying password for: {email}")
+        logger.debug("Verifying password for: %s", email)
         
-        if not pwd_context.verify(password, user["hashed_password"]):
-            print(f"⚠️  Invalid password for: {email}")
+        if not await verify_password(password, user["hashed_password"], client_ip):
+            logger.warning("Invalid password for: %s", email)
             return None
             
-        print(f"✅ Authentication successful for: {email}")
+        logger.debug("Authentication successful for: %s", email)
+        user.pop("hashed_password", None)
         return user
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error authenticating user: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error authenticating user: %s", e, exc_info=True)
         return None
 
 
-async def get_user_by_id_str(user_id: str):
-    """Retrieve a user by their ID (string)."""
+async def _load_user_by_id(user_id: str):
     try:
         obj_id = ObjectId(user_id)
-        user = await users_collection.find_one({"_id": obj_id})
+        user = await users_collection.find_one({"_id": obj_id}, PROFILE_PROJECTION)
         return user
     except Exception as e:
-        print(f"❌ Error getting user by ID: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
\ No newline at end of file
+        logger.error("Error getting user by ID: %s", e, exc_info=True)
+        return None
+
+
+async def get_user_by_id_str(user_id: str):
+    """
+    Retrieve a user by their ID (string). Served from the request's identity
+    map or the short-TTL user cache when possible, so repeated calls while
+    handling one request cost at most one Mongo lookup.
+    """
+    return await get_user_cached(str(user_id), _load_user_by_id)
+
+
+async def update_user_profile(user_id: str, fields: dict) -> bool:
+    """
+    Update profile fields and drop everything cached from the old profile: the
+    user document (both cache levels) and the stored investment recommendations.
+    Returns False if the user does not exist.
+    """
+    # Imported here: recommendation_cache imports this module for `db`
+    from app.services.recommendation_cache import invalidate_recommendations
+
+    fields = dict(fields)
+    dob = fields.get("dateOfBirth")
+    if isinstance(dob, date) and not isinstance(dob, datetime):
+        fields["dateOfBirth"] = datetime.combine(dob, datetime.min.time())
+    try:
+        result = await users_collection.update_one({"_id": ObjectId(user_id)}, {"$set": fields})
+    finally:
+        invalidate_user(str(user_id))
+    if result.matched_count:
+        await invalidate_recommendations(str(user_id))
+    return bool(result.matched_count)
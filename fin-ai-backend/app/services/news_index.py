@@ -0,0 +1,198 @@
+# /app/services/news_index.py
+import logging
+import os
+import asyncio
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional, Set
+
+from app.services.embedding_service import embed_texts
+
+logger = logging.getLogger(__name__)
+
+NEWS_INDEX_ENABLED = os.getenv("NEWS_INDEX_ENABLED", "true").lower() == "true"
+MAX_CHUNKS = int(os.getenv("NEWS_INDEX_MAX_CHUNKS", "20000"))
+USE_HNSW = os.getenv("NEWS_INDEX_HNSW", "false").lower() == "true"
+HNSW_MIN_SIZE = 5000  # brute force is faster than the graph below this
+HNSW_EF = 64
+CHUNK_WORDS = 80
+CHUNK_OVERLAP = 20
+MIN_SIMILARITY = float(os.getenv("NEWS_INDEX_MIN_SIMILARITY", "0.3"))
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+def _article_id(article: dict) -> str:
+    key = article.get("url") or article.get("title") or ""
+    return hashlib.sha1(key.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_article(article: dict) -> List[str]:
+    """Title + description split into overlapping word windows (headlines are usually one chunk)."""
+    title = (article.get("title") or "").strip()
+    body = (article.get("description") or article.get("summary") or "").strip()
+    words = f"{title}. {body}".split() if body else title.split()
+    if len(words) <= CHUNK_WORDS:
+        return [" ".join(words)] if words else []
+    step = CHUNK_WORDS - CHUNK_OVERLAP
+    return [" ".join(words[i:i + CHUNK_WORDS]) for i in range(0, len(words) - CHUNK_OVERLAP, step)]
+
+
+class NewsIndex:
+    """
+    In-memory vector index over embedded news chunks. Exact inner-product
+    search over a NumPy matrix; with NEWS_INDEX_HNSW and hnswlib installed an
+    HNSW graph is kept alongside and used once the index is large.
+    Chunks are appended as articles arrive; the oldest are evicted past MAX_CHUNKS.
+
+    HNSW labels are sequence numbers that never change: row = label - self._base,
+    where _base is the label of row 0. Eviction (always the oldest rows) marks
+    their labels deleted and advances _base, so the graph is never rebuilt and
+    new chunks reuse the deleted slots.
+    """
+
+    def __init__(self, max_chunks: int = MAX_CHUNKS, use_hnsw: bool = USE_HNSW):
+        self.max_chunks = max_chunks
+        self.use_hnsw = use_hnsw and hnswlib is not None
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim) float32
+        self._meta: List[Dict] = []
+        self._size = 0
+        self._article_ids: Set[str] = set()
+        self._hnsw = None
+        self._base = 0
+
+    def __len__(self):
+        return self._size
+
+    def has_article(self, article: dict) -> bool:
+        return self.has_article_id(_article_id(article))
+
+    def has_article_id(self, article_id: str) -> bool:
+        return article_id in self._article_ids
+
+    def _init_hnsw(self, dim: int):
+        if not self.use_hnsw:
+            return
+        self._hnsw = hnswlib.Index(space="ip", dim=dim)
+        self._hnsw.init_index(max_elements=self.max_chunks, ef_construction=200, M=16, allow_replace_deleted=True)
+        self._hnsw.set_ef(HNSW_EF)
+
+    def _evict_oldest(self, count: int):
+        if self._hnsw is not None:
+            # O(count) graph updates instead of re-inserting every remaining chunk
+            for label in range(self._base, self._base + count):
+                self._hnsw.mark_deleted(label)
+        keep = slice(count, self._size)
+        m = self._size - count
+        self._vectors[:m] = self._vectors[keep]
+        self._meta = self._meta[count:]
+        self._size = m
+        self._base += count
+        self._article_ids = {meta["article_id"] for meta in self._meta}
+
+    def add(self, vectors: np.ndarray, metas: List[Dict]):
+        """Append embedded chunks (rows of `vectors`, unit length) with their metadata."""
+        n = len(metas)
+        if n == 0:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((max(1024, n), vectors.shape[1]), dtype=np.float32)
+            self._init_hnsw(vectors.shape[1])
+        if self._size + n > self.max_chunks:
+            self._evict_oldest(max(self._size + n - self.max_chunks, self.max_chunks // 10))
+        if self._size + n > len(self._vectors):
+            new_capacity = min(self.max_chunks, max(2 * len(self._vectors), self._size + n))
+            grown = np.zeros((new_capacity, self._vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+        start = self._size
+        self._vectors[start:start + n] = vectors
+        self._meta.extend(metas)
+        self._size += n
+        self._article_ids.update(meta["article_id"] for meta in metas)
+        if self._hnsw is not None:
+            labels = np.arange(self._base + start, self._base + start + n)
+            self._hnsw.add_items(vectors, labels, replace_deleted=True)
+
+    def search(self, query: np.ndarray, k: int = 5, min_similarity: float = MIN_SIMILARITY) -> List[Dict]:
+        """Top-k chunks by cosine similarity, one per article."""
+        if not self._size:
+            return []
+        fetch = min(self._size, k * 4)  # room for several chunks of the same article
+        if self._hnsw is not None and self._size >= HNSW_MIN_SIZE:
+            labels, distances = self._hnsw.knn_query(query[None, :], k=fetch)
+            idx, sims = labels[0].astype(np.int64) - self._base, 1.0 - distances[0]
+        else:
+            scores = self._vectors[:self._size] @ query
+            idx = np.argpartition(-scores, fetch - 1)[:fetch]
+            idx = idx[np.argsort(-scores[idx])]
+            sims = scores[idx]
+
+        results, seen = [], set()
+        for i, sim in zip(idx, sims):
+            if sim < min_similarity:
+                break
+            meta = self._meta[int(i)]
+            if meta["article_id"] in seen:
+                continue
+            seen.add(meta["article_id"])
+            results.append({**meta, "score": round(float(sim), 4)})
+            if len(results) == k:
+                break
+        return results
+
+
+news_index = NewsIndex()
+_ingest_tasks: Set[asyncio.Task] = set()
+
+
+async def ingest_articles(articles: List[dict], symbol: Optional[str] = None) -> int:
+    """Embed and index articles not seen before. Returns the number of chunks added."""
+    new_articles = [a for a in articles if (a.get("title") or "").strip() and not news_index.has_article(a)]
+    texts, metas = [], []
+    for article in new_articles:
+        source = article.get("source")
+        if isinstance(source, dict):
+            source = source.get("name")
+        for chunk in chunk_article(article):
+            texts.append(chunk)
+            metas.append({
+                "article_id": _article_id(article),
+                "symbol": symbol,
+                "title": article.get("title"),
+                "source": source or "Unknown",
+                "url": article.get("url") or "",
+                "publishedAt": str(article.get("publishedAt") or ""),
+            })
+    if not texts:
+        return 0
+    vectors = await embed_texts(texts)
+    # Another ingest may have added some of these articles while we were embedding
+    fresh = [i for i, meta in enumerate(metas) if not news_index.has_article_id(meta["article_id"])]
+    news_index.add(vectors[fresh], [metas[i] for i in fresh])
+    return len(fresh)
+
+
+def schedule_ingest(articles: List[dict], symbol: Optional[str] = None):
+    """Index articles in the background so the news endpoints do not wait on embedding."""
+    if not NEWS_INDEX_ENABLED or not articles:
+        return
+
+    async def run():
+        try:
+            await ingest_articles(articles, symbol)
+        except Exception as e:
+            logger.warning("news index ingest failed: %s", e)
+
+    task = asyncio.create_task(run())
+    _ingest_tasks.add(task)
+    task.add_done_callback(_ingest_tasks.discard)
+
+
+def search_news(query_embedding: np.ndarray, k: int = 5) -> List[Dict]:
+    """Most relevant indexed headlines for an embedded query."""
+    return news_index.search(query_embedding, k=k)
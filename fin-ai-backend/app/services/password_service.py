@@ -0,0 +1,115 @@
+# /app/services/password_service.py
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+from fastapi import HTTPException, Request
+from passlib.context import CryptContext
+
+# bcrypt releases the GIL, so threads already keep hashing off the event loop;
+# "process" isolates it completely at the cost of a process per worker slot.
+PASSWORD_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash/verify operations allowed to be running or waiting at once; beyond this, 429
+MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_WORKERS * 8)))
+# Per-address limit, 0 = off. Only meaningful when client_ip sees real client
+# addresses: behind a reverse proxy that needs TRUST_FORWARDED_FOR=true, otherwise
+# every client shares the proxy's address and the limit throttles everyone.
+MAX_PENDING_PER_IP = int(os.getenv("PASSWORD_HASH_MAX_PENDING_PER_IP", "0"))
+RETRY_AFTER_SECONDS = 1
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor: Optional[Executor] = None
+_pending = 0
+_pending_by_ip: Dict[str, int] = {}
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PASSWORD_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def shutdown_password_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def client_ip(request: Request) -> str:
+    """Caller address for admission control (first X-Forwarded-For hop only behind a trusted proxy)."""
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _too_many(detail: str) -> HTTPException:
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+@asynccontextmanager
+async def _admit(ip: Optional[str]):
+    """
+    Reject instead of queueing without bound: the pool as a whole may have at
+    most MAX_PENDING operations pending, and one address MAX_PENDING_PER_IP (if set).
+    """
+    global _pending
+    if ip is not None and MAX_PENDING_PER_IP > 0 and _pending_by_ip.get(ip, 0) >= MAX_PENDING_PER_IP:
+        raise _too_many("Too many login attempts in progress. Please retry shortly.")
+    if _pending >= MAX_PENDING:
+        raise _too_many("Server is busy. Please retry shortly.")
+    _pending += 1
+    if ip is not None:
+        _pending_by_ip[ip] = _pending_by_ip.get(ip, 0) + 1
+    try:
+        yield
+    finally:
+        _pending -= 1
+        if ip is not None:
+            remaining = _pending_by_ip.get(ip, 1) - 1
+            if remaining:
+                _pending_by_ip[ip] = remaining
+            else:
+                _pending_by_ip.pop(ip, None)
+
+
+async def hash_password(password: str, ip: Optional[str] = None) -> str:
+    """bcrypt hash computed on the password pool."""
+    async with _admit(ip):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), _hash, password)
+
+
+async def verify_password(password: str, hashed_password: str, ip: Optional[str] = None) -> bool:
+    """bcrypt verify computed on the password pool."""
+    async with _admit(ip):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), _verify, password, hashed_password)
+
+
+def pool_stats() -> dict:
+    return {
+        "executor": PASSWORD_EXECUTOR,
+        "workers": PASSWORD_WORKERS,
+        "pending": _pending,
+        "max_pending": MAX_PENDING,
+        "pending_ips": len(_pending_by_ip),
+    }
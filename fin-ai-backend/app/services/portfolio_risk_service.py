@@ -0,0 +1,194 @@
+# /app/services/portfolio_risk_service.py
+import logging
+import os
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from collections import OrderedDict
+from fastapi import HTTPException
+from typing import Dict, List, Tuple
+
+from app.models import PortfolioRiskRequest, PortfolioRiskResponse, RiskEstimate
+from app.services.universe_service import get_universe_closes
+from app.services.shared_cache import shared_get, shared_set
+
+logger = logging.getLogger(__name__)
+
+SIMULATION_PATHS = 10_000
+LOOKBACK_DAYS = 252
+MIN_OBSERVATIONS = 60
+MAX_HOLDINGS = 200
+CLOSES_CACHE_SECONDS = float(os.getenv("PORTFOLIO_CLOSES_CACHE_SECONDS", "3600"))
+
+# ticker -> (monotonic fetch time, close series) for tickers outside the risk universe
+_closes_cache: Dict[str, Tuple[float, pd.Series]] = {}
+
+# (tickers, last date) -> (mean vector, Cholesky factor); small LRU
+_factor_cache: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+FACTOR_CACHE_SIZE = 128
+
+
+# ===============================
+#          RETURNS MATRIX
+# ===============================
+
+def _download_closes(tickers: List[str]) -> Dict[str, pd.Series]:
+    df = yf.download(tickers, period="1y", interval="1d", progress=False, auto_adjust=True, threads=True)
+    closes = df["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(name=tickers[0])
+    return {t: closes[t].dropna() for t in closes.columns if closes[t].notna().any()}
+
+
+async def get_closes(tickers: List[str]) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Close matrix for the requested tickers. Universe tickers come from the
+    universe table's refresh; others come from the shared cache tier or are
+    downloaded together once and cached.
+    Returns (closes, tickers that could not be found).
+    """
+    universe = get_universe_closes()
+    now = time.monotonic()
+    columns: Dict[str, pd.Series] = {}
+    to_fetch = []
+    for t in tickers:
+        if universe is not None and t in universe.columns:
+            columns[t] = universe[t]
+        elif t in _closes_cache and now - _closes_cache[t][0] < CLOSES_CACHE_SECONDS:
+            columns[t] = _closes_cache[t][1]
+        else:
+            to_fetch.append(t)
+
+    if to_fetch:
+        hits = await asyncio.gather(*(shared_get("closes_1y", t) for t in to_fetch))
+        for t, hit in zip(to_fetch, hits):
+            if hit is not None:
+                _closes_cache[t] = (now - hit[1], hit[0])
+                columns[t] = hit[0]
+        to_fetch = [t for t in to_fetch if t not in columns]
+
+    if to_fetch:
+        try:
+            fetched = await asyncio.to_thread(_download_closes, to_fetch)
+        except Exception as e:
+            logger.warning("portfolio closes download failed: %s", e)
+            fetched = {}
+        for t, series in fetched.items():
+            _closes_cache[t] = (now, series)
+            columns[t] = series
+        await asyncio.gather(*(shared_set("closes_1y", t, series, CLOSES_CACHE_SECONDS) for t, series in fetched.items()))
+
+    missing = [t for t in tickers if t not in columns]
+    frame = pd.DataFrame(columns)
+    if not frame.empty:
+        index = pd.DatetimeIndex(frame.index)
+        if index.tz is not None:
+            frame.index = index.tz_localize(None)
+    return frame.sort_index(), missing
+
+
+def _mean_and_factor(key: tuple, R: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean daily returns and a Cholesky factor of their covariance (cached per ticker set and as-of date)."""
+    cached = _factor_cache.get(key)
+    if cached is not None:
+        _factor_cache.move_to_end(key)
+        return cached
+
+    mu = R.mean(axis=0)
+    cov = np.atleast_2d(np.cov(R, rowvar=False))
+    try:
+        L = np.linalg.cholesky(cov + np.eye(len(cov)) * 1e-12)
+    except np.linalg.LinAlgError:
+        # Not positive definite (e.g. duplicated series): use the PSD square root
+        vals, vecs = np.linalg.eigh(cov)
+        L = vecs * np.sqrt(np.clip(vals, 0.0, None))
+
+    _factor_cache[key] = (mu, L)
+    if len(_factor_cache) > FACTOR_CACHE_SIZE:
+        _factor_cache.popitem(last=False)
+    return mu, L
+
+
+def _estimate(portfolio_returns: np.ndarray, confidence: float, total_value: float) -> RiskEstimate:
+    """VaR/CVaR as positive losses, in currency and in percent of portfolio value."""
+    cutoff = np.quantile(portfolio_returns, 1 - confidence)
+    tail = portfolio_returns[portfolio_returns <= cutoff]
+    var_pct = float(max(-cutoff, 0.0))
+    cvar_pct = float(max(-tail.mean(), 0.0)) if len(tail) else var_pct
+    return RiskEstimate(
+        var=round(var_pct * total_value, 2),
+        cvar=round(cvar_pct * total_value, 2),
+        var_percent=round(var_pct * 100, 4),
+        cvar_percent=round(cvar_pct * 100, 4),
+    )
+
+
+# ===============================
+#          PORTFOLIO VaR
+# ===============================
+
+async def compute_portfolio_risk(request: PortfolioRiskRequest) -> PortfolioRiskResponse:
+    """
+    Historical-simulation and Monte Carlo VaR/CVaR for a set of holdings.
+    Horizons above one day use sqrt-of-time scaling of daily returns.
+    """
+    if not request.holdings:
+        raise HTTPException(status_code=400, detail="At least one holding is required")
+    if len(request.holdings) > MAX_HOLDINGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HOLDINGS} holdings are supported")
+
+    # Merge duplicate tickers
+    positions: Dict[str, Dict[str, float]] = {}
+    for h in request.holdings:
+        if h.shares is None and h.value is None:
+            raise HTTPException(status_code=400, detail=f"Holding {h.ticker} needs shares or value")
+        p = positions.setdefault(h.ticker.upper(), {"shares": 0.0, "value": 0.0})
+        p["shares"] += h.shares or 0.0
+        p["value"] += h.value or 0.0
+
+    tickers = sorted(positions)
+    closes, missing = await get_closes(tickers)
+    tickers = [t for t in tickers if t not in missing]
+    if not tickers:
+        raise HTTPException(status_code=404, detail="No price history for any holding")
+
+    # Market values (shares at the last close, plus any value given directly)
+    last_prices = closes[tickers].ffill().iloc[-1].to_numpy(dtype=np.float64)
+    values = np.array([positions[t]["shares"] for t in tickers]) * last_prices
+    values += np.array([positions[t]["value"] for t in tickers])
+    total_value = float(values.sum())
+    if total_value <= 0:
+        raise HTTPException(status_code=400, detail="Portfolio value must be positive")
+    weights = values / total_value
+
+    returns = closes[tickers].pct_change(fill_method=None).iloc[1:].dropna(how="all")
+    returns = returns.tail(LOOKBACK_DAYS).fillna(0.0)  # a non-trading day counts as a flat day
+    if len(returns) < MIN_OBSERVATIONS:
+        raise HTTPException(status_code=400, detail="Not enough overlapping history for these holdings")
+    R = returns.to_numpy(dtype=np.float64)
+    horizon_scale = np.sqrt(request.horizon_days)
+
+    # Historical simulation
+    hist_returns = (R @ weights) * horizon_scale
+    historical = _estimate(hist_returns, request.confidence, total_value)
+
+    # Monte Carlo: one batched normal draw, projected onto the weights
+    mu, L = _mean_and_factor((tuple(tickers), returns.index[-1]), R)
+    rng = np.random.default_rng()
+    Z = rng.standard_normal((SIMULATION_PATHS, len(tickers)))
+    mc_returns = (mu @ weights) * request.horizon_days + (Z @ (L.T @ weights)) * horizon_scale
+    monte_carlo = _estimate(mc_returns, request.confidence, total_value)
+
+    return PortfolioRiskResponse(
+        total_value=round(total_value, 2),
+        confidence=request.confidence,
+        horizon_days=request.horizon_days,
+        weights={t: round(float(w), 6) for t, w in zip(tickers, weights)},
+        historical=historical,
+        monte_carlo=monte_carlo,
+        observations=len(R),
+        simulated_paths=SIMULATION_PATHS,
+        missing_tickers=missing,
+    )
@@ -0,0 +1,54 @@
+# /app/services/recommendation_cache.py
+import os
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from pymongo import ASCENDING
+
+from app.services.mongo_service import db
+
+# One document per user:
+#   {_id: user_id, profile_hash, text, generated_at}
+# A document only answers for the profile it was generated from.
+recommendations_collection = db["investment_recommendations"]
+
+FRESH_SECONDS = float(os.getenv("RECOMMENDATIONS_FRESH_SECONDS", str(7 * 86400)))
+MAX_AGE_SECONDS = int(os.getenv("RECOMMENDATIONS_MAX_AGE_SECONDS", str(30 * 86400)))
+
+# Profile fields the recommendation prompt is rendered from
+PROFILE_FIELDS = ("name", "dateOfBirth", "occupation", "currentSalary", "email")
+
+
+async def ensure_recommendation_indexes():
+    await recommendations_collection.create_index(
+        [("generated_at", ASCENDING)], expireAfterSeconds=MAX_AGE_SECONDS
+    )
+
+
+def profile_hash(user_data: dict) -> str:
+    """Hash of the profile fields the recommendations depend on."""
+    parts = [f"{field}={user_data.get(field)}" for field in PROFILE_FIELDS]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def age_seconds(doc: Dict) -> float:
+    generated_at = doc["generated_at"]
+    if generated_at.tzinfo is None:
+        generated_at = generated_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - generated_at).total_seconds()
+
+
+async def get_recommendations_doc(user_id: str, profile_digest: str) -> Optional[Dict]:
+    """Stored recommendations for this exact profile, or None."""
+    return await recommendations_collection.find_one({"_id": user_id, "profile_hash": profile_digest})
+
+
+async def save_recommendations(user_id: str, profile_digest: str, text: str) -> Dict:
+    doc = {"profile_hash": profile_digest, "text": text, "generated_at": datetime.now(timezone.utc)}
+    await recommendations_collection.update_one({"_id": user_id}, {"$set": doc}, upsert=True)
+    return {"_id": user_id, **doc}
+
+
+async def invalidate_recommendations(user_id: str):
+    """Drop a user's stored recommendations (call after a profile update)."""
+    await recommendations_collection.delete_one({"_id": user_id})
@@ -1,44 +1,89 @@
 # /app/services/recommendation_engine.py
-from app.services.risk_service import generate_risk_profile
-from app.services.yfinance_service import get_latest_price
-from app.models import RiskProfile
+import logging
+import asyncio
+from typing import List
+from app.services.risk_service import (
+    get_cached_metrics,
+    compute_risk_score,
+    risk_level_for,
+)
 from fastapi import HTTPException
 
+logger = logging.getLogger(__name__)
+
+MAX_WATCHLIST_SIZE = 100
+
+
+def _action_for(risk_level: str) -> str:
+    """Decide action from risk level."""
+    rl = risk_level.lower()
+    if rl in ("low",):
+        return "BUY"
+    elif rl in ("moderate", "medium"):
+        return "HOLD"
+    return "SELL"
+
+
 async def get_recommendation(ticker: str, user_salary: float) -> dict:
     """
     Generates a buy/sell/hold recommendation.
-    Uses async calls and awaits risk profile + latest price.
+    Needs only the ticker's metrics (cached; price comes from the same fetch),
+    not a full risk profile with suggestions.
     """
     try:
         # Ensure inputs
         if not ticker:
             raise HTTPException(status_code=400, detail="Ticker required")
+        if user_salary is None or user_salary <= 0:
+            raise HTTPException(status_code=400, detail="User salary (CTC) is missing or invalid.")
 
-        # Get risk profile (async)
-        risk: RiskProfile = await generate_risk_profile(ticker, user_salary)
-
-        # Get latest price
-        price = await get_latest_price(ticker)
-
-        # Decide action from risk level
-        rl = risk.risk_level.lower()
-        if rl in ("low",):
-            action = "BUY"
-        elif rl in ("moderate", "medium"):
-            action = "HOLD"
-        else:
-            action = "SELL"
+        metrics = await get_cached_metrics(ticker)
+        risk_score = compute_risk_score(metrics["volatility"], metrics["beta"], user_salary)
+        risk_level = risk_level_for(risk_score)
+        note = f"Volatility: {round(metrics['volatility'] * 100, 2)}%. Suggested based on your risk profile."
+        if metrics["beta"] is None:
+            note += " Beta unavailable; score uses volatility only."
 
         return {
             "ticker": ticker.upper(),
-            "current_price": float(price),
-            "risk_score": float(risk.risk_score),
-            "risk_level": risk.risk_level,
-            "recommendation": action,
-            "note": risk.suggestion_message
+            "current_price": float(metrics["price"]),
+            "risk_score": round(risk_score, 2),
+            "risk_level": risk_level,
+            "recommendation": _action_for(risk_level),
+            "note": note,
         }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] get_recommendation({ticker}): {e}")
+        logger.error("get_recommendation(%s): %s", ticker, e)
         raise HTTPException(status_code=500, detail="Failed to generate recommendation")
+
+
+async def get_recommendations(tickers: List[str], user_salary: float) -> List[dict]:
+    """
+    Recommendations for a whole watchlist in one concurrent pass.
+    Failed tickers are returned with an "error" entry instead of failing the batch.
+    """
+    if user_salary is None or user_salary <= 0:
+        raise HTTPException(status_code=400, detail="User salary (CTC) is missing or invalid.")
+
+    unique = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if not unique:
+        raise HTTPException(status_code=400, detail="At least one ticker is required")
+    if len(unique) > MAX_WATCHLIST_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_WATCHLIST_SIZE} tickers per request")
+
+    results = await asyncio.gather(
+        *(get_recommendation(t, user_salary) for t in unique),
+        return_exceptions=True,
+    )
+
+    out = []
+    for ticker, res in zip(unique, results):
+        if isinstance(res, HTTPException):
+            out.append({"ticker": ticker, "error": res.detail})
+        elif isinstance(res, Exception):
+            out.append({"ticker": ticker, "error": "Failed to generate recommendation"})
+        else:
+            out.append(res)
+    return out
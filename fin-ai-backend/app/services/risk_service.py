@@ -1,82 +1,323 @@
 # /app/services/risk_service.py
+import logging
+import os
+import time
 import numpy as np
 import asyncio
 import random
+from collections import OrderedDict, deque
 from fastapi import HTTPException
+from typing import Dict, Optional, Tuple
 from app.models import RiskProfile, SuggestedStock
 from app.services.yfinance_service import (
     get_ticker_info_async,
     fetch_stock_data_async,
+    benchmark_for,
+    to_daily_returns,
+    get_benchmark_returns_async,
 )
+from app.services.universe_service import (
+    HIGH_VOL_STOCKS,
+    MED_VOL_STOCKS,
+    LOW_VOL_STOCKS,
+    get_universe_table,
+    get_universe_as_of,
+    get_correlation_tracker,
+)
+from app.services.shared_cache import shared_get, shared_set
+
+logger = logging.getLogger(__name__)
+
+# Salary normalization: the salary factor saturates at this CTC
+MAX_SALARY_BENCHMARK = 300000.0
+SALARY_BUCKET_SIZE = 10000.0
+
+METRICS_CACHE_SECONDS = float(os.getenv("RISK_METRICS_CACHE_SECONDS", "900"))
+METRICS_CACHE_SIZE = int(os.getenv("RISK_METRICS_CACHE_SIZE", "1024"))
+PROFILE_CACHE_SIZE = int(os.getenv("RISK_PROFILE_CACHE_SIZE", "4096"))
+
+# Live suggestion lookups (only used before the universe table is ready)
+SUGGESTION_DEADLINE_SECONDS = float(os.getenv("RISK_SUGGESTION_DEADLINE_SECONDS", "2.0"))
+SUGGESTION_HEDGE_DELAY_SECONDS = float(os.getenv("RISK_SUGGESTION_HEDGE_DELAY_SECONDS", "0.5"))
+SUGGESTION_HEDGE_EXTRA = 3
+
+# ticker -> (monotonic fetch time, metrics), least recently used first; metrics["as_of"] is the date of the last bar
+_metrics_cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+_metrics_inflight: Dict[str, asyncio.Task] = {}
+# (ticker, salary bucket, suggestion buckets) -> ((metrics as_of, universe as_of), profile)
+_profile_cache: "OrderedDict[Tuple[str, int, tuple], Tuple[tuple, RiskProfile]]" = OrderedDict()
+
+
+def suggestion_buckets(risk_score: float) -> list:
+    """Volatility buckets to draw suggestions from, by risk score."""
+    if risk_score > 70:
+        return ["high", "medium"]
+    elif risk_score > 50:
+        return ["medium", "low"]
+    return ["low"]
+
+
+def suggest_from_table(table, ticker: str, risk_score: float, count: int = 5, correlations=None) -> list:
+    """
+    Pick suggestions from the precomputed universe table (no upstream calls).
+    With `correlations` (ticker -> correlation to the analysed ticker) the least
+    correlated candidates are picked; otherwise a random sample.
+    """
+    candidates = table[table["vol_bucket"].isin(suggestion_buckets(risk_score))]
+    candidates = candidates[candidates.index != ticker.upper()]
+    if correlations is not None:
+        ranked = correlations.reindex(candidates.index).sort_values(na_position="last")
+        picked = list(ranked.index[:count])
+    else:
+        picked = random.sample(list(candidates.index), min(count, len(candidates)))
+    return [
+        SuggestedStock(
+            ticker=tk,
+            name=candidates.at[tk, "name"],
+            price=float(candidates.at[tk, "price"]),
+            beta=float(candidates.at[tk, "beta"]),
+            correlation=_optional_float(correlations.get(tk)) if correlations is not None else None,
+        )
+        for tk in picked
+    ]
+
+
+def _optional_float(value):
+    return None if value is None or np.isnan(value) else round(float(value), 4)
+
+
+def correlations_to(ticker: str, metrics: dict):
+    """
+    Correlation of `ticker` with every universe ticker: a row lookup for
+    universe members, one pass over the correlation window otherwise.
+    """
+    tracker = get_correlation_tracker()
+    if tracker is None:
+        return None
+    correlations = tracker.correlations_for(ticker.upper())
+    if correlations is None and metrics.get("returns") is not None:
+        correlations = tracker.correlations_with(metrics["returns"])
+    return correlations
+
+
+def compute_beta(returns, benchmark_returns, min_observations: int = 20):
+    """
+    Beta and correlation of a daily return series against a benchmark, over the
+    dates both have. Returns (beta, correlation); (None, None) if the overlap is
+    too short or either series is flat, so no estimate is passed off as real.
+    """
+    aligned = np.column_stack(
+        returns.align(benchmark_returns, join="inner")
+    ).astype(np.float64)
+    aligned = aligned[~np.isnan(aligned).any(axis=1)]
+    if len(aligned) < min_observations:
+        return None, None
+    cov = np.cov(aligned, rowvar=False)
+    if cov[1, 1] <= 0 or cov[0, 0] <= 0:
+        return None, None
+    beta = cov[0, 1] / cov[1, 1]
+    correlation = cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1])
+    return float(beta), float(correlation)
 
-# Dynamic pools (expandable)
-HIGH_VOL_STOCKS = [
-    "TSLA","NVDA","COIN","AMD","SHOP","SQ","META","NFLX","PLTR","AFRM",
-    "RIVN","SNAP","UBER","ABNB","CRWD","DDOG","ROKU","LI"
-]
-MED_VOL_STOCKS = [
-    "AAPL","MSFT","AMZN","GOOG","V","MA","JPM","COST","AVGO","ORCL",
-    "HD","ADBE","INTC","CSCO","QCOM","TXN","DIS"
-]
-LOW_VOL_STOCKS = [
-    "PG","JNJ","KO","MCD","PEP","MRK","WMT","UNH","HD","COST",
-    "CVS","T","VZ","PFE"
-]
 
 async def get_stock_metrics(ticker: str) -> dict:
-    """Fetch history and compute volatility & beta with robust fallback."""
+    """
+    Fetch 1y history and compute price, volatility, and beta/correlation against
+    the ticker's benchmark. The benchmark series is cached, so this is one download.
+    beta and correlation are None when they cannot be estimated.
+    """
     try:
         history = await fetch_stock_data_async(ticker, period="1y", interval="1d")
         if history is None or history.empty:
             raise HTTPException(status_code=404, detail="No historical data found")
 
-        history["Daily_Return"] = history["Close"].pct_change()
-        volatility = history["Daily_Return"].std() * np.sqrt(252)
+        returns = to_daily_returns(history["Close"])
+        volatility = returns.std() * np.sqrt(252)
         volatility = float(volatility) if not np.isnan(volatility) else 0.0
 
-        info = await get_ticker_info_async(ticker)
-        price = info.get("last_price") or float(history["Close"].iloc[-1])
-        beta = info.get("beta") or 1.0
+        benchmark = benchmark_for(ticker)
         try:
-            beta = float(beta)
-        except:
-            beta = 1.0
+            benchmark_returns = await get_benchmark_returns_async(benchmark)
+            beta, correlation = compute_beta(returns, benchmark_returns)
+        except Exception as e:
+            logger.warning("benchmark %s unavailable for %s: %s", benchmark, ticker, e)
+            beta, correlation = None, None
+
+        price = float(history["Close"].iloc[-1])
 
-        return {"price": float(price), "beta": beta, "volatility": float(volatility)}
+        return {
+            "price": price,
+            "beta": beta,
+            "volatility": float(volatility),
+            "correlation": correlation,
+            "benchmark": benchmark,
+            "as_of": returns.index[-1].date().isoformat() if len(returns) else None,
+            "returns": returns,
+        }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] get_stock_metrics({ticker}): {e}")
+        logger.error("get_stock_metrics(%s): %s", ticker, e)
         raise HTTPException(status_code=500, detail="Failed to fetch stock metrics")
 
 
+async def _load_metrics(ticker: str) -> Tuple[dict, float]:
+    """(metrics, age in seconds): from the shared cache tier if another worker fetched them, else upstream."""
+    hit = await shared_get("risk_metrics", ticker)
+    if hit is not None:
+        return hit
+    metrics = await get_stock_metrics(ticker)
+    await shared_set("risk_metrics", ticker, metrics, METRICS_CACHE_SECONDS)
+    return metrics, 0.0
+
+
+async def get_cached_metrics(ticker: str) -> dict:
+    """
+    get_stock_metrics behind a short TTL cache (falling through to the shared
+    tier), with concurrent misses for the same ticker sharing one fetch. When a
+    refetch shows a newer last bar, the ticker's memoized profiles are dropped.
+    """
+    key = ticker.upper()
+    cached = _metrics_cache.get(key)
+    if cached:
+        if time.monotonic() - cached[0] < METRICS_CACHE_SECONDS:
+            _metrics_cache.move_to_end(key)
+            return cached[1]
+        # Expired: keep `cached` only to compare as_of after the refetch
+        _metrics_cache.pop(key, None)
+
+    task = _metrics_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_load_metrics(key))
+        _metrics_inflight[key] = task
+        task.add_done_callback(lambda _t: _metrics_inflight.pop(key, None))
+    metrics, age = await asyncio.shield(task)
+
+    if cached and cached[1].get("as_of") != metrics.get("as_of"):
+        invalidate_ticker(key)
+    # Entries from the shared tier keep their original age, so the TTL is not extended
+    _metrics_cache[key] = (time.monotonic() - age, metrics)
+    _metrics_cache.move_to_end(key)
+    while len(_metrics_cache) > METRICS_CACHE_SIZE:
+        _metrics_cache.popitem(last=False)
+    return metrics
+
+
+def invalidate_ticker(ticker: str):
+    """Drop cached metrics and profiles for one ticker."""
+    key = ticker.upper()
+    _metrics_cache.pop(key, None)
+    for cache_key in [k for k in _profile_cache if k[0] == key]:
+        _profile_cache.pop(cache_key, None)
+
+
+def salary_bucket(user_salary: float) -> int:
+    """Profiles are memoized per bucket; every salary above the benchmark shares one."""
+    return int(min(user_salary, MAX_SALARY_BENCHMARK) // SALARY_BUCKET_SIZE)
+
+
+def compute_risk_score(volatility: float, beta: Optional[float], user_salary: float) -> float:
+    """
+    Composite 1-99 risk score from volatility, beta and salary. Without a beta
+    estimate the score rests on volatility and salary only; no market beta is assumed.
+    """
+    salary_factor = 1 - min(user_salary, MAX_SALARY_BENCHMARK) / MAX_SALARY_BENCHMARK
+    beta_term = beta * 10 * 0.3 if beta is not None else 0.0
+    risk_score = (volatility * 100 * 0.6) + beta_term + (salary_factor * 25)
+    return float(min(max(risk_score, 1.0), 99.0))
+
+
+def risk_level_for(risk_score: float) -> str:
+    if risk_score > 75:
+        return "Very High"
+    elif risk_score > 55:
+        return "High"
+    elif risk_score > 35:
+        return "Moderate"
+    return "Low"
+
+
 async def generate_risk_profile(ticker: str, user_salary: float) -> RiskProfile:
-    """Create a user-specific risk profile and dynamic suggestions."""
+    """
+    Create a user-specific risk profile and dynamic suggestions.
+    Profiles are memoized per (ticker, salary bucket, suggestion band) until new
+    bars arrive; the score itself is always computed for the exact salary.
+    """
     if user_salary is None or user_salary <= 0:
         raise HTTPException(status_code=400, detail="User salary (CTC) is missing or invalid.")
 
-    metrics = await get_stock_metrics(ticker)
+    metrics = await get_cached_metrics(ticker)
     volatility = metrics["volatility"]
     beta = metrics["beta"]
 
-    # Salary normalization
-    MAX_SALARY_BENCHMARK = 300000.0
-    salary_factor = 1 - min(user_salary, MAX_SALARY_BENCHMARK) / MAX_SALARY_BENCHMARK
+    risk_score = compute_risk_score(volatility, beta, user_salary)
+    risk_level = risk_level_for(risk_score)
 
-    # Composite risk score
-    risk_score = (volatility * 100 * 0.6) + (beta * 10 * 0.3) + (salary_factor * 25)
-    risk_score = float(min(max(risk_score, 1.0), 99.0))
+    # The band is part of the key: a salary bucket can straddle the 50/70 suggestion thresholds
+    cache_key = (ticker.upper(), salary_bucket(user_salary), tuple(suggestion_buckets(risk_score)))
+    version = (metrics.get("as_of"), get_universe_as_of())
+    cached = _profile_cache.get(cache_key)
+    if cached and cached[0] == version:
+        _profile_cache.move_to_end(cache_key)
+        return cached[1].model_copy(update={
+            "user_salary": user_salary,
+            "risk_score": round(risk_score, 2),
+            "risk_level": risk_level,
+        })
 
-    # Risk level
-    if risk_score > 75:
-        risk_level = "Very High"
-    elif risk_score > 55:
-        risk_level = "High"
-    elif risk_score > 35:
-        risk_level = "Moderate"
+    table = get_universe_table()
+    if table is not None and not table.empty:
+        suggestions = suggest_from_table(table, ticker, risk_score, correlations=correlations_to(ticker, metrics))
     else:
-        risk_level = "Low"
+        suggestions = await fetch_live_suggestions(ticker, risk_score)
+
+    message = f"Volatility: {round(volatility * 100, 2)}%. Suggested based on your risk profile."
+    if beta is None:
+        message += f" Beta against {metrics.get('benchmark')} could not be estimated; the score uses volatility only."
+
+    profile = RiskProfile(
+        ticker=ticker.upper(),
+        price=metrics["price"],
+        volatility=metrics["volatility"],
+        beta=beta,
+        correlation=metrics.get("correlation"),
+        benchmark=metrics.get("benchmark"),
+        user_salary=user_salary,
+        risk_score=round(risk_score, 2),
+        risk_level=risk_level,
+        suggestion_message=message,
+        suggested_stocks=suggestions[:5]
+    )
+    # Live-fallback suggestions are not cached: they may be the hardcoded placeholders
+    if table is not None and not table.empty:
+        _profile_cache[cache_key] = (version, profile)
+        if len(_profile_cache) > PROFILE_CACHE_SIZE:
+            _profile_cache.popitem(last=False)
+    return profile
+
+
+def _suggestion_from_info(ticker: str, info: dict):
+    """SuggestedStock from ticker info, or None if it has no usable price."""
+    if not info:
+        return None
+    price = info.get("last_price") or info.get("raw_info", {}).get("regularMarketPrice")
+    if price is None:
+        return None
+    try:
+        beta_val = float(info["beta"]) if info.get("beta") is not None else None
+    except (TypeError, ValueError):
+        beta_val = None
+    return SuggestedStock(ticker=ticker, name=info.get("shortName") or ticker, price=float(price), beta=beta_val)
 
+
+async def fetch_live_suggestions(ticker: str, risk_score: float, count: int = 5) -> list:
+    """
+    Fallback before the universe table is ready: fetch info live for sampled seed tickers.
+    Starts `count` lookups at once, replaces failures immediately, adds
+    SUGGESTION_HEDGE_EXTRA hedged lookups if the first ones are slow, and
+    returns whatever succeeded by SUGGESTION_DEADLINE_SECONDS. Lookups still
+    running at that point are cancelled.
+    """
     # --- Updated: Suggestion pool based on risk_score ---
     if risk_score > 70:
         suggestion_pool = HIGH_VOL_STOCKS + MED_VOL_STOCKS
@@ -85,45 +326,54 @@ async def generate_risk_profile(ticker: str, user_salary: float) -> RiskProfile:
     else:
         suggestion_pool = LOW_VOL_STOCKS
 
-    # Remove input ticker from suggestions
+    # Remove input ticker from suggestions; the other buckets are only used once the pool runs out
     suggestion_pool = [tk for tk in suggestion_pool if tk.upper() != ticker.upper()]
+    fallback_pool = [
+        tk for tk in MED_VOL_STOCKS + LOW_VOL_STOCKS + HIGH_VOL_STOCKS
+        if tk.upper() != ticker.upper() and tk not in suggestion_pool
+    ]
+    candidates = deque(
+        random.sample(suggestion_pool, len(suggestion_pool))
+        + random.sample(fallback_pool, min(10, len(fallback_pool)))
+    )
 
-    sample_count = min(len(suggestion_pool), 7)
-    sampled = random.sample(suggestion_pool, sample_count)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SUGGESTION_DEADLINE_SECONDS
+    hedge_at = loop.time() + SUGGESTION_HEDGE_DELAY_SECONDS
+    pending: Dict[asyncio.Task, str] = {}
 
-    # Fetch metadata concurrently
-    tasks = [get_ticker_info_async(tk) for tk in sampled]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    def launch(n: int):
+        for _ in range(n):
+            if not candidates:
+                return
+            tk = candidates.popleft()
+            pending[asyncio.create_task(get_ticker_info_async(tk))] = tk
 
     suggestions = []
-    for i, res in enumerate(results):
-        if isinstance(res, Exception) or res is None:
-            continue
-        price = res.get("last_price") or res.get("raw_info", {}).get("regularMarketPrice")
-        if price is None:
-            continue
-        short_name = res.get("shortName") or sampled[i]
-        beta_val = res.get("beta") or 1.0
-        try:
-            beta_val = float(beta_val)
-        except:
-            beta_val = 1.0
-        suggestions.append(SuggestedStock(ticker=sampled[i], name=short_name, price=float(price), beta=beta_val))
-
-    # Guarantee at least 3 suggestions
-    if len(suggestions) < 3:
-        fallback_pool = MED_VOL_STOCKS + LOW_VOL_STOCKS + HIGH_VOL_STOCKS
-        for tk in random.sample(fallback_pool, min(10, len(fallback_pool))):
-            try:
-                info = await get_ticker_info_async(tk)
-            except:
-                continue
-            price = info.get("last_price") or info.get("raw_info", {}).get("regularMarketPrice")
-            if price is None:
-                continue
-            suggestions.append(SuggestedStock(ticker=tk, name=info.get("shortName") or tk, price=float(price), beta=(info.get("beta") or 1.0)))
-            if len(suggestions) >= 3:
+    hedged = False
+    launch(count)
+    try:
+        while len(suggestions) < count:
+            now = loop.time()
+            if now >= deadline:
+                break
+            if not hedged and now >= hedge_at:
+                hedged = True
+                launch(SUGGESTION_HEDGE_EXTRA)
+            if not pending:
                 break
+            wake = deadline if hedged else min(deadline, hedge_at)
+            done, _ = await asyncio.wait(pending, timeout=wake - now, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tk = pending.pop(task)
+                suggestion = None if task.exception() else _suggestion_from_info(tk, task.result())
+                if suggestion is None:
+                    launch(1)
+                elif len(suggestions) < count:
+                    suggestions.append(suggestion)
+    finally:
+        for task in pending:
+            task.cancel()
 
     # Last-chance fallback
     if len(suggestions) < 3:
@@ -131,19 +381,10 @@ async def generate_risk_profile(ticker: str, user_salary: float) -> RiskProfile:
             SuggestedStock(ticker="AAPL", name="Apple Inc.", price=0.0, beta=1.0),
             SuggestedStock(ticker="MSFT", name="Microsoft Corp.", price=0.0, beta=1.0),
             SuggestedStock(ticker="GOOGL", name="Alphabet Inc.", price=0.0, beta=1.0),
+            SuggestedStock(ticker="AMZN", name="Amazon.com Inc.", price=0.0, beta=1.0),
         ]
+        taken = {s.ticker for s in suggestions} | {ticker.upper()}
+        hardcoded = [h for h in hardcoded if h.ticker not in taken]
         suggestions.extend(hardcoded[: (3 - len(suggestions))])
 
-    message = f"Volatility: {round(volatility * 100, 2)}%. Suggested based on your risk profile."
-
-    return RiskProfile(
-        ticker=ticker.upper(),
-        price=metrics["price"],
-        volatility=metrics["volatility"],
-        beta=beta,
-        user_salary=user_salary,
-        risk_score=round(risk_score, 2),
-        risk_level=risk_level,
-        suggestion_message=message,
-        suggested_stocks=suggestions[:5]
-    )
+    return suggestions
@@ -1,6 +1,20 @@
 # app/services/sentiment_service.py
+import logging
+import os
+import asyncio
+import hashlib
 import subprocess
 from enum import Enum
+from app.services.llm_gateway import gateway
+from app.services.shared_cache import shared_get, shared_set
+from app.services.logging_service import sampled
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3:instruct")
+OLLAMA_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", "20"))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+SENTIMENT_CACHE_SECONDS = float(os.getenv("SENTIMENT_CACHE_SECONDS", str(7 * 86400)))
 
 class SentimentResult(str, Enum):
     POSITIVE = "Positive"
@@ -14,10 +28,10 @@ def query_ollama(prompt: str) -> str:
     """
     try:
         result = subprocess.run(
-            ["ollama", "run", "llama3:instruct", prompt],
+            ["ollama", "run", OLLAMA_MODEL, prompt],
             capture_output=True,
             text=True,
-            timeout=20,  # Increased timeout for longer financial texts
+            timeout=OLLAMA_TIMEOUT_SECONDS,  # Increased timeout for longer financial texts
             check=True
         )
         output = result.stdout.strip()
@@ -26,33 +40,90 @@ def query_ollama(prompt: str) -> str:
             return "Neutral"
         return output
     except subprocess.TimeoutExpired:
-        print("Ollama timeout, returning Neutral sentiment")
+        logger.warning("Ollama timeout, returning Neutral sentiment")
         return "Neutral"
     except Exception as e:
-        print("Ollama sentiment analysis failed:", e)
+        logger.warning("Ollama sentiment analysis failed: %s", e)
         return "Neutral"
 
-def get_sentiment(text: str) -> SentimentResult:
-    """
-    Returns Positive / Negative / Neutral even if Ollama crashes or times out.
-    """
-    if not text or not text.strip():
-        return SentimentResult.NEUTRAL
+async def _ollama_generate(prompt: str):
+    """Ollama backend for the gateway: runs the CLI without blocking the event loop."""
+    proc = await asyncio.create_subprocess_exec(
+        "ollama", "run", OLLAMA_MODEL, prompt,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        # Timed out or the caller went away: don't leave the model process running
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise RuntimeError(f"ollama exited with {proc.returncode}: {stderr.decode(errors='replace').strip()[:200]}")
+    return stdout.decode(errors="replace").strip(), None
+
+
+gateway.register(
+    "ollama",
+    generate=_ollama_generate,
+    max_concurrency=OLLAMA_MAX_CONCURRENCY,
+    timeout=OLLAMA_TIMEOUT_SECONDS,
+)
+
 
-    prompt = f"""
+def _sentiment_prompt(text: str) -> str:
+    return f"""
     Analyze the sentiment of the following financial text.
     Reply with one word only: Positive, Negative, or Neutral.
 
     Text: "{text}"
     """
-    response = query_ollama(prompt).lower()
 
+
+def _parse_sentiment(response: str) -> SentimentResult:
+    response = response.lower()
     if "positive" in response:
         return SentimentResult.POSITIVE
     if "negative" in response:
         return SentimentResult.NEGATIVE
     return SentimentResult.NEUTRAL
 
+
+async def get_sentiment_async(text: str) -> SentimentResult:
+    """
+    get_sentiment through the LLM gateway: bounded concurrency, identical
+    texts in flight share one model call, Neutral on failure. Results are kept
+    in the shared cache tier, so a headline is scored once across workers.
+    """
+    if not text or not text.strip():
+        return SentimentResult.NEUTRAL
+    key = hashlib.sha256(f"{OLLAMA_MODEL}|{text.strip()}".encode("utf-8")).hexdigest()
+    hit = await shared_get("llm_sentiment", key)
+    if hit is not None:
+        return SentimentResult(hit[0])
+    try:
+        response = await gateway.generate("ollama", _sentiment_prompt(text))
+    except Exception as e:
+        # One per headline while Ollama is down, so sampled
+        logger.warning("Ollama sentiment analysis failed: %s", e, extra=sampled(20))
+        return SentimentResult.NEUTRAL
+    result = _parse_sentiment(response or "Neutral")
+    # Failures above return without caching, so a transient outage is not remembered
+    await shared_set("llm_sentiment", key, result.value, SENTIMENT_CACHE_SECONDS)
+    return result
+
+
+def get_sentiment(text: str) -> SentimentResult:
+    """
+    Returns Positive / Negative / Neutral even if Ollama crashes or times out.
+    """
+    if not text or not text.strip():
+        return SentimentResult.NEUTRAL
+
+    return _parse_sentiment(query_ollama(_sentiment_prompt(text)))
+
 def analyze_latest_news(news_articles: list[dict]):
     """
     Receives a list of articles and performs sentiment analysis.
@@ -0,0 +1,238 @@
+# /app/services/sentiment_store.py
+import logging
+import os
+import time
+import socket
+import asyncio
+import hashlib
+import secrets
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.services.mongo_service import db
+from app.services.yfinance_service import get_stock_news_async
+from app.services.finbert_service import score_texts
+
+logger = logging.getLogger(__name__)
+
+# One document per scored headline, unique on (symbol, headline_id):
+#   {symbol, headline_id, date: "YYYY-MM-DD", score, scored_at}
+# The daily score is the mean over that day's headlines, aggregated on read.
+# Inserting is idempotent, so overlapping refreshes cannot count a headline twice.
+headline_sentiment_collection = db["headline_sentiment"]
+# {_id: <lease name>, owner, expires_at}: which worker runs the background refresher
+leases_collection = db["background_leases"]
+
+DEFAULT_SYMBOLS = [
+    "AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "NVDA", "META",
+    "NFLX", "JPM", "BAC", "WMT", "DIS", "INTC", "AMD",
+]
+REFRESH_INTERVAL_SECONDS = float(os.getenv("SENTIMENT_REFRESH_SECONDS", "1800"))
+MAX_STALENESS_DAYS = int(os.getenv("SENTIMENT_MAX_STALENESS_DAYS", "7"))
+# Symbols requested by users are refreshed until they go unrequested this long
+REQUESTED_SYMBOL_TTL_SECONDS = float(os.getenv("SENTIMENT_REQUESTED_SYMBOL_TTL_SECONDS", "86400"))
+MAX_REQUESTED_SYMBOLS = int(os.getenv("SENTIMENT_MAX_REQUESTED_SYMBOLS", "200"))
+
+REFRESHER_LEASE = "sentiment_refresher"
+# Long enough to cover a slow pass; a dead holder is replaced after this
+LEASE_SECONDS = REFRESH_INTERVAL_SECONDS * 2 + 60
+_lease_owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+
+# Symbols the refresher always keeps up to date
+_configured_symbols = set(
+    s.strip().upper()
+    for s in os.getenv("SENTIMENT_STORE_SYMBOLS", ",".join(DEFAULT_SYMBOLS)).split(",")
+    if s.strip()
+)
+# Other symbols served recently: symbol -> monotonic time of the last refresh a request triggered
+_requested_symbols: "OrderedDict[str, float]" = OrderedDict()
+_refreshing: Dict[str, asyncio.Task] = {}
+
+
+async def ensure_sentiment_indexes():
+    await headline_sentiment_collection.create_index(
+        [("symbol", ASCENDING), ("headline_id", ASCENDING)], unique=True
+    )
+    await headline_sentiment_collection.create_index([("symbol", ASCENDING), ("date", DESCENDING)])
+
+
+def _headline_id(title: str) -> str:
+    return hashlib.sha1(title.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+def _published_date(value) -> str:
+    """News publish time (epoch seconds or ISO string) -> UTC date string."""
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc).date().isoformat()
+        if isinstance(value, str) and value:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).date().isoformat()
+    except (ValueError, OSError, OverflowError):
+        pass
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _tracked_symbols() -> List[str]:
+    """Configured symbols plus requested ones that have not expired."""
+    cutoff = time.monotonic() - REQUESTED_SYMBOL_TTL_SECONDS
+    while _requested_symbols:
+        symbol, requested_at = next(iter(_requested_symbols.items()))
+        if requested_at >= cutoff:
+            break
+        _requested_symbols.popitem(last=False)
+    return sorted(_configured_symbols | set(_requested_symbols))
+
+
+# ===============================
+#        INCREMENTAL FILL
+# ===============================
+
+async def refresh_symbol(symbol: str) -> int:
+    """Score headlines not yet in the store for one symbol. Returns how many were added."""
+    symbol = symbol.upper()
+    news = await get_stock_news_async(symbol)
+    if not news:
+        return 0
+
+    # Current feed, deduplicated by headline
+    feed: Dict[str, tuple] = {}
+    for item in news:
+        title = item.get("title") or ""
+        day = _published_date(item.get("providerPublishTime"))
+        feed.setdefault(_headline_id(title), (day, f"{title} {item.get('summary', '')}"))
+
+    # Skip headlines that were already scored on an earlier run (saves FinBERT work;
+    # the unique index is what keeps counts right if two refreshes overlap)
+    existing = headline_sentiment_collection.find(
+        {"symbol": symbol, "headline_id": {"$in": list(feed)}},
+        {"headline_id": 1},
+    )
+    async for doc in existing:
+        feed.pop(doc["headline_id"], None)
+    if not feed:
+        return 0
+
+    pending = list(feed.items())
+    scores = await asyncio.to_thread(score_texts, [text for _, (_, text) in pending])
+
+    now = datetime.now(timezone.utc)
+    requests = [
+        UpdateOne(
+            {"symbol": symbol, "headline_id": hid},
+            {"$setOnInsert": {"date": day, "score": float(score), "scored_at": now}},
+            upsert=True,
+        )
+        for (hid, (day, _)), score in zip(pending, scores)
+    ]
+    try:
+        result = await headline_sentiment_collection.bulk_write(requests, ordered=False)
+        return result.upserted_count
+    except BulkWriteError as e:
+        # Duplicate keys mean another refresh stored the headline first
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nUpserted", 0)
+
+
+async def _refresh_once(symbol: str) -> int:
+    """refresh_symbol, sharing a refresh of the same symbol that is already running."""
+    task = _refreshing.get(symbol)
+    if task is None:
+        task = asyncio.create_task(refresh_symbol(symbol))
+        _refreshing[symbol] = task
+        task.add_done_callback(lambda _: _refreshing.pop(symbol, None))
+    return await asyncio.shield(task)
+
+
+async def refresh_sentiment_store(symbols: Optional[List[str]] = None):
+    """One pass over the tracked symbols."""
+    for symbol in symbols or _tracked_symbols():
+        try:
+            added = await _refresh_once(symbol)
+            if added:
+                logger.info("sentiment store: %s +%s headlines", symbol, added)
+        except Exception as e:
+            logger.warning("sentiment store refresh(%s) failed: %s", symbol, e)
+
+
+async def _acquire_lease() -> bool:
+    """
+    Take or renew the refresher lease. Only the holder runs passes, so with
+    several uvicorn workers the store is refreshed by one of them at a time.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await leases_collection.update_one(
+            {"_id": REFRESHER_LEASE, "$or": [{"owner": _lease_owner}, {"expires_at": {"$lte": now}}]},
+            {"$set": {"owner": _lease_owner, "expires_at": now + timedelta(seconds=LEASE_SECONDS)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        # Held by another worker: the filter did not match and the upsert hit its _id
+        return False
+
+
+async def run_sentiment_refresher(interval: float = REFRESH_INTERVAL_SECONDS):
+    """Background task: keep the sentiment store filled while this worker holds the lease."""
+    while True:
+        try:
+            if await _acquire_lease():
+                await refresh_sentiment_store()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("run_sentiment_refresher: %s", e)
+        await asyncio.sleep(interval)
+
+
+def _schedule_refresh(symbol: str):
+    """Refresh a requested symbol in the background, at most once per refresh interval."""
+    now = time.monotonic()
+    last = _requested_symbols.get(symbol)
+    if last is not None and now - last < REFRESH_INTERVAL_SECONDS:
+        return
+    _requested_symbols[symbol] = now
+    _requested_symbols.move_to_end(symbol)
+    while len(_requested_symbols) > MAX_REQUESTED_SYMBOLS:
+        _requested_symbols.popitem(last=False)
+    task = asyncio.create_task(_refresh_once(symbol))
+    task.add_done_callback(_log_refresh_error)
+
+
+def _log_refresh_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("sentiment store refresh failed: %s", task.exception())
+
+
+# ===============================
+#            SERVING
+# ===============================
+
+async def get_latest_sentiment(symbol: str) -> Optional[float]:
+    """
+    Latest stored daily sentiment for a symbol, or None if there is nothing
+    recent. Symbols outside the configured set are refreshed in the background
+    while they keep being requested.
+    """
+    symbol = symbol.upper()
+    if symbol not in _configured_symbols:
+        _schedule_refresh(symbol)
+
+    today = datetime.now(timezone.utc).date()  # stored dates are UTC days
+    cursor = headline_sentiment_collection.aggregate([
+        {"$match": {
+            "symbol": symbol,
+            "date": {"$gte": (today - timedelta(days=MAX_STALENESS_DAYS)).isoformat(), "$lte": today.isoformat()},
+        }},
+        {"$group": {"_id": "$date", "score_sum": {"$sum": "$score"}, "count": {"$sum": 1}}},
+        {"$sort": {"_id": -1}},
+        {"$limit": 1},
+    ])
+    docs = await cursor.to_list(length=1)
+    if not docs or not docs[0]["count"]:
+        return None
+    return float(docs[0]["score_sum"] / docs[0]["count"])
@@ -0,0 +1,224 @@
+# /app/services/shared_cache.py
+import logging
+import io
+import os
+import json
+import zlib
+import asyncio
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+from pymongo import ASCENDING
+
+from app.services.mongo_service import db
+from app.services.logging_service import sampled
+
+logger = logging.getLogger(__name__)
+
+# Second cache tier shared by every worker. One document per entry:
+#   {_id: "<namespace>:<key>", fmt: "json" | "npy" | "npz", z: bool, data: <bytes>, stored_at, expires_at}
+# In-process caches check this before going upstream and write back what they fetch.
+shared_cache_collection = db["shared_cache"]
+
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true"
+COMPRESS = os.getenv("SHARED_CACHE_COMPRESS", "true").lower() == "true"
+COMPRESS_MIN_BYTES = int(os.getenv("SHARED_CACHE_COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = 1  # payloads are mostly float arrays; higher levels buy little
+MAX_PAYLOAD_BYTES = int(os.getenv("SHARED_CACHE_MAX_PAYLOAD_BYTES", str(4 * 1024 * 1024)))
+# A slow or unreachable Mongo must not slow requests down more than this
+TIMEOUT_SECONDS = float(os.getenv("SHARED_CACHE_TIMEOUT_SECONDS", "0.5"))
+
+_META_FIELD = "__meta__"
+_ROOT = "__root__"
+
+# namespace -> counters
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+async def ensure_shared_cache_indexes():
+    await shared_cache_collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+
+def _count(namespace: str, counter: str, amount: int = 1):
+    stats = _stats.setdefault(namespace, {"hits": 0, "misses": 0, "writes": 0, "errors": 0, "bytes_written": 0})
+    stats[counter] += amount
+
+
+# ===============================
+#            ENCODING
+# ===============================
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _split_series(name: str, series: pd.Series, arrays: Dict[str, np.ndarray]) -> dict:
+    """Store a Series as value + index arrays; returns how to rebuild it."""
+    spec = {"kind": "series", "name": series.name}
+    arrays[f"{name}.values"] = np.asarray(series.values)
+    index = series.index
+    if isinstance(index, pd.DatetimeIndex):
+        spec["index"] = "datetime"
+        spec["tz"] = str(index.tz) if index.tz is not None else None
+        # UTC wall times; datetime64 is stored natively by .npy, no pickling
+        arrays[f"{name}.index"] = index.values.astype("datetime64[ns]")
+    elif index.dtype.kind in "iuf":
+        spec["index"] = "array"
+        arrays[f"{name}.index"] = np.asarray(index)
+    else:
+        spec["index"] = "list"
+        spec["labels"] = [str(label) for label in index]
+    return spec
+
+
+def _join_series(name: str, spec: dict, arrays) -> pd.Series:
+    values = arrays[f"{name}.values"]
+    if spec["index"] == "datetime":
+        index = pd.DatetimeIndex(arrays[f"{name}.index"])
+        if spec.get("tz"):
+            index = index.tz_localize("UTC").tz_convert(spec["tz"])
+    elif spec["index"] == "array":
+        index = arrays[f"{name}.index"]
+    else:
+        index = spec["labels"]
+    return pd.Series(values, index=index, name=spec.get("name"))
+
+
+def encode(value: Any) -> Tuple[str, bytes]:
+    """
+    Compact bytes for a cache value: JSON for plain data, .npy for a bare
+    array, and .npz (arrays + a JSON meta entry) for Series or dicts holding
+    arrays/Series, so numeric payloads are stored as raw binary.
+    """
+    if isinstance(value, np.ndarray):
+        buffer = io.BytesIO()
+        np.save(buffer, value, allow_pickle=False)
+        return "npy", buffer.getvalue()
+
+    arrays: Dict[str, np.ndarray] = {}
+    specs: Dict[str, dict] = {}
+    fields = None
+    if isinstance(value, pd.Series):
+        specs[_ROOT] = _split_series(_ROOT, value, arrays)
+    elif isinstance(value, dict):
+        fields = {}
+        for key, item in value.items():
+            if isinstance(item, pd.Series):
+                specs[key] = _split_series(key, item, arrays)
+            elif isinstance(item, np.ndarray):
+                specs[key] = {"kind": "ndarray"}
+                arrays[f"{key}.values"] = item
+            else:
+                fields[key] = item
+
+    if not arrays and not specs:
+        return "json", json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+    meta = json.dumps({"fields": fields, "arrays": specs}, default=_json_default).encode("utf-8")
+    arrays[_META_FIELD] = np.frombuffer(meta, dtype=np.uint8)
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return "npz", buffer.getvalue()
+
+
+def decode(fmt: str, payload: bytes) -> Any:
+    if fmt == "json":
+        return json.loads(payload)
+    if fmt == "npy":
+        return np.load(io.BytesIO(payload), allow_pickle=False)
+
+    with np.load(io.BytesIO(payload), allow_pickle=False) as arrays:
+        meta = json.loads(arrays[_META_FIELD].tobytes())
+        specs = meta["arrays"]
+        if _ROOT in specs:
+            return _join_series(_ROOT, specs[_ROOT], arrays)
+        value = dict(meta["fields"] or {})
+        for key, spec in specs.items():
+            if spec["kind"] == "series":
+                value[key] = _join_series(key, spec, arrays)
+            else:
+                value[key] = arrays[f"{key}.values"]
+        return value
+
+
+# ===============================
+#          GET / SET
+# ===============================
+
+async def shared_get(namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+    """
+    (value, age in seconds) for an unexpired entry, or None. Errors and
+    timeouts count as misses; the caller just goes upstream.
+    """
+    if not SHARED_CACHE_ENABLED:
+        return None
+    now = datetime.now(timezone.utc)
+    try:
+        doc = await asyncio.wait_for(
+            shared_cache_collection.find_one({"_id": f"{namespace}:{key}", "expires_at": {"$gt": now}}),
+            TIMEOUT_SECONDS,
+        )
+        if doc is None:
+            _count(namespace, "misses")
+            return None
+        payload = bytes(doc["data"])
+        if doc.get("z"):
+            payload = zlib.decompress(payload)
+        value = decode(doc["fmt"], payload)
+    except Exception as e:
+        _count(namespace, "errors")
+        logger.warning("shared cache get %s:%s failed: %s: %s", namespace, key, type(e).__name__, e,
+                       extra=sampled())
+        return None
+
+    stored_at = doc["stored_at"]
+    if stored_at.tzinfo is None:
+        stored_at = stored_at.replace(tzinfo=timezone.utc)
+    _count(namespace, "hits")
+    return value, max(0.0, (now - stored_at).total_seconds())
+
+
+async def shared_set(namespace: str, key: str, value: Any, ttl_seconds: float):
+    """Store a value for ttl_seconds. Oversized or unencodable values are skipped."""
+    if not SHARED_CACHE_ENABLED or value is None:
+        return
+    try:
+        fmt, payload = encode(value)
+        compressed = False
+        if COMPRESS and len(payload) >= COMPRESS_MIN_BYTES:
+            packed = zlib.compress(payload, COMPRESS_LEVEL)
+            if len(packed) < len(payload):
+                payload, compressed = packed, True
+        if len(payload) > MAX_PAYLOAD_BYTES:
+            return
+        now = datetime.now(timezone.utc)
+        doc = {
+            "fmt": fmt,
+            "z": compressed,
+            "data": payload,
+            "stored_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        }
+        await asyncio.wait_for(
+            shared_cache_collection.replace_one({"_id": f"{namespace}:{key}"}, doc, upsert=True),
+            TIMEOUT_SECONDS,
+        )
+        _count(namespace, "writes")
+        _count(namespace, "bytes_written", len(payload))
+    except Exception as e:
+        _count(namespace, "errors")
+        logger.warning("shared cache set %s:%s failed: %s: %s", namespace, key, type(e).__name__, e,
+                       extra=sampled())
+
+
+def shared_cache_stats() -> Dict[str, Dict]:
+    report = {}
+    for namespace, stats in _stats.items():
+        lookups = stats["hits"] + stats["misses"]
+        report[namespace] = {**stats, "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0}
+    return report
@@ -0,0 +1,53 @@
+# /app/services/signal_service.py
+import numpy as np
+
+# Thresholds shared by the live endpoint and the backtester
+STRONG_CONFIDENCE = 0.75
+CONFIDENCE = 0.60
+STRONG_SENTIMENT = 0.3
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+# Signal codes used by the vectorized path: code + 2 indexes ACTION_LABELS
+ACTION_LABELS = ["Strong Sell", "Sell", "Hold", "Buy", "Strong Buy"]
+
+
+def recommend_action(prediction_proba, sentiment: float, rsi: float) -> str:
+    """Map model probability + sentiment + RSI to action."""
+    try:
+        confidence = max(prediction_proba)
+        prediction = 1 if prediction_proba[1] > prediction_proba[0] else 0
+        if prediction == 1 and confidence > STRONG_CONFIDENCE and sentiment > STRONG_SENTIMENT and rsi < RSI_OVERBOUGHT:
+            return "Strong Buy"
+        elif prediction == 1 and confidence > CONFIDENCE and sentiment > 0:
+            return "Buy"
+        elif prediction == 0 and confidence > STRONG_CONFIDENCE and sentiment < -STRONG_SENTIMENT and rsi > RSI_OVERSOLD:
+            return "Strong Sell"
+        elif prediction == 0 and confidence > CONFIDENCE and sentiment < 0:
+            return "Sell"
+        else:
+            return "Hold"
+    except Exception:
+        return "Hold"
+
+
+def recommend_actions(proba_up, sentiment, rsi, proba_down=None) -> np.ndarray:
+    """
+    Vectorized recommend_action over arrays of rows.
+    Returns int8 codes: 2 Strong Buy, 1 Buy, 0 Hold, -1 Sell, -2 Strong Sell.
+    """
+    proba_up = np.asarray(proba_up, dtype=np.float64)
+    proba_down = 1.0 - proba_up if proba_down is None else np.asarray(proba_down, dtype=np.float64)
+    sentiment = np.asarray(sentiment, dtype=np.float64)
+    rsi = np.asarray(rsi, dtype=np.float64)
+
+    up = proba_up > proba_down
+    confidence = np.maximum(proba_up, proba_down)
+
+    conditions = [
+        up & (confidence > STRONG_CONFIDENCE) & (sentiment > STRONG_SENTIMENT) & (rsi < RSI_OVERBOUGHT),
+        up & (confidence > CONFIDENCE) & (sentiment > 0),
+        ~up & (confidence > STRONG_CONFIDENCE) & (sentiment < -STRONG_SENTIMENT) & (rsi > RSI_OVERSOLD),
+        ~up & (confidence > CONFIDENCE) & (sentiment < 0),
+    ]
+    return np.select(conditions, [2, 1, -2, -1], default=0).astype(np.int8)
@@ -0,0 +1,272 @@
+# /app/services/symbol_index.py
+import os
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.universe_service import load_universe
+
+# Company names / common aliases -> ticker (matched case-insensitively, whole words only)
+COMPANY_NAMES = {
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "google": "GOOGL",
+    "alphabet": "GOOGL",
+    "amazon": "AMZN",
+    "tesla": "TSLA",
+    "meta": "META",
+    "facebook": "META",
+    "netflix": "NFLX",
+    "nvidia": "NVDA",
+    "amd": "AMD",
+    "intel": "INTC",
+    "coinbase": "COIN",
+    "palantir": "PLTR",
+    "uber": "UBER",
+    "airbnb": "ABNB",
+    "shopify": "SHOP",
+    "salesforce": "CRM",
+    "oracle": "ORCL",
+    "adobe": "ADBE",
+    "broadcom": "AVGO",
+    "qualcomm": "QCOM",
+    "cisco": "CSCO",
+    "disney": "DIS",
+    "walmart": "WMT",
+    "costco": "COST",
+    "coca cola": "KO",
+    "coca-cola": "KO",
+    "pepsi": "PEP",
+    "pepsico": "PEP",
+    "mcdonalds": "MCD",
+    "mcdonald's": "MCD",
+    "starbucks": "SBUX",
+    "nike": "NKE",
+    "visa": "V",
+    "mastercard": "MA",
+    "paypal": "PYPL",
+    "jpmorgan": "JPM",
+    "jp morgan": "JPM",
+    "goldman sachs": "GS",
+    "morgan stanley": "MS",
+    "bank of america": "BAC",
+    "wells fargo": "WFC",
+    "berkshire": "BRK-B",
+    "berkshire hathaway": "BRK-B",
+    "johnson & johnson": "JNJ",
+    "pfizer": "PFE",
+    "merck": "MRK",
+    "boeing": "BA",
+    "exxon": "XOM",
+    "chevron": "CVX",
+    "reliance": "RELIANCE.NS",
+    "tcs": "TCS.NS",
+    "tata consultancy": "TCS.NS",
+    "infosys": "INFY.NS",
+    "wipro": "WIPRO.NS",
+    "hdfc": "HDFCBANK.NS",
+    "hdfc bank": "HDFCBANK.NS",
+    "icici": "ICICIBANK.NS",
+    "icici bank": "ICICIBANK.NS",
+    "sbi": "SBIN.NS",
+    "state bank of india": "SBIN.NS",
+    "tata motors": "TATAMOTORS.NS",
+    "bharti airtel": "BHARTIARTL.NS",
+    "airtel": "BHARTIARTL.NS",
+}
+
+EXTRA_TICKERS = [
+    "SPY", "QQQ", "DIA", "IWM", "VOO", "VTI",
+    "RELIANCE.NS", "TCS.NS", "INFY.NS", "WIPRO.NS", "HDFCBANK.NS", "ICICIBANK.NS",
+    "SBIN.NS", "TATAMOTORS.NS", "BHARTIARTL.NS", "ITC.NS", "LT.NS", "HINDUNILVR.NS",
+]
+
+# Tickers that are also everyday words or single letters: only taken when written as $TICKER
+AMBIGUOUS_TICKERS = {
+    "ALL", "ARE", "BE", "CAN", "CAT", "DE", "GE", "GO", "IT", "KEY", "LI", "LOW",
+    "MA", "MO", "MS", "NET", "NOW", "ON", "ONE", "OUT", "PM", "SEE", "SO", "CI",
+}
+
+# Tickers that are also English words ("WHAT IS THE COST OF...", "I NEED A TEAM"):
+# taken as $TICKER, or written in capitals right next to a finance cue ("COST stock",
+# "shares of COST", "buy COST"). SYMBOL_WORDLIST_FILE (one word per line, e.g.
+# /usr/share/dict/words) adds every listed ticker that is also a word.
+WORD_TICKERS = {
+    "AMT", "BA", "BLK", "COP", "COST", "DASH", "DIS", "GILD", "GIS", "GM", "HAL",
+    "HD", "HON", "HOOD", "HUM", "KO", "LMT", "LULU", "MAR", "MARA", "MMM", "MU",
+    "NEE", "PEP", "PG", "PINS", "RIOT", "SHOP", "SNAP", "SNOW", "SOFI", "SPOT",
+    "TEAM", "UNH", "UPS", "YUM",
+}
+
+# Words that make an adjacent capitalized word a ticker: the word before it ...
+CUES_BEFORE = {
+    "buy", "buying", "bought", "sell", "selling", "sold", "short", "shorting",
+    "hold", "holding", "own", "ticker", "symbol", "stock", "shares", "share",
+}
+# ... the word after it ...
+CUES_AFTER = {
+    "stock", "stocks", "share", "shares", "ticker", "earnings", "dividend",
+    "dividends", "calls", "puts", "options", "chart", "valuation", "position", "stake",
+}
+# ... or a cue before "of"/"in" ("shares of COST", "position in HOOD"). "price" only
+# counts before the ticker: "COST PRICE" and "SPOT PRICE" are phrases of their own.
+CUES_BEFORE_OF = {"shares", "stock", "stake", "position", "options", "calls", "puts", "price"}
+
+# $TICKER, or an uppercase token as written (dots/dashes for suffixes like .NS and BRK-B)
+_TOKEN_RE = re.compile(r"(\$?)\b([A-Za-z][A-Za-z0-9]*(?:[.\-][A-Za-z0-9]+)?)\b")
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher: all occurrences of all patterns in one pass over the text."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+    def add(self, pattern: str, value: str):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), value))
+
+    def build(self):
+        """Compute failure links (breadth-first); call once after all add() calls."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterable[Tuple[int, int, str]]:
+        """Yield (start, end, value) for every pattern occurrence."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, value in self._out[node]:
+                yield i - length + 1, i + 1, value
+
+
+class SymbolIndex:
+    """Known tickers (set lookup) plus company names (Aho-Corasick over the lowercased message)."""
+
+    def __init__(self, tickers: Iterable[str], names: Dict[str, str], word_tickers: Iterable[str] = WORD_TICKERS):
+        self.tickers = {t.upper() for t in tickers} | {t.upper() for t in names.values()}
+        self.word_tickers = {t.upper() for t in word_tickers}
+        self.names = AhoCorasick()
+        for name, ticker in names.items():
+            self.names.add(name.lower(), ticker.upper())
+        self.names.build()
+
+    def _name_matches(self, text: str) -> List[Tuple[int, str]]:
+        lowered = text.lower()
+        found = []
+        for start, end, ticker in self.names.finditer(lowered):
+            before = lowered[start - 1] if start > 0 else " "
+            after = lowered[end] if end < len(lowered) else " "
+            if before.isalnum() or after.isalnum():
+                continue  # "meta" inside "metadata"
+            found.append((start, end, ticker))
+        # Longest match wins where names overlap ("bank of america" vs "america")
+        found.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        kept, last_end = [], -1
+        for start, end, ticker in found:
+            if start >= last_end:
+                kept.append((start, ticker))
+                last_end = end
+        return kept
+
+    @staticmethod
+    def _has_cue(words: List[str], i: int) -> bool:
+        """Whether words[i] sits right next to a finance cue."""
+        before = words[i - 1] if i > 0 else ""
+        after = words[i + 1] if i + 1 < len(words) else ""
+        if before in CUES_BEFORE or after in CUES_AFTER:
+            return True
+        return i > 1 and before in ("of", "in") and words[i - 2] in CUES_BEFORE_OF
+
+    def _ticker_matches(self, text: str) -> List[Tuple[int, str]]:
+        tokens = list(_TOKEN_RE.finditer(text))
+        words = [m.group(2).lower() for m in tokens]
+        kept = []
+        for i, m in enumerate(tokens):
+            dollar, token = m.group(1), m.group(2)
+            symbol = token.upper()
+            if symbol not in self.tickers:
+                continue
+            if dollar:
+                kept.append((m.start(), symbol))
+            elif token != symbol or symbol in AMBIGUOUS_TICKERS or len(symbol) < 2:
+                continue
+            elif symbol not in self.word_tickers or self._has_cue(words, i):
+                kept.append((m.start(), symbol))
+        return kept
+
+    def extract(self, message: str, limit: int = 3) -> List[str]:
+        """Real symbols mentioned in a message, in order of first mention."""
+        matches = sorted(self._ticker_matches(message) + self._name_matches(message))
+        symbols = list(dict.fromkeys(ticker for _, ticker in matches))
+        return symbols[:limit]
+
+
+def _load_symbol_file(path: str) -> Tuple[List[str], Dict[str, str]]:
+    """SYMBOL_INDEX_FILE lines: TICKER[,name[,alias...]]"""
+    tickers, names = [], {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [x.strip() for x in line.split(",") if x.strip()]
+            ticker = fields[0].upper()
+            tickers.append(ticker)
+            for name in fields[1:]:
+                names[name.lower()] = ticker
+    return tickers, names
+
+
+def _load_word_list(path: str) -> set:
+    """SYMBOL_WORDLIST_FILE: one dictionary word per line (case-insensitive)."""
+    with open(path, errors="replace") as f:
+        return {line.strip().upper() for line in f if line.strip()}
+
+
+def build_symbol_index() -> SymbolIndex:
+    tickers = list(load_universe()) + EXTRA_TICKERS
+    names = dict(COMPANY_NAMES)
+    path = os.getenv("SYMBOL_INDEX_FILE")
+    if path and os.path.exists(path):
+        extra_tickers, extra_names = _load_symbol_file(path)
+        tickers += extra_tickers
+        names.update(extra_names)
+    word_tickers = set(WORD_TICKERS)
+    wordlist = os.getenv("SYMBOL_WORDLIST_FILE")
+    if wordlist and os.path.exists(wordlist):
+        word_tickers |= {t.upper() for t in tickers} & _load_word_list(wordlist)
+    return SymbolIndex(tickers, names, word_tickers)
+
+
+_index: Optional[SymbolIndex] = None
+
+
+def get_symbol_index() -> SymbolIndex:
+    """Process-wide index, built on first use (warmed at startup)."""
+    global _index
+    if _index is None:
+        _index = build_symbol_index()
+    return _index
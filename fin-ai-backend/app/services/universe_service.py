@@ -0,0 +1,212 @@
+# /app/services/universe_service.py
+import logging
+import os
+import asyncio
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from typing import Dict, List, Optional
+
+from app.services.correlation_service import RollingCorrelation
+from app.services.yfinance_service import (
+    DEFAULT_BENCHMARK,
+    get_ticker_info_sync,
+    set_benchmark_returns,
+    to_daily_returns,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seed buckets (used as part of the default universe and as a fallback before
+# the first table refresh has completed)
+HIGH_VOL_STOCKS = [
+    "TSLA","NVDA","COIN","AMD","SHOP","SQ","META","NFLX","PLTR","AFRM",
+    "RIVN","SNAP","UBER","ABNB","CRWD","DDOG","ROKU","LI"
+]
+MED_VOL_STOCKS = [
+    "AAPL","MSFT","AMZN","GOOG","V","MA","JPM","COST","AVGO","ORCL",
+    "HD","ADBE","INTC","CSCO","QCOM","TXN","DIS"
+]
+LOW_VOL_STOCKS = [
+    "PG","JNJ","KO","MCD","PEP","MRK","WMT","UNH","CVS","T",
+    "VZ","PFE"
+]
+
+DEFAULT_UNIVERSE = sorted(set(HIGH_VOL_STOCKS + MED_VOL_STOCKS + LOW_VOL_STOCKS + [
+    "GOOGL","BRK-B","LLY","XOM","CVX","ABBV","BAC","WFC","GS","MS",
+    "C","AXP","BLK","SCHW","TMO","ABT","DHR","BMY","AMGN","GILD",
+    "ISRG","MDT","SYK","CI","ELV","HUM","NKE","SBUX","LOW","TGT",
+    "TJX","BKNG","MAR","CMG","YUM","LULU","CRM","NOW","INTU","AMAT",
+    "MU","LRCX","KLAC","ADI","MRVL","PANW","FTNT","SNOW","NET","ZS",
+    "MDB","TEAM","WDAY","ADSK","PYPL","HOOD","SOFI","MSTR","MARA","RIOT",
+    "DKNG","LYFT","DASH","PINS","ETSY","EBAY","SPOT","ZM","DOCU","TWLO",
+    "BA","CAT","DE","GE","HON","LMT","RTX","NOC","UPS","FDX",
+    "UNP","CSX","MMM","EMR","ETN","LIN","APD","SHW","NEE","DUK",
+    "SO","D","AEP","EXC","SRE","O","PLD","AMT","CCI","SPG",
+    "CL","KMB","GIS","K","HSY","MDLZ","KHC","MO","PM","STZ",
+    "F","GM","NIO","XPEV","LCID","ENPH","FSLR","SEDG","OXY","COP",
+    "SLB","HAL","EOG","MPC","PSX","VLO","CMCSA","CHTR","TMUS","NVO",
+]))
+
+UNIVERSE_BENCHMARK = DEFAULT_BENCHMARK
+REFRESH_INTERVAL_SECONDS = float(os.getenv("RISK_UNIVERSE_REFRESH_SECONDS", "21600"))
+MIN_OBSERVATIONS = 60
+NAME_FETCH_LIMIT = int(os.getenv("RISK_UNIVERSE_NAME_FETCH_LIMIT", "25"))
+
+# Current table, index = ticker, columns = price, volatility, beta, name, vol_bucket.
+# Replaced as a whole on every refresh.
+_universe_table: Optional[pd.DataFrame] = None
+# Close matrix (date x ticker) behind the current table; reused by portfolio risk
+_universe_closes: Optional[pd.DataFrame] = None
+# Date of the latest bar in the current table; changes when new daily bars arrive
+_universe_as_of: Optional[str] = None
+_names: Dict[str, str] = {}
+# Rolling pairwise correlation over the table's tickers, advanced by each refresh
+_correlation: Optional[RollingCorrelation] = None
+
+
+def load_universe() -> List[str]:
+    """Universe from RISK_UNIVERSE_FILE (one ticker per line), RISK_UNIVERSE (comma-separated) or the default list."""
+    path = os.getenv("RISK_UNIVERSE_FILE")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            tickers = [line.strip().upper() for line in f if line.strip() and not line.startswith("#")]
+    elif os.getenv("RISK_UNIVERSE"):
+        tickers = [t.strip().upper() for t in os.getenv("RISK_UNIVERSE").split(",") if t.strip()]
+    else:
+        tickers = DEFAULT_UNIVERSE
+    return sorted(set(tickers))
+
+
+# ===============================
+#        VECTORIZED METRICS
+# ===============================
+
+def compute_universe_table(closes: pd.DataFrame, benchmark: str = UNIVERSE_BENCHMARK) -> pd.DataFrame:
+    """
+    Annualized volatility, beta vs benchmark and last price for every column of
+    a (date x ticker) close matrix, in one pass over the returns matrix.
+    Tickers with fewer than MIN_OBSERVATIONS overlapping returns are dropped.
+    """
+    returns = closes.pct_change(fill_method=None).iloc[1:]
+    tickers = [c for c in returns.columns if c != benchmark]
+    R = returns[tickers].to_numpy(dtype=np.float64)
+    b = returns[benchmark].to_numpy(dtype=np.float64)[:, None]
+
+    # Pairwise-complete statistics: each ticker only uses days where it and the benchmark both traded
+    mask = ~np.isnan(R) & ~np.isnan(b)
+    n = mask.sum(axis=0)
+    R0 = np.where(mask, R, 0.0)
+    b0 = np.where(mask, b, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r_mean = R0.sum(axis=0) / n
+        b_mean = b0.sum(axis=0) / n
+        r_dev = np.where(mask, R0 - r_mean, 0.0)
+        b_dev = np.where(mask, b0 - b_mean, 0.0)
+        cov = (r_dev * b_dev).sum(axis=0) / (n - 1)
+        var_b = (b_dev ** 2).sum(axis=0) / (n - 1)
+        var_r = (r_dev ** 2).sum(axis=0) / (n - 1)
+        beta = cov / var_b
+    volatility = np.sqrt(var_r) * np.sqrt(252)
+
+    table = pd.DataFrame({
+        "price": closes[tickers].ffill().iloc[-1].to_numpy(dtype=np.float64),
+        "volatility": volatility,
+        "beta": beta,
+        "observations": n,
+    }, index=pd.Index(tickers, name="ticker"))
+    table = table[(table["observations"] >= MIN_OBSERVATIONS) & table["price"].notna()]
+    table = table.replace([np.inf, -np.inf], np.nan).dropna(subset=["volatility", "beta"])
+
+    # Volatility terciles -> exactly one bucket per ticker
+    if len(table) >= 3:
+        table["vol_bucket"] = pd.qcut(table["volatility"].rank(method="first"), 3, labels=["low", "medium", "high"]).astype(str)
+    else:
+        table["vol_bucket"] = "medium"
+    return table
+
+
+def _download_closes(tickers: List[str], period: str = "1y") -> pd.DataFrame:
+    df = yf.download(tickers, period=period, interval="1d", progress=False, auto_adjust=True, threads=True)
+    closes = df["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(name=tickers[0])
+    return closes.dropna(how="all")
+
+
+def _fill_names(tickers: List[str]):
+    """Fetch display names for a few tickers per refresh; the table falls back to the ticker."""
+    missing = [t for t in tickers if t not in _names][:NAME_FETCH_LIMIT]
+    for t in missing:
+        try:
+            _names[t] = get_ticker_info_sync(t).get("shortName") or t
+        except Exception:
+            _names[t] = t
+
+
+def _advance_correlation(closes: pd.DataFrame, tickers: List[str]):
+    """
+    Push the bars that arrived since the last refresh into a copy of the tracker
+    (a new one if the ticker set changed) and swap it in once it is synced.
+    Requests keep reading the previous tracker until then.
+    """
+    global _correlation
+    current = _correlation
+    if current is None or current.tickers != tickers:
+        tracker = RollingCorrelation(tickers)
+    else:
+        tracker = current.copy()
+    returns = closes[tickers].pct_change(fill_method=None).iloc[1:]
+    tracker.sync(returns)
+    _correlation = tracker
+
+
+def refresh_universe_table_sync() -> pd.DataFrame:
+    """Download the universe + benchmark once and rebuild the table."""
+    global _universe_table, _universe_closes, _universe_as_of
+    tickers = load_universe()
+    closes = _download_closes(sorted(set(tickers + [UNIVERSE_BENCHMARK])))
+    if UNIVERSE_BENCHMARK not in closes.columns:
+        raise ValueError(f"Benchmark {UNIVERSE_BENCHMARK} missing from download")
+    table = compute_universe_table(closes, UNIVERSE_BENCHMARK)
+    set_benchmark_returns(UNIVERSE_BENCHMARK, to_daily_returns(closes[UNIVERSE_BENCHMARK].dropna()), period="1y")
+    _advance_correlation(closes, list(table.index))
+    _fill_names(list(table.index))
+    table["name"] = [_names.get(t, t) for t in table.index]
+    _universe_table = table
+    _universe_closes = closes
+    _universe_as_of = pd.Timestamp(closes.index[-1]).date().isoformat()
+    return table
+
+
+async def run_universe_refresher(interval: float = REFRESH_INTERVAL_SECONDS):
+    """Background task: rebuild the universe table periodically."""
+    while True:
+        try:
+            table = await asyncio.to_thread(refresh_universe_table_sync)
+            logger.info("Risk universe table refreshed: %s tickers", len(table))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("run_universe_refresher: %s", e)
+        await asyncio.sleep(interval)
+
+
+def get_universe_table() -> Optional[pd.DataFrame]:
+    """Latest universe table, or None before the first refresh completes."""
+    return _universe_table
+
+
+def get_universe_closes() -> Optional[pd.DataFrame]:
+    """Close matrix (date x ticker, benchmark included) from the latest refresh, or None."""
+    return _universe_closes
+
+
+def get_universe_as_of() -> Optional[str]:
+    """Date of the latest daily bar in the universe table, or None before the first refresh."""
+    return _universe_as_of
+
+
+def get_correlation_tracker() -> Optional[RollingCorrelation]:
+    """Rolling correlation over the universe table's tickers, or None before the first refresh."""
+    return _correlation
@@ -0,0 +1,99 @@
+# /app/services/user_cache.py
+import os
+import time
+import asyncio
+import contextvars
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# user id -> document, for the request being handled. Set by UserIdentityMapMiddleware;
+# tasks created while handling the request share the same dict.
+_request_users: contextvars.ContextVar[Optional[Dict[str, dict]]] = contextvars.ContextVar("request_users", default=None)
+
+# user id -> (monotonic expiry, document)
+_users: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+_inflight: Dict[str, asyncio.Task] = {}
+# Bumped by invalidate_user so a load that started before a write is not cached
+_generation: Dict[str, int] = {}
+
+
+class UserIdentityMapMiddleware:
+    """
+    Pure ASGI middleware giving each HTTP request its own identity map, so the
+    auth dependency, the route and the services it calls share one user lookup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_users.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_users.reset(token)
+
+
+def remember_user(user_id: str, user: dict):
+    """Put a freshly loaded or written document in the request's identity map."""
+    identity_map = _request_users.get()
+    if identity_map is not None:
+        identity_map[user_id] = user
+
+
+async def get_user_cached(user_id: str, load: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+    """
+    Identity map, then the short-TTL process cache, then `load` (Mongo).
+    Concurrent misses for the same user share one load; misses (None) are not cached.
+    """
+    identity_map = _request_users.get()
+    if identity_map is not None and user_id in identity_map:
+        return identity_map[user_id]
+
+    cached = _users.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        _users.move_to_end(user_id)
+        # Shallow copy so a route editing its document cannot leak into other requests
+        user = dict(cached[1])
+    else:
+        task = _inflight.get(user_id)
+        if task is None:
+            generation = _generation.get(user_id, 0)
+            task = asyncio.create_task(load(user_id))
+            _inflight[user_id] = task
+            task.add_done_callback(lambda t: _store_loaded(user_id, generation, t))
+        user = await asyncio.shield(task)
+        if user is not None:
+            user = dict(user)
+
+    if user is not None:
+        remember_user(user_id, user)
+    return user
+
+
+def _store_loaded(user_id: str, generation: int, task: asyncio.Task):
+    _inflight.pop(user_id, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    user = task.result()
+    if user is None or _generation.get(user_id, 0) != generation:
+        return
+    _users[user_id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+    _users.move_to_end(user_id)
+    while len(_users) > USER_CACHE_MAX_ENTRIES:
+        _users.popitem(last=False)
+
+
+def invalidate_user(user_id: str):
+    """Drop a user from both cache levels (call after any write to the user document)."""
+    _users.pop(user_id, None)
+    _generation[user_id] = _generation.get(user_id, 0) + 1
+    identity_map = _request_users.get()
+    if identity_map is not None:
+        identity_map.pop(user_id, None)
@@ -1,9 +1,15 @@
 # /app/services/yfinance_service.py
+import logging
+import os
+import time
 import yfinance as yf
 import pandas as pd
 import asyncio
 from fastapi import HTTPException
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+from app.services.shared_cache import shared_get, shared_set
+
+logger = logging.getLogger(__name__)
 
 # ===============================
 #        HISTORICAL DATA
@@ -21,7 +27,7 @@ def fetch_stock_data_sync(ticker: str, period: str = "6mo", interval: str = "1d"
             raise ValueError(f"No historical data returned for {ticker}")
         return df
     except Exception as e:
-        print(f"[ERROR] fetch_stock_data_sync({ticker}): {e}")
+        logger.error("fetch_stock_data_sync(%s): %s", ticker, e)
         raise HTTPException(status_code=404, detail=f"Failed to fetch historical data for {ticker}")
 
 async def fetch_stock_data_async(ticker: str, period: str = "6mo", interval: str = "1d") -> pd.DataFrame:
@@ -68,7 +74,7 @@ def get_ticker_info_sync(ticker: str) -> Dict[str, Any]:
         return info
 
     except Exception as e:
-        print(f"[ERROR] get_ticker_info_sync({ticker}): {e}")
+        logger.error("get_ticker_info_sync(%s): %s", ticker, e)
         raise HTTPException(status_code=404, detail=f"Unable to fetch info for {ticker}")
 
 
@@ -87,10 +93,71 @@ async def get_latest_price(ticker: str) -> float:
     try:
         return float(df["Close"].iloc[-1])
     except Exception as e:
-        print(f"[ERROR] get_latest_price({ticker}): {e}")
+        logger.error("get_latest_price(%s): %s", ticker, e)
         raise HTTPException(status_code=404, detail=f"Could not determine latest price for {ticker}")
 
 
+# ===============================
+#          BENCHMARKS
+# ===============================
+
+DEFAULT_BENCHMARK = os.getenv("RISK_BENCHMARK", "SPY")
+INDIA_BENCHMARK = os.getenv("RISK_BENCHMARK_INDIA", "^NSEI")
+BENCHMARK_CACHE_SECONDS = float(os.getenv("BENCHMARK_CACHE_SECONDS", "3600"))
+
+# (benchmark symbol, period) -> (monotonic fetch time, daily returns indexed by tz-naive date)
+_benchmark_cache: Dict[Tuple[str, str], Tuple[float, pd.Series]] = {}
+
+
+def benchmark_for(ticker: str) -> str:
+    """Benchmark index a ticker's beta is measured against."""
+    t = ticker.upper()
+    if t.endswith(".NS") or t.endswith(".BO"):
+        return INDIA_BENCHMARK
+    return DEFAULT_BENCHMARK
+
+
+def to_daily_returns(close: pd.Series) -> pd.Series:
+    """Close prices -> daily returns indexed by tz-naive date, so series from different exchanges align."""
+    returns = close.pct_change().dropna()
+    index = pd.DatetimeIndex(returns.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    returns.index = index.normalize()
+    return returns[~returns.index.duplicated(keep="last")]
+
+
+def set_benchmark_returns(symbol: str, returns: pd.Series, age: float = 0.0, period: str = "1y"):
+    """Seed the benchmark cache (e.g. from a bulk download that already included the benchmark)."""
+    _benchmark_cache[(symbol, period)] = (time.monotonic() - age, returns)
+
+
+def get_benchmark_returns_sync(symbol: str, period: str = "1y") -> pd.Series:
+    """Daily returns of a benchmark index over `period`, cached per (symbol, period) for BENCHMARK_CACHE_SECONDS."""
+    cached = _benchmark_cache.get((symbol, period))
+    if cached and time.monotonic() - cached[0] < BENCHMARK_CACHE_SECONDS:
+        return cached[1]
+    df = fetch_stock_data_sync(symbol, period=period, interval="1d")
+    returns = to_daily_returns(df["Close"])
+    set_benchmark_returns(symbol, returns, period=period)
+    return returns
+
+
+async def get_benchmark_returns_async(symbol: str, period: str = "1y") -> pd.Series:
+    """Like get_benchmark_returns_sync, with the shared cache tier between this process and Yahoo."""
+    cached = _benchmark_cache.get((symbol, period))
+    if cached and time.monotonic() - cached[0] < BENCHMARK_CACHE_SECONDS:
+        return cached[1]
+    hit = await shared_get("benchmark_returns", f"{symbol}:{period}")
+    if hit is not None:
+        returns, age = hit
+        set_benchmark_returns(symbol, returns, age, period=period)
+        return returns
+    returns = await asyncio.to_thread(get_benchmark_returns_sync, symbol, period)
+    await shared_set("benchmark_returns", f"{symbol}:{period}", returns, BENCHMARK_CACHE_SECONDS)
+    return returns
+
+
 # ===============================
 #            NEWS
 # ===============================
@@ -117,7 +184,7 @@ def get_stock_news_sync(ticker: str) -> List[dict]:
             })
         return cleaned
     except Exception as e:
-        print(f"[ERROR] get_stock_news_sync({ticker}): {e}")
+        logger.error("get_stock_news_sync(%s): %s", ticker, e)
         return []
 
 async def get_stock_news_async(ticker: str) -> List[dict]:
@@ -0,0 +1,228 @@
+import os
+import time
+import argparse
+import numpy as np
+from joblib import Parallel, delayed
+
+from app.services.model_registry import get_active_model, version_metadata
+from app.services.signal_service import ACTION_LABELS, recommend_actions
+from training_data import FEATURE_COLUMNS, TRAINING_MATRIX_DIR, load_training_matrix
+
+TRADING_DAYS = 252
+
+# Target exposure per signal code (-2 Strong Sell ... 2 Strong Buy)
+POSITION_SIZES = {2: 1.0, 1: 0.5, 0: 0.0, -1: -0.5, -2: -1.0}
+
+
+def compute_signals(matrix, model_data, rows=None, chunk_size=200_000):
+    """
+    Model probability and recommend_action signal for every (symbol, day) row of
+    the training matrix (or only `rows`), computed as array operations in chunks.
+    Returns (proba_up, codes).
+    """
+    X = matrix['X']
+    scaler = model_data['scaler']
+    model = model_data['technical_model']
+    sentiment_col = FEATURE_COLUMNS.index('News_Sentiment')
+    rsi_col = FEATURE_COLUMNS.index('RSI')
+
+    n_rows = X.shape[0] if rows is None else len(rows)
+    proba_up = np.empty(n_rows, dtype=np.float64)
+    codes = np.empty(n_rows, dtype=np.int8)
+    for start in range(0, n_rows, chunk_size):
+        if rows is None:
+            block = np.asarray(X[start:start + chunk_size])
+        else:
+            block = np.asarray(X[rows[start:start + chunk_size]])
+        proba = model.predict_proba(scaler.transform(block))
+        proba_up[start:start + len(block)] = proba[:, 1]
+        codes[start:start + len(block)] = recommend_actions(
+            proba[:, 1], block[:, sentiment_col], block[:, rsi_col], proba_down=proba[:, 0]
+        )
+    return proba_up, codes
+
+
+def out_of_sample_start(version):
+    """
+    First date the active model was not fit on: the test period start recorded
+    when it was published. None for models without registry metadata.
+    """
+    meta = version_metadata(version)
+    if meta.get('test_start'):
+        return np.datetime64(meta['test_start'], 'D')
+    if meta.get('train_end'):
+        return np.datetime64(meta['train_end'], 'D') + 1
+    return None
+
+
+def next_day_returns(matrix):
+    """
+    Return realised on the bar after each row, from the Returns feature of the
+    following row of the same symbol. NaN where the next row is another symbol.
+    """
+    returns = np.asarray(matrix['X'][:, FEATURE_COLUMNS.index('Returns')], dtype=np.float64)
+    symbol_ids = np.asarray(matrix['symbol_ids'])
+    nxt = np.full_like(returns, np.nan)
+    same_symbol = symbol_ids[1:] == symbol_ids[:-1]
+    nxt[:-1] = np.where(same_symbol, returns[1:], np.nan)
+    return nxt
+
+
+def _stats(pnl, positions=None):
+    """Performance summary of a daily pnl series."""
+    pnl = np.nan_to_num(pnl)
+    if len(pnl) == 0:
+        return {}
+    equity = np.cumprod(1.0 + pnl)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    years = len(pnl) / TRADING_DAYS
+    vol = float(pnl.std() * np.sqrt(TRADING_DAYS))
+    stats = {
+        'total_return': float(equity[-1] - 1.0),
+        'annual_return': float(equity[-1] ** (1 / years) - 1.0) if years > 0 and equity[-1] > 0 else float('nan'),
+        'annual_volatility': vol,
+        'sharpe': float(pnl.mean() * TRADING_DAYS / vol) if vol > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()),
+        'days': int(len(pnl)),
+    }
+    if positions is not None:
+        stats['trades'] = int(np.count_nonzero(np.diff(positions, prepend=0.0)))
+        stats['exposure'] = float(np.mean(positions != 0))
+    return stats
+
+
+def simulate_symbols(bounds, positions, next_returns, cost_bps):
+    """
+    Simulate a block of symbols. bounds is a list of (symbol_id, start, stop)
+    row ranges. Positions are held from the close of each row to the next close;
+    changing position costs cost_bps per unit of turnover.
+    Returns ({symbol_id: stats}, per-row net pnl for the block's rows).
+    """
+    results = {}
+    pnl_rows = []
+    for sid, start, stop in bounds:
+        pos = positions[start:stop]
+        ret = np.nan_to_num(next_returns[start:stop])
+        turnover = np.abs(np.diff(pos, prepend=0.0))
+        pnl = pos * ret - turnover * cost_bps / 10_000
+        results[sid] = _stats(pnl, pos)
+        pnl_rows.append(pnl)
+    return results, (np.concatenate(pnl_rows) if pnl_rows else np.empty(0))
+
+
+def run_backtest(matrix_dir=TRAINING_MATRIX_DIR, cost_bps=10.0, long_only=False, n_jobs=-1, chunks_per_job=4,
+                 in_sample=False):
+    """
+    Backtest recommend_action signals over the saved feature matrix.
+    Only rows after the active model's training window are used unless
+    in_sample=True (or the model has no recorded window, e.g. the legacy file).
+    Signals are computed for every row at once; simulation runs in parallel by symbol.
+    Returns {'portfolio': stats, 'symbols': {symbol: stats}, 'signal_counts': {...},
+    'in_sample': bool, 'start': first date or None}.
+    """
+    matrix = load_training_matrix(matrix_dir)
+    active = get_active_model()
+    model_data = active['model_data']
+
+    dates = np.asarray(matrix['dates'])
+    symbol_ids = np.asarray(matrix['symbol_ids'])
+    next_returns = next_day_returns(matrix)
+    start = None if in_sample else out_of_sample_start(active['version'])
+    rows = None
+    if start is not None:
+        # Rows stay grouped by symbol and date-ordered, so per-symbol ranges remain contiguous
+        rows = np.flatnonzero(dates >= start)
+        dates, symbol_ids, next_returns = dates[rows], symbol_ids[rows], next_returns[rows]
+        if len(rows) == 0:
+            raise ValueError(f"No rows on or after {start} in {matrix_dir}; retrain or pass in_sample=True")
+
+    proba_up, codes = compute_signals(matrix, model_data, rows)
+    size_lookup = np.array([POSITION_SIZES[c] for c in range(-2, 3)])
+    positions = size_lookup[codes.astype(np.int64) + 2]
+    if long_only:
+        positions = np.clip(positions, 0.0, None)
+
+    # Contiguous row range per symbol (rows are grouped by symbol)
+    change = np.flatnonzero(np.diff(symbol_ids)) + 1
+    starts = np.concatenate(([0], change))
+    stops = np.concatenate((change, [len(symbol_ids)]))
+    bounds = [(int(symbol_ids[s]), int(s), int(e)) for s, e in zip(starts, stops)]
+
+    n_workers = os.cpu_count() if n_jobs == -1 else max(n_jobs, 1)
+    n_chunks = max(1, min(len(bounds), n_workers * chunks_per_job))
+    blocks = [b.tolist() for b in np.array_split(np.array(bounds, dtype=np.int64), n_chunks) if len(b)]
+
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(simulate_symbols)(block, positions, next_returns, cost_bps) for block in blocks
+    )
+
+    per_symbol = {}
+    for stats, _ in outputs:
+        for sid, s in stats.items():
+            per_symbol[matrix['symbols'][sid]] = s
+    row_pnl = np.concatenate([pnl for _, pnl in outputs])
+
+    # Equal-weight portfolio: average pnl across symbols trading on each date
+    unique_dates, date_idx = np.unique(dates, return_inverse=True)
+    daily_sum = np.bincount(date_idx, weights=row_pnl, minlength=len(unique_dates))
+    daily_count = np.bincount(date_idx, minlength=len(unique_dates))
+    portfolio_pnl = daily_sum / np.maximum(daily_count, 1)
+
+    counts = np.bincount(codes.astype(np.int64) + 2, minlength=5)
+    return {
+        'portfolio': _stats(portfolio_pnl),
+        'symbols': per_symbol,
+        'signal_counts': {ACTION_LABELS[i]: int(c) for i, c in enumerate(counts)},
+        'in_sample': start is None,
+        'start': str(start) if start is not None else None,
+    }
+
+
+def main():
+    """
+    Backtest recommend_action signals on the saved training matrix
+    """
+    parser = argparse.ArgumentParser(description="Vectorized backtest of recommend_action signals")
+    parser.add_argument('--matrix-dir', default=TRAINING_MATRIX_DIR)
+    parser.add_argument('--cost-bps', type=float, default=10.0, help="Cost per unit of turnover, in basis points")
+    parser.add_argument('--long-only', action='store_true')
+    parser.add_argument('--jobs', type=int, default=-1)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--in-sample', action='store_true',
+                        help="Include the rows the model was trained on (results are not predictive)")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.matrix_dir, 'meta.json')):
+        print(f"No training matrix in {args.matrix_dir}; run train_hf_model.py first.")
+        return
+
+    started = time.perf_counter()
+    report = run_backtest(args.matrix_dir, args.cost_bps, args.long_only, args.jobs, in_sample=args.in_sample)
+    elapsed = time.perf_counter() - started
+
+    p = report['portfolio']
+    print("\n" + "="*60)
+    print(f"BACKTEST ({len(report['symbols'])} symbols, {p['days']} days, {elapsed:.2f}s)")
+    if report['in_sample']:
+        print("IN-SAMPLE: includes rows the model was trained on; returns are not predictive")
+    else:
+        print(f"Out of sample: rows from {report['start']} (after the model's training window)")
+    print("="*60)
+    print(f"Signals: {report['signal_counts']}")
+    print(f"Portfolio total return: {p['total_return']*100:.2f}%")
+    print(f"Annual return:          {p['annual_return']*100:.2f}%")
+    print(f"Annual volatility:      {p['annual_volatility']*100:.2f}%")
+    print(f"Sharpe:                 {p['sharpe']:.2f}")
+    print(f"Max drawdown:           {p['max_drawdown']*100:.2f}%")
+
+    ranked = sorted(report['symbols'].items(), key=lambda kv: kv[1].get('total_return', 0.0), reverse=True)
+    print(f"\nTop {args.top} symbols:")
+    for symbol, s in ranked[:args.top]:
+        print(f"   {symbol:12s} return {s['total_return']*100:8.2f}%  maxDD {s['max_drawdown']*100:7.2f}%  trades {s['trades']}")
+    print(f"\nBottom {args.top} symbols:")
+    for symbol, s in ranked[-args.top:]:
+        print(f"   {symbol:12s} return {s['total_return']*100:8.2f}%  maxDD {s['max_drawdown']*100:7.2f}%  trades {s['trades']}")
+
+
+if __name__ == "__main__":
+    main()
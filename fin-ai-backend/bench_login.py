@@ -0,0 +1,144 @@
+import time
+import asyncio
+import argparse
+import numpy as np
+import httpx
+from fastapi import FastAPI, Request
+
+from app.services import password_service
+from app.services.password_service import client_ip, pwd_context, verify_password
+
+BENCH_PASSWORD = "correct horse battery staple"
+
+
+def build_local_app(hashed: str) -> FastAPI:
+    """
+    Minimal app with the old inline login, the pooled login and a cheap
+    endpoint, so both login paths can be compared without Mongo.
+    """
+    app = FastAPI()
+
+    @app.post("/login-inline")
+    async def login_inline(request: Request):
+        # What authenticate_user used to do: bcrypt on the event loop
+        body = await request.json()
+        return {"ok": pwd_context.verify(body["password"], hashed)}
+
+    @app.post("/login")
+    async def login(request: Request):
+        body = await request.json()
+        return {"ok": await verify_password(body["password"], hashed, client_ip(request))}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def probe(client: httpx.AsyncClient, path: str, stop: asyncio.Event, interval: float) -> list:
+    """
+    Request a cheap endpoint on a fixed schedule and record the time from each
+    scheduled send to its response (ms), so a blocked event loop shows up as
+    latency instead of as missing samples.
+    """
+    latencies = []
+    scheduled = time.perf_counter()
+    while True:
+        await client.get(path)
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        if stop.is_set():
+            break
+        scheduled += interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # Fell behind: the next probe is due now
+            await asyncio.sleep(0)
+    return latencies
+
+
+async def storm(client: httpx.AsyncClient, path: str, payload: dict, total: int, concurrency: int,
+                distinct_ips: bool) -> dict:
+    """Fire `total` logins with at most `concurrency` in flight. Returns status counts and throughput."""
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async def one(i: int):
+        headers = {"X-Forwarded-For": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"} if distinct_ips else {}
+        async with semaphore:
+            response = await client.post(path, json=payload, headers=headers)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    elapsed = time.perf_counter() - started
+    return {"statuses": statuses, "elapsed": elapsed, "logins_per_sec": statuses.get(200, 0) / elapsed}
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, login_path, probe_path: str, payload: dict,
+                       args, distinct_ips: bool = True):
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(client, probe_path, stop, args.probe_interval_ms / 1000))
+    result = None
+    if login_path:
+        result = await storm(client, login_path, payload, args.logins, args.concurrency, distinct_ips)
+    else:
+        await asyncio.sleep(args.baseline_seconds)
+    stop.set()
+    latencies = np.array(await probe_task)
+
+    line = (f"{name:28s} probe p50 {np.percentile(latencies, 50):7.1f}ms  "
+            f"p95 {np.percentile(latencies, 95):7.1f}ms  max {latencies.max():7.1f}ms")
+    if result:
+        line += f"  | logins/s {result['logins_per_sec']:6.1f}  statuses {result['statuses']}"
+    print(line)
+
+
+async def main_async(args):
+    payload = {"email": args.email, "password": args.password}
+    if args.url:
+        # Against a running backend: login storm on /api/auth/login, probe /health
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            await run_scenario(client, "baseline", None, "/health", payload, args)
+            await run_scenario(client, "login storm", "/api/auth/login", "/health", payload, args,
+                               distinct_ips=False)
+        return
+
+    password_service.TRUST_FORWARDED_FOR = True
+    hashed = pwd_context.hash(BENCH_PASSWORD)
+    payload["password"] = BENCH_PASSWORD
+    app = build_local_app(hashed)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await run_scenario(client, "baseline", None, "/ping", payload, args)
+        await run_scenario(client, "inline bcrypt storm", "/login-inline", "/ping", payload, args)
+        await run_scenario(client, "pooled bcrypt storm", "/login", "/ping", payload, args)
+        await run_scenario(client, "pooled, single IP", "/login", "/ping", payload, args, distinct_ips=False)
+    password_service.shutdown_password_executor()
+
+
+def main():
+    """
+    Login-storm benchmark: latency of a cheap endpoint while logins are hammered.
+    Without --url it compares inline vs pooled bcrypt in-process; with --url it
+    targets a running backend (use a registered account).
+    """
+    parser = argparse.ArgumentParser(description="Login throughput vs. latency of other endpoints")
+    parser.add_argument('--url', default=None, help="Running backend, e.g. http://127.0.0.1:8000")
+    parser.add_argument('--email', default="bench@example.com")
+    parser.add_argument('--password', default=BENCH_PASSWORD)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--probe-interval-ms', type=float, default=10.0)
+    parser.add_argument('--baseline-seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent, "
+          f"{password_service.PASSWORD_WORKERS} {password_service.PASSWORD_EXECUTOR} workers")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
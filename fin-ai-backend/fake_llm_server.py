@@ -0,0 +1,127 @@
+import json
+import asyncio
+import argparse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_REPLY = (
+    "Thanks for your question. Based on your profile, a diversified mix of "
+    "index funds with a monthly SIP is a sensible starting point. Keep six "
+    "months of expenses as an emergency fund before adding individual stocks."
+)
+
+app = FastAPI(title="Fake Gemini REST server")
+app.state.first_token_ms = 150.0
+app.state.token_ms = 20.0
+app.state.words_per_chunk = 3
+# Failure injection: stream this many chunks, then an error event (None = never)
+app.state.fail_after_chunks = None
+# Answer this many upcoming requests with 503 before serving normally
+app.state.fail_requests = 0
+app.state.request_count = 0
+
+
+def _response_chunk(text: str, finish: bool = False, prompt: str = "", reply: str = "") -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    chunk = {"candidates": [candidate]}
+    if finish:
+        candidate["finishReason"] = "STOP"
+        # Rough counts, same shape as the real API's usageMetadata
+        chunk["usageMetadata"] = {
+            "promptTokenCount": len(prompt.split()),
+            "candidatesTokenCount": len(reply.split()),
+            "totalTokenCount": len(prompt.split()) + len(reply.split()),
+        }
+    return chunk
+
+
+def _error_body(code: int, status: str, message: str) -> dict:
+    """Error JSON in the Gemini REST shape (also sent as an SSE event when a stream fails)."""
+    return {"error": {"code": code, "message": message, "status": status}}
+
+
+def _prompt_text(body: dict) -> str:
+    return " ".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+def _chunks(prompt: str):
+    words = CANNED_REPLY.split(" ")
+    step = app.state.words_per_chunk
+    chunks = [" ".join(words[i:i + step]) + " " for i in range(0, len(words), step)]
+    # Echo the prompt size so callers can check what was sent
+    chunks.append(f"(prompt: {len(prompt)} chars)")
+    return chunks
+
+
+@app.post("/v1beta/models/{model_action}")
+async def models_action(model_action: str, request: Request):
+    """
+    generateContent and streamGenerateContent (alt=sse) with the same JSON
+    shapes as the Gemini REST API. Latency is simulated with --first-token-ms
+    and --token-ms; the reply text is canned. Failures can be injected through
+    app.state (fail_requests, fail_after_chunks) or --fail-after-chunks.
+    """
+    model, _, action = model_action.partition(":")
+    body = await request.json()
+    app.state.request_count += 1
+    if app.state.fail_requests > 0:
+        app.state.fail_requests -= 1
+        return JSONResponse(_error_body(503, "UNAVAILABLE", "The model is overloaded."), status_code=503)
+    prompt = _prompt_text(body)
+    chunks = _chunks(prompt)
+    reply = "".join(chunks)
+
+    if action == "generateContent":
+        await asyncio.sleep((app.state.first_token_ms + app.state.token_ms * len(chunks)) / 1000)
+        return _response_chunk(reply, finish=True, prompt=prompt, reply=reply)
+
+    if action == "streamGenerateContent":
+        async def events():
+            await asyncio.sleep(app.state.first_token_ms / 1000)
+            for i, chunk in enumerate(chunks):
+                if i == app.state.fail_after_chunks:
+                    yield f"data: {json.dumps(_error_body(500, 'INTERNAL', 'Stream interrupted.'))}\r\n\r\n"
+                    return
+                if i:
+                    await asyncio.sleep(app.state.token_ms / 1000)
+                payload = _response_chunk(chunk, finish=i == len(chunks) - 1, prompt=prompt, reply=reply)
+                yield f"data: {json.dumps(payload)}\r\n\r\n"
+
+        if request.query_params.get("alt") == "sse":
+            return StreamingResponse(events(), media_type="text/event-stream")
+        raise HTTPException(status_code=400, detail="Only alt=sse streaming is supported")
+
+    raise HTTPException(status_code=404, detail=f"Unknown action for {model}: {action}")
+
+
+def main():
+    """
+    Local stand-in for the Gemini API. Start it, then run the backend with
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765 to exercise the chatbot
+    (including /api/chatbot/query/stream) without network access or a key.
+    """
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Gemini REST server for local testing")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-ms', type=float, default=150.0)
+    parser.add_argument('--token-ms', type=float, default=20.0)
+    parser.add_argument('--words-per-chunk', type=int, default=3)
+    parser.add_argument('--fail-after-chunks', type=int, default=None,
+                        help="Break every stream with an error event after this many chunks")
+    args = parser.parse_args()
+
+    app.state.first_token_ms = args.first_token_ms
+    app.state.token_ms = args.token_ms
+    app.state.words_per_chunk = args.words_per_chunk
+    app.state.fail_after_chunks = args.fail_after_chunks
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
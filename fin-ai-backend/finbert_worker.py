@@ -0,0 +1,147 @@
+import os
+import struct
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.finbert_service import (
+    encode_error,
+    encode_response,
+    load_sentiment_model,
+    score_texts_sync,
+)
+
+DEFAULT_SOCKET_PATH = os.getenv("FINBERT_SOCKET_PATH") or "/tmp/finai-finbert.sock"
+MAX_BATCH = int(os.getenv("FINBERT_MAX_BATCH", "64"))
+BATCH_WINDOW_MS = float(os.getenv("FINBERT_BATCH_WINDOW_MS", "5"))
+MAX_TEXTS_PER_REQUEST = 1024
+MAX_TEXT_BYTES = 64 * 1024
+
+_U32 = struct.Struct("!I")
+
+
+class Batcher:
+    """
+    Collects texts from all connections and runs them through FinBERT together.
+    A batch is flushed when it reaches MAX_BATCH texts or BATCH_WINDOW_MS after
+    its first text arrived, whichever comes first.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        # One inference thread: batches run back to back, never concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def score(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            count = len(items[0][0])
+            deadline = loop.time() + BATCH_WINDOW_MS / 1000
+            while count < MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                count += len(item[0])
+
+            texts = [t for batch, _ in items for t in batch]
+            try:
+                scores = await loop.run_in_executor(self.executor, score_texts_sync, texts)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for batch, future in items:
+                if not future.done():
+                    future.set_result(scores[offset:offset + len(batch)])
+                offset += len(batch)
+
+
+async def read_request(reader: asyncio.StreamReader):
+    (count,) = _U32.unpack(await reader.readexactly(4))
+    if count > MAX_TEXTS_PER_REQUEST:
+        raise ValueError(f"Too many texts in one request: {count}")
+    texts = []
+    for _ in range(count):
+        (length,) = _U32.unpack(await reader.readexactly(4))
+        if length > MAX_TEXT_BYTES:
+            raise ValueError(f"Text too long: {length} bytes")
+        texts.append((await reader.readexactly(length)).decode("utf-8", errors="replace"))
+    return texts
+
+
+def make_handler(batcher: Batcher):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    texts = await read_request(reader)
+                except asyncio.IncompleteReadError:
+                    break  # client closed the connection
+                try:
+                    scores = await batcher.score(texts) if texts else []
+                except Exception as e:
+                    # Report the failure; never answer with placeholder scores
+                    print(f"[WARN] finbert_worker inference error: {e}")
+                    writer.write(encode_error(f"{type(e).__name__}: {e}"))
+                else:
+                    writer.write(encode_response(scores))
+                await writer.drain()
+        except Exception as e:
+            print(f"[WARN] finbert_worker connection error: {e}")
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(socket_path: str):
+    print("Loading FinBERT...")
+    await asyncio.to_thread(load_sentiment_model)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    batcher = Batcher()
+    batch_task = asyncio.create_task(batcher.run())
+    server = await asyncio.start_unix_server(make_handler(batcher), path=socket_path)
+    os.chmod(socket_path, 0o660)
+    print(f"FinBERT worker listening on {socket_path} (batch {MAX_BATCH}, window {BATCH_WINDOW_MS}ms)")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    """
+    Run the shared FinBERT inference sidecar. Point the API workers at it with
+    FINBERT_SOCKET_PATH; they fall back to in-process scoring if it is down.
+    """
+    parser = argparse.ArgumentParser(description="FinBERT inference worker over a Unix-domain socket")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
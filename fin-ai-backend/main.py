@@ -4,6 +4,9 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import logging
+import os
 from dotenv import load_dotenv
 import yfinance as yf
 import datetime as dt
@@ -11,6 +14,11 @@ import datetime as dt
 # Load environment variables
 load_dotenv()
 
+# Structured logging on a background queue (set up before the routers import)
+from app.services.logging_service import setup_logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Core router
 from app.routes import auth
 
@@ -26,65 +34,127 @@ chatbot_router = None
 try:
     from app.routes import news
     news_router = news.router
-    print("✅ News router loaded successfully")
+    logger.info("News router loaded successfully")
 except Exception as e:
-    print(f"⚠️ News router not loaded: {e}")
+    logger.warning("News router not loaded: %s", e)
 
 try:
     from app.routes import risk_analysis
     risk_analysis_router = risk_analysis.router
-    print("✅ Risk analysis router loaded successfully")
+    logger.info("Risk analysis router loaded successfully")
 except Exception as e:
-    print(f"⚠️ Risk analysis router not loaded: {e}")
+    logger.warning("Risk analysis router not loaded: %s", e)
 
 try:
     from app.routes import sentiment
     sentiment_router = sentiment.router
-    print("✅ Sentiment router loaded successfully")
+    logger.info("Sentiment router loaded successfully")
 except Exception as e:
-    print(f"⚠️ Sentiment router not loaded: {e}")
+    logger.warning("Sentiment router not loaded: %s", e)
 
 try:
     from app.routes import stock_prediction
     stock_prediction_router = stock_prediction.router
-    print("✅ Stock prediction router loaded successfully")
+    logger.info("Stock prediction router loaded successfully")
 except Exception as e:
-    print(f"⚠️ Stock prediction router not loaded: {e}")
+    logger.warning("Stock prediction router not loaded: %s", e)
 
 try:
     from app.routes import stock
     stock_router = stock.router
-    print("✅ Stock router loaded successfully")
-    print(f"   Stock router has {len(stock_router.routes)} routes")
+    logger.info("Stock router loaded successfully")
+    logger.debug("Stock router has %s routes", len(stock_router.routes))
 except Exception as e:
-    print(f"⚠️ Stock router not loaded: {e}")
-    import traceback
-    traceback.print_exc()
+    logger.warning("Stock router not loaded: %s", e, exc_info=True)
 
 try:
     from app.routes import chatbot
     chatbot_router = chatbot.router
-    print("✅ Chatbot router loaded successfully")
-    print(f"   Chatbot router has {len(chatbot_router.routes)} routes")
+    logger.info("Chatbot router loaded successfully")
+    logger.debug("Chatbot router has %s routes", len(chatbot_router.routes))
 except Exception as e:
-    print(f"⚠️ Chatbot router not loaded: {e}")
-    import traceback
-    traceback.print_exc()
+    logger.warning("Chatbot router not loaded: %s", e, exc_info=True)
 
 
-# ---- Lifespan (MongoDB Connection) ----
+# ---- Lifespan (MongoDB Connection + Background Jobs) ----
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    from app.services.mongo_service import client
+    from app.services.mongo_service import client, ensure_user_indexes
     try:
         await client.admin.command("ping")
-        print("✅ MongoDB connected successfully")
+        logger.info("MongoDB connected successfully")
     except Exception as e:
-        print(f"❌ MongoDB connection failed: {e}")
-        print("   Make sure your MONGODB_URI is correct in .env")
+        logger.error("MongoDB connection failed: %s (make sure MONGODB_URI is correct in .env)", e)
+
+    try:
+        await ensure_user_indexes()
+        logger.info("User indexes ensured")
+    except Exception as e:
+        logger.warning("User indexes not created: %s", e)
+
+    from app.services.shared_cache import ensure_shared_cache_indexes
+    try:
+        await ensure_shared_cache_indexes()
+    except Exception as e:
+        logger.warning("Shared cache index not created: %s", e)
+
+    background_tasks = []
+    if risk_analysis_router:
+        from app.services.universe_service import run_universe_refresher
+        background_tasks.append(asyncio.create_task(run_universe_refresher()))
+        logger.info("Risk universe refresher started")
+
+    if stock_prediction_router:
+        from app.services.model_registry import load_active_model, watch_registry
+        try:
+            # Load before serving so no request waits on the disk load
+            active = await load_active_model()
+            logger.info("Prediction model %s loaded", active["version"])
+        except Exception as e:
+            logger.warning("Prediction model not loaded at startup: %s", e)
+        background_tasks.append(asyncio.create_task(watch_registry()))
+        logger.info("Model registry watcher started")
+
+        from app.services.sentiment_store import ensure_sentiment_indexes, run_sentiment_refresher
+        try:
+            await ensure_sentiment_indexes()
+        except Exception as e:
+            logger.warning("Sentiment store indexes not created: %s", e)
+        # Every worker starts it, but only the holder of a Mongo lease runs refresh passes
+        if os.getenv("SENTIMENT_REFRESH_ENABLED", "true").lower() == "true":
+            background_tasks.append(asyncio.create_task(run_sentiment_refresher()))
+            logger.info("Sentiment store refresher started")
+
+    if chatbot_router:
+        from app.services.symbol_index import get_symbol_index
+        get_symbol_index()
+        logger.info("Chatbot symbol index built")
+
+        from app.services.answer_cache import ANSWER_CACHE_ENABLED
+        if ANSWER_CACHE_ENABLED:
+            from app.services.embedding_service import load_embedding_model
+            background_tasks.append(asyncio.create_task(asyncio.to_thread(load_embedding_model)))
+
+        from app.services.conversation_store import ensure_conversation_indexes
+        from app.services.recommendation_cache import ensure_recommendation_indexes
+        try:
+            await ensure_conversation_indexes()
+            await ensure_recommendation_indexes()
+        except Exception as e:
+            logger.warning("Chatbot store indexes not created: %s", e)
+
     yield
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    if chatbot_router:
+        from app.services.chatbot_service import close_llm_client
+        await close_llm_client()
+    from app.services.password_service import shutdown_password_executor
+    shutdown_password_executor()
     client.close()
-    print("👋 MongoDB connection closed")
+    logger.info("MongoDB connection closed")
 
 
 # ---- Initialize App ----
@@ -117,50 +187,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---- Per-request user identity map (auth dependency and routes share one lookup) ----
+from app.services.user_cache import UserIdentityMapMiddleware
+app.add_middleware(UserIdentityMapMiddleware)
+
 # ---- Register Routers ----
 # Always load Authentication
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-print("✅ Auth router registered at /api/auth")
+logger.info("Auth router registered at /api/auth")
 
 # Load optional modules
 if news_router:
     app.include_router(news_router, prefix="/api/news", tags=["News"])
-    print("✅ News router registered at /api/news")
+    logger.info("News router registered at /api/news")
 
 if sentiment_router:
     app.include_router(sentiment_router, prefix="/api/sentiment", tags=["Sentiment"])
-    print("✅ Sentiment router registered at /api/sentiment")
+    logger.info("Sentiment router registered at /api/sentiment")
 
 # Register MORE SPECIFIC stock routes FIRST
 if risk_analysis_router:
     app.include_router(risk_analysis_router, prefix="/api/stock/risk", tags=["Risk Analysis"])
-    print("✅ Risk analysis router registered at /api/stock/risk")
+    logger.info("Risk analysis router registered at /api/stock/risk")
 
 if stock_prediction_router:
     app.include_router(stock_prediction_router, prefix="/api/stock/predict", tags=["Stock Prediction"])
-    print("✅ Stock prediction router registered at /api/stock/predict")
+    logger.info("Stock prediction router registered at /api/stock/predict")
 
 # Register GENERAL stock router LAST (to avoid conflicts)
 if stock_router:
     app.include_router(stock_router, prefix="/api/stock", tags=["Stock"])
-    print("✅ Stock router registered at /api/stock")
-    # Print all stock routes for debugging
+    logger.info("Stock router registered at /api/stock")
+    # Log all stock routes for debugging
     for route in stock_router.routes:
         if hasattr(route, 'path'):
-            print(f"   - {route.path} [{', '.join(route.methods)}]")
+            logger.debug("Route %s [%s]", route.path, ', '.join(route.methods))
 else:
-    print("❌ Stock router NOT registered - router is None")
+    logger.error("Stock router NOT registered - router is None")
 
 # Register Chatbot router
 if chatbot_router:
     app.include_router(chatbot_router, prefix="/api/chatbot", tags=["Chatbot"])
-    print("✅ Chatbot router registered at /api/chatbot")
-    # Print all chatbot routes for debugging
+    logger.info("Chatbot router registered at /api/chatbot")
+    # Log all chatbot routes for debugging
     for route in chatbot_router.routes:
         if hasattr(route, 'path'):
-            print(f"   - {route.path} [{', '.join(route.methods)}]")
+            logger.debug("Route %s [%s]", route.path, ', '.join(route.methods))
 else:
-    print("❌ Chatbot router NOT registered - router is None")
+    logger.error("Chatbot router NOT registered - router is None")
 
 # ---- Debug Routes Endpoint ----
 @app.get("/debug/routes")
@@ -195,13 +269,21 @@ def root():
 
 @app.get("/health")
 async def health_check():
-    from app.services.mongo_service import client
+    from app.services.mongo_service import client, pool_metrics
+    from app.services.password_service import pool_stats
+    from app.services.shared_cache import shared_cache_stats
     try:
         await client.admin.command("ping")
         db_status = "connected"
     except Exception as e:
         db_status = f"disconnected: {str(e)}"
-    return {"status": "healthy", "database": db_status}
+    return {
+        "status": "healthy",
+        "database": db_status,
+        "mongo_pool": pool_metrics.snapshot(),
+        "password_pool": pool_stats(),
+        "shared_cache": shared_cache_stats(),
+    }
 
 
 # ---- Run Server ----
@@ -0,0 +1,7 @@
+import os
+
+# mongo_service refuses to import without a URI; the client connects lazily, so
+# tests that never touch a collection do not need a running server.
+os.environ.setdefault("MONGODB_URI", "mongodb://127.0.0.1:27017")
+os.environ.setdefault("SHARED_CACHE_ENABLED", "false")
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
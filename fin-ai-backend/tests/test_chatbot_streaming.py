@@ -0,0 +1,234 @@
+import json
+import datetime
+import asyncio
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+
+import fake_llm_server
+from app.routes import chatbot as chatbot_routes
+from app.services import chatbot_service, llm_gateway
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.auth_service import get_current_user
+
+USER = {"_id": "user-1", "name": "Test User", "email": "test@example.com"}
+FULL_REPLY_PREFIX = fake_llm_server.CANNED_REPLY
+
+
+def fake_embedding(text: str) -> np.ndarray:
+    """Deterministic bag-of-words vector; equal questions embed identically."""
+    vector = np.zeros(64, dtype=np.float32)
+    for word in text.lower().split():
+        vector[hash(word) % 64] += 1.0
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """Point the chatbot's REST client at fake_llm_server, in-process, with no simulated latency."""
+    state = fake_llm_server.app.state
+    monkeypatch.setattr(state, "first_token_ms", 0.0)
+    monkeypatch.setattr(state, "token_ms", 0.0)
+    monkeypatch.setattr(state, "fail_after_chunks", None)
+    monkeypatch.setattr(state, "fail_requests", 0)
+    monkeypatch.setattr(state, "request_count", 0)
+    monkeypatch.setattr(chatbot_service, "GEMINI_API_ENDPOINT", "http://fake-gemini")
+    monkeypatch.setattr(chatbot_service, "_http_client", httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_llm_server.app), base_url="http://fake-gemini",
+    ))
+    monkeypatch.setattr(llm_gateway, "BACKOFF_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(llm_gateway, "gateway", llm_gateway.LLMGateway())
+    return state
+
+
+@pytest.fixture
+def chat_store(monkeypatch):
+    """In-memory conversation turns and answer cache instead of MongoDB and the embedding model."""
+    turns = []
+
+    async def append_turns(session_id, user_id, new_turns):
+        turns.append((session_id, user_id, new_turns))
+
+    async def embed_text(text):
+        return fake_embedding(text)
+
+    monkeypatch.setattr(chatbot_service, "append_turns", append_turns)
+    monkeypatch.setattr(chatbot_service, "_schedule_compaction", lambda session_id, user_id: None)
+    monkeypatch.setattr(chatbot_service, "embed_text", embed_text)
+    monkeypatch.setattr(chatbot_service, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(chatbot_service, "answer_cache", SemanticAnswerCache())
+    return turns
+
+
+@pytest.fixture
+def api():
+    app = FastAPI()
+    app.include_router(chatbot_routes.router, prefix="/api/chatbot")
+    app.dependency_overrides[get_current_user] = lambda: dict(USER)
+    return app
+
+
+def register_gemini():
+    """Register the real Gemini REST backend on the fresh gateway installed by fake_gemini."""
+    llm_gateway.gateway.register(
+        "gemini", generate=chatbot_service._gemini_generate, stream=chatbot_service._gemini_stream,
+        max_concurrency=4, timeout=5.0,
+    )
+    chatbot_service.gateway = llm_gateway.gateway
+
+
+async def post_stream(app: FastAPI, message: str, **extra) -> list:
+    """POST /query/stream and parse the SSE body into [(event, data), ...]."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/chatbot/query/stream", json={"message": message, **extra})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_gateway_streams_chunks_from_fake_server(fake_gemini, monkeypatch):
+    async def run():
+        register_gemini()
+        return [text async for text in chatbot_service.stream_llm("Explain index funds")]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) > 5
+    assert "".join(chunks).startswith(FULL_REPLY_PREFIX)
+    assert chunks[-1] == "(prompt: 19 chars)"
+    usage = llm_gateway.gateway.usage_report()["gemini"]["anonymous:unknown"]
+    # Token counts come from the fake server's usageMetadata, not the estimate
+    assert usage["prompt_tokens"] == 3
+    assert usage["requests"] == 1 and usage["errors"] == 0
+
+
+def test_generate_retries_transient_upstream_errors(fake_gemini):
+    fake_gemini.fail_requests = 2
+
+    async def run():
+        register_gemini()
+        return await chatbot_service.generate_llm("What is an ETF?")
+
+    text = asyncio.run(run())
+    assert text.startswith(FULL_REPLY_PREFIX)
+    assert fake_gemini.request_count == 3
+    assert llm_gateway.gateway.usage_report()["gemini"]["anonymous:unknown"]["retries"] == 2
+
+
+def test_stream_error_before_first_chunk_is_retried(fake_gemini):
+    fake_gemini.fail_after_chunks = 0
+
+    async def run():
+        register_gemini()
+        chunks = []
+        with pytest.raises(llm_gateway.UpstreamError):
+            async for text in chatbot_service.stream_llm("Explain bonds"):
+                chunks.append(text)
+        return chunks
+
+    assert asyncio.run(run()) == []
+    assert fake_gemini.request_count == llm_gateway.MAX_ATTEMPTS
+
+
+def test_stream_endpoint_sends_meta_tokens_and_done(fake_gemini, chat_store, api):
+    async def run():
+        register_gemini()
+        return await post_stream(api, "Should I move my savings into index funds?")
+
+    events = asyncio.run(run())
+    names = [name for name, _ in events]
+    assert names[0] == "meta" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"} and len(names) > 4
+    meta = events[0][1]
+    assert meta["cached"] is False and meta["session_id"]
+    reply = "".join(data["text"] for name, data in events if name == "token")
+    assert reply.startswith(FULL_REPLY_PREFIX)
+
+    # The finished exchange is stored under the session announced in meta
+    (session_id, user_id, turns), = chat_store
+    assert session_id == meta["session_id"] and user_id == USER["_id"]
+    assert turns[1] == {"role": "assistant", "content": reply}
+
+
+def test_stream_endpoint_reports_error_midway(fake_gemini, chat_store, api):
+    fake_gemini.fail_after_chunks = 3
+
+    async def run():
+        register_gemini()
+        return await post_stream(api, "Should I move my savings into index funds?")
+
+    events = asyncio.run(run())
+    names = [name for name, _ in events]
+    # Chunks already sent stay sent; the stream ends with an error event and no retry
+    assert names == ["meta", "token", "token", "token", "error"]
+    assert fake_gemini.request_count == 1
+    assert chat_store == []
+
+
+def test_cached_answer_is_replayed_without_calling_the_model(fake_gemini, chat_store, api):
+    question = "What is a mutual fund expense ratio?"
+
+    async def run():
+        register_gemini()
+        first = await post_stream(api, question)
+        second = await post_stream(api, question)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first[0][1]["cached"] is False
+    generated = "".join(data["text"] for name, data in first if name == "token")
+    assert fake_gemini.request_count == 1
+
+    assert [name for name, _ in second] == ["meta", "token", "done"]
+    assert second[0][1]["cached"] is True
+    assert second[1][1]["text"] == generated
+    # Replayed answers are still recorded in the (new) session
+    assert len(chat_store) == 2 and chat_store[1][2][1]["content"] == generated
+
+
+def test_prepare_chat_builds_personal_and_generic_prompts(fake_gemini, chat_store):
+    history = [
+        {"role": "user", "content": "I earn 80k a year."},
+        {"role": "assistant", "content": "Noted."},
+    ]
+
+    async def run():
+        personal = await chatbot_service.prepare_chat(dict(USER), "How much should I save each month?",
+                                                      conversation_history=history)
+        generic = await chatbot_service.prepare_chat(dict(USER), "What is dollar cost averaging?")
+        return personal, generic
+
+    personal, generic = asyncio.run(run())
+    assert personal["embedding"] is None and personal["cached_answer"] is None
+    assert "User: I earn 80k a year." in personal["prompt"]
+    assert personal["prompt"].endswith("User: How much should I save each month?\nAssistant: ")
+
+    assert generic["embedding"] is not None and generic["cached_answer"] is None
+    assert generic["prompt"].startswith(chatbot_service.GENERIC_CONTEXT)
+    assert "Test User" not in generic["prompt"]
+    assert fake_gemini.request_count == 0
+
+
+def test_recommendations_timestamp_is_utc_when_cache_write_fails(monkeypatch):
+    async def no_doc(user_id, digest):
+        return None
+
+    async def generate(user_data):
+        return "Diversify."
+
+    async def failing_save(user_id, digest, text):
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(chatbot_service, "get_recommendations_doc", no_doc)
+    monkeypatch.setattr(chatbot_service, "generate_investment_recommendations", generate)
+    monkeypatch.setattr(chatbot_service, "save_recommendations", failing_save)
+
+    result = asyncio.run(chatbot_service.get_cached_investment_recommendations(dict(USER)))
+    assert result["text"] == "Diversify." and result["stale"] is False
+    assert result["generated_at"].utcoffset() == datetime.timedelta(0)
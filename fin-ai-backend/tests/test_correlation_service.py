@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from app.services.correlation_service import MIN_OVERLAP, RollingCorrelation
+
+WINDOW = 60
+TICKERS = ["AAA", "BBB", "CCC", "DDD", "EEE"]
+
+
+def make_returns(days: int = 260, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.01, size=(days, 1))
+    frame = pd.DataFrame(
+        common * rng.uniform(0.2, 1.5, size=len(TICKERS)) + rng.normal(0, 0.01, size=(days, len(TICKERS))),
+        index=pd.bdate_range("2023-01-02", periods=days),
+        columns=TICKERS,
+    )
+    # Scattered missing days, plus a long halt so some pairs fall below MIN_OVERLAP
+    frame = frame.mask(rng.random(frame.shape) < 0.1)
+    frame.iloc[120:150, TICKERS.index("EEE")] = np.nan
+    return frame
+
+
+def expected_correlations(returns: pd.DataFrame, ticker: str) -> pd.Series:
+    rolling = returns.rolling(WINDOW, min_periods=MIN_OVERLAP).corr()
+    return rolling.loc[returns.index[-1]].loc[ticker]
+
+
+def test_correlations_for_matches_pandas_rolling_corr_through_rebuilds():
+    returns = make_returns()
+    tracker = RollingCorrelation(TICKERS, window=WINDOW)
+    # Grow the frame in uneven steps; 260 days is several rebuilds of a 60-day window
+    for end in [30, 31, 75, 110, 111, 140, 190, 260]:
+        tracker.sync(returns.iloc[:end])
+        if end < MIN_OVERLAP:
+            continue
+        for ticker in TICKERS:
+            actual = tracker.correlations_for(ticker)
+            expected = expected_correlations(returns.iloc[:end], ticker)
+            pd.testing.assert_series_equal(actual, expected, check_names=False, atol=1e-9, rtol=0)
+    assert len(tracker.days) == WINDOW
+
+
+def test_masked_pairs_below_min_overlap_are_nan():
+    returns = make_returns()
+    tracker = RollingCorrelation(TICKERS, window=WINDOW)
+    tracker.sync(returns.iloc[:150])
+    # EEE was halted for 30 of the last 60 days
+    assert np.isnan(tracker.correlations_for("EEE")["AAA"])
+    assert np.isnan(tracker.correlations_for("AAA")["EEE"])
+    assert not np.isnan(tracker.correlations_for("AAA")["BBB"])
+
+
+def test_revised_last_bar_replaces_the_partial_one():
+    returns = make_returns()
+    tracker = RollingCorrelation(TICKERS, window=WINDOW)
+    partial = returns.iloc[:100].copy()
+    partial.iloc[-1] = 0.05
+    tracker.sync(partial)
+    tracker.sync(returns.iloc[:100])
+    for ticker in TICKERS:
+        pd.testing.assert_series_equal(
+            tracker.correlations_for(ticker), expected_correlations(returns.iloc[:100], ticker),
+            check_names=False, atol=1e-9, rtol=0,
+        )
+
+
+def test_correlations_with_untracked_series():
+    returns = make_returns()
+    tracker = RollingCorrelation(TICKERS, window=WINDOW)
+    tracker.sync(returns)
+    rng = np.random.default_rng(3)
+    other = (returns["AAA"].fillna(0) + pd.Series(rng.normal(0, 0.01, len(returns)), index=returns.index))
+    other = other.mask(rng.random(len(other)) < 0.1)
+
+    window = returns.tail(WINDOW)
+    expected = window.corrwith(other.reindex(window.index))
+    # corrwith uses pairwise-complete rows like the tracker; apply the same minimum overlap
+    overlap = window.notna().mul(other.reindex(window.index).notna(), axis=0).sum()
+    expected[overlap < MIN_OVERLAP] = np.nan
+    pd.testing.assert_series_equal(tracker.correlations_with(other), expected, check_names=False, atol=1e-9, rtol=0)
+
+
+def test_copy_is_independent_of_the_original():
+    returns = make_returns()
+    tracker = RollingCorrelation(TICKERS, window=WINDOW)
+    tracker.sync(returns.iloc[:100])
+    before = tracker.correlations_for("AAA")
+
+    clone = tracker.copy()
+    clone.sync(returns.iloc[:200])
+
+    assert tracker.last_date == returns.index[99]
+    assert clone.last_date == returns.index[199]
+    pd.testing.assert_series_equal(tracker.correlations_for("AAA"), before)
+    pd.testing.assert_series_equal(
+        clone.correlations_for("AAA"), expected_correlations(returns.iloc[:200], "AAA"),
+        check_names=False, atol=1e-9, rtol=0,
+    )
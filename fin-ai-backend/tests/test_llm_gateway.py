@@ -0,0 +1,243 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import llm_gateway
+from app.services.llm_gateway import LLMGateway, UpstreamError, set_llm_caller
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "BACKOFF_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(llm_gateway, "MAX_ATTEMPTS", 3)
+
+
+class FakeBackend:
+    """Generate function that records calls and can be held open or made to fail."""
+
+    def __init__(self, failures=(), delay=0.0):
+        self.calls = []
+        self.failures = list(failures)
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def generate(self, prompt):
+        self.calls.append(prompt)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.release.wait()
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            return f"answer to {prompt}", {"prompt_tokens": 10, "completion_tokens": 5}
+        finally:
+            self.active -= 1
+
+
+def http_error(status):
+    request = httpx.Request("POST", "http://llm.test")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+def test_identical_concurrent_prompts_share_one_call():
+    async def run():
+        backend = FakeBackend()
+        backend.release.clear()
+        gateway = LLMGateway()
+        gateway.register("fake", backend.generate)
+        waiters = [asyncio.create_task(gateway.generate("fake", "same prompt")) for _ in range(5)]
+        other = asyncio.create_task(gateway.generate("fake", "other prompt"))
+        await asyncio.sleep(0)
+        backend.release.set()
+        return backend, gateway, await asyncio.gather(*waiters), await other
+
+    backend, gateway, results, other = asyncio.run(run())
+    assert results == ["answer to same prompt"] * 5
+    assert other == "answer to other prompt"
+    assert sorted(backend.calls) == ["other prompt", "same prompt"]
+
+    usage = gateway.usage_report()["fake"]["anonymous:unknown"]
+    assert usage["requests"] == 6 and usage["coalesced"] == 4
+    # Tokens are counted once per upstream call, not once per waiter
+    assert usage["prompt_tokens"] == 20 and usage["completion_tokens"] == 10
+    assert gateway._inflight == {}
+
+
+def test_leader_failure_reaches_every_waiter():
+    async def run():
+        backend = FakeBackend(failures=[ValueError("bad request")])
+        backend.release.clear()
+        gateway = LLMGateway()
+        gateway.register("fake", backend.generate)
+        waiters = [asyncio.create_task(gateway.generate("fake", "prompt")) for _ in range(4)]
+        await asyncio.sleep(0)
+        backend.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        # The failed call is not cached: the next request goes upstream again
+        retry = await gateway.generate("fake", "prompt")
+        return backend, gateway, results, retry
+
+    backend, gateway, results, retry = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert retry == "answer to prompt"
+    assert len(backend.calls) == 2
+    usage = gateway.usage_report()["fake"]["anonymous:unknown"]
+    assert usage["errors"] == 4 and usage["retries"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def run():
+        backend = FakeBackend(delay=0.01)
+        gateway = LLMGateway()
+        gateway.register("fake", backend.generate)
+        first = asyncio.create_task(gateway.generate("fake", "prompt"))
+        second = asyncio.create_task(gateway.generate("fake", "prompt"))
+        await asyncio.sleep(0)
+        first.cancel()
+        return backend, await second
+
+    backend, result = asyncio.run(run())
+    assert result == "answer to prompt"
+    assert len(backend.calls) == 1
+
+
+def test_semaphore_caps_concurrent_backend_calls():
+    async def run():
+        backend = FakeBackend(delay=0.01)
+        gateway = LLMGateway()
+        gateway.register("fake", backend.generate, max_concurrency=3)
+        results = await asyncio.gather(*(gateway.generate("fake", f"prompt {i}") for i in range(10)))
+        return backend, results
+
+    backend, results = asyncio.run(run())
+    assert len(results) == 10 and len(backend.calls) == 10
+    assert backend.max_active == 3
+
+
+def test_transient_errors_are_retried_with_backoff(monkeypatch):
+    delays = []
+
+    async def record_backoff(attempt):
+        delays.append(attempt)
+
+    monkeypatch.setattr(LLMGateway, "_backoff", staticmethod(record_backoff))
+
+    async def run():
+        backend = FakeBackend(failures=[http_error(503), asyncio.TimeoutError()])
+        gateway = LLMGateway()
+        gateway.register("fake", backend.generate)
+        return backend, gateway, await gateway.generate("fake", "prompt")
+
+    backend, gateway, result = asyncio.run(run())
+    assert result == "answer to prompt"
+    assert len(backend.calls) == 3
+    assert delays == [0, 1]
+    assert gateway.usage_report()["fake"]["anonymous:unknown"]["retries"] == 2
+
+
+def test_retries_stop_at_max_attempts_and_skip_permanent_errors():
+    async def run():
+        exhausted = FakeBackend(failures=[UpstreamError(500, "boom")] * 5)
+        permanent = FakeBackend(failures=[http_error(400)])
+        gateway = LLMGateway()
+        gateway.register("exhausted", exhausted.generate)
+        gateway.register("permanent", permanent.generate)
+        with pytest.raises(UpstreamError):
+            await gateway.generate("exhausted", "prompt")
+        with pytest.raises(httpx.HTTPStatusError):
+            await gateway.generate("permanent", "prompt")
+        return exhausted, permanent
+
+    exhausted, permanent = asyncio.run(run())
+    assert len(exhausted.calls) == llm_gateway.MAX_ATTEMPTS
+    assert len(permanent.calls) == 1
+
+
+def test_backoff_grows_exponentially_with_jitter(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm_gateway, "BACKOFF_BASE_SECONDS", 1.0)
+    monkeypatch.setattr(llm_gateway.asyncio, "sleep", fake_sleep)
+    for attempt in range(5):
+        asyncio.run(LLMGateway._backoff(attempt))
+
+    for attempt, delay in enumerate(sleeps):
+        cap = min(llm_gateway.BACKOFF_MAX_SECONDS, 2 ** attempt)
+        assert cap * 0.5 <= delay <= cap
+
+
+def test_usage_is_accounted_per_user_and_route():
+    async def call(gateway, user, route, prompt):
+        set_llm_caller(user, route)
+        return await gateway.generate("fake", prompt)
+
+    async def run():
+        backend = FakeBackend()
+        gateway = LLMGateway()
+        gateway.register("fake", backend.generate)
+        # Each task gets its own copy of the context, like separate requests
+        await asyncio.gather(
+            asyncio.create_task(call(gateway, "alice", "chat", "a1")),
+            asyncio.create_task(call(gateway, "alice", "chat", "a2")),
+            asyncio.create_task(call(gateway, "alice", "news", "a3")),
+            asyncio.create_task(call(gateway, "bob", "chat", "b1")),
+        )
+        await gateway.generate("fake", "anonymous")
+        return gateway
+
+    gateway = asyncio.run(run())
+    alice = gateway.usage_report(user="alice")["fake"]
+    assert set(alice) == {"chat", "news"}
+    assert alice["chat"]["requests"] == 2 and alice["chat"]["prompt_tokens"] == 20
+    assert alice["news"]["requests"] == 1
+
+    everyone = gateway.usage_report()["fake"]
+    assert set(everyone) == {"alice:chat", "alice:news", "bob:chat", "anonymous:unknown"}
+    assert gateway.usage_report(user="carol") == {}
+
+
+def test_stream_retries_only_before_the_first_chunk():
+    def make_stream(plan):
+        async def stream(prompt, usage):
+            outcome = plan.pop(0)
+            for chunk in outcome.get("chunks", []):
+                yield chunk
+            if "error" in outcome:
+                raise outcome["error"]
+            usage["completion_tokens"] = 7
+        return stream
+
+    async def collect(gateway, name):
+        chunks = []
+        try:
+            async for text in gateway.stream(name, "prompt"):
+                chunks.append(text)
+        except Exception as e:
+            return chunks, e
+        return chunks, None
+
+    async def run():
+        gateway = LLMGateway()
+        before = [{"error": http_error(503)}, {"chunks": ["a", "b"]}]
+        midway = [{"chunks": ["a"], "error": UpstreamError(500, "cut")}, {"chunks": ["x"]}]
+        gateway.register("before", FakeBackend().generate, stream=make_stream(before))
+        gateway.register("midway", FakeBackend().generate, stream=make_stream(midway))
+        return gateway, await collect(gateway, "before"), await collect(gateway, "midway"), midway
+
+    gateway, (before_chunks, before_error), (midway_chunks, midway_error), midway_left = asyncio.run(run())
+    assert before_chunks == ["a", "b"] and before_error is None
+    assert midway_chunks == ["a"] and isinstance(midway_error, UpstreamError)
+    assert len(midway_left) == 1  # no second attempt once text was sent
+
+    report = gateway.usage_report()
+    assert report["before"]["anonymous:unknown"]["retries"] == 1
+    assert report["before"]["anonymous:unknown"]["completion_tokens"] == 7
+    assert report["midway"]["anonymous:unknown"]["errors"] == 1
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import multiprocessing
+
+import numpy as np
+
+from app.services import model_registry
+
+
+def _publish_many(registry_dir, worker, count):
+    for i in range(count):
+        model_registry.publish_model({"weights": np.arange(3) + i}, registry_dir=registry_dir,
+                                     metadata={"worker": worker})
+
+
+def test_concurrent_publishers_keep_every_version(tmp_path):
+    registry_dir = str(tmp_path)
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_publish_many, args=(registry_dir, w, 10)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    assert all(p.exitcode == 0 for p in workers)
+
+    manifest = model_registry.read_manifest(registry_dir)
+    versions = [entry["version"] for entry in manifest["versions"]]
+    assert len(versions) == len(set(versions)) == 40
+    assert manifest["active"] in versions
+    for version in versions:
+        assert (tmp_path / version / model_registry.ARTIFACT_NAME).exists()
+
+
+def test_load_active_model_loads_once_off_the_event_loop(tmp_path, monkeypatch):
+    version = model_registry.publish_model({"weights": np.arange(5)}, registry_dir=str(tmp_path))
+    load_threads = []
+
+    def load_initial():
+        load_threads.append(threading.current_thread())
+        return {"version": version, "model_data": model_registry.load_version(version, str(tmp_path))}
+
+    monkeypatch.setattr(model_registry, "_load_initial", load_initial)
+    monkeypatch.setattr(model_registry, "_active", None)
+    monkeypatch.setattr(model_registry, "_load_lock", asyncio.Lock())
+
+    async def run():
+        return await asyncio.gather(*(model_registry.load_active_model() for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(load_threads) == 1 and load_threads[0] is not threading.main_thread()
+    assert all(r is results[0] for r in results)
+    assert results[0]["version"] == version
+    np.testing.assert_array_equal(results[0]["model_data"]["weights"], np.arange(5))
+    # Later readers get the preloaded model without touching disk
+    assert model_registry.get_active_model() is results[0]
+    assert len(load_threads) == 1
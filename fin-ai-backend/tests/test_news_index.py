@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app.services import news_index as news_index_module
+from app.services.news_index import NewsIndex
+
+
+def unit_rows(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def metas(start, n):
+    return [{"article_id": f"a{i}", "title": f"headline {i}"} for i in range(start, start + n)]
+
+
+def fill(index, total, batch=50, dim=16):
+    vectors = unit_rows(total, dim)
+    for start in range(0, total, batch):
+        index.add(vectors[start:start + batch], metas(start, min(batch, total - start)))
+    return vectors
+
+
+def test_eviction_keeps_the_newest_chunks_searchable():
+    index = NewsIndex(max_chunks=200, use_hnsw=False)
+    vectors = fill(index, 500)
+    assert len(index) <= 200
+    assert not index.has_article_id("a0") and index.has_article_id("a499")
+    top = index.search(vectors[480], k=1, min_similarity=0.0)
+    assert top[0]["article_id"] == "a480" and top[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_hnsw_eviction_marks_deleted_instead_of_rebuilding(monkeypatch):
+    hnswlib = pytest.importorskip("hnswlib")
+    monkeypatch.setattr(news_index_module, "HNSW_MIN_SIZE", 0)
+    index = NewsIndex(max_chunks=200, use_hnsw=True)
+    graph_inits = []
+    real_index = hnswlib.Index
+
+    def counting_index(*args, **kwargs):
+        graph_inits.append(1)
+        return real_index(*args, **kwargs)
+
+    monkeypatch.setattr(hnswlib, "Index", counting_index)
+    vectors = fill(index, 700)
+
+    assert len(graph_inits) == 1
+    assert index._hnsw.get_current_count() <= 200
+    for i in (699, 650, 600):
+        top = index.search(vectors[i], k=1, min_similarity=0.0)
+        assert top[0]["article_id"] == f"a{i}"
+    # Evicted chunks never come back, even as near neighbours of themselves
+    evicted = index.search(vectors[10], k=5, min_similarity=0.0)
+    assert all(int(r["article_id"][1:]) >= 700 - len(index) for r in evicted)
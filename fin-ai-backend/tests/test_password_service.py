@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import password_service
+
+
+async def hold_slots(ip, count, release):
+    """Enter admission `count` times for one address and wait for `release`."""
+    async def one():
+        async with password_service._admit(ip):
+            await release.wait()
+
+    tasks = [asyncio.create_task(one()) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+def test_per_ip_limit_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(password_service, "MAX_PENDING_PER_IP", 0)
+    monkeypatch.setattr(password_service, "MAX_PENDING", 10)
+
+    async def run():
+        # Behind a proxy without TRUST_FORWARDED_FOR every login shares one address
+        release = asyncio.Event()
+        tasks = await hold_slots("10.0.0.1", 5, release)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert password_service._pending == 0 and password_service._pending_by_ip == {}
+
+
+def test_per_ip_and_global_limits_reject_with_429(monkeypatch):
+    monkeypatch.setattr(password_service, "MAX_PENDING_PER_IP", 2)
+    monkeypatch.setattr(password_service, "MAX_PENDING", 3)
+
+    async def run():
+        release = asyncio.Event()
+        tasks = await hold_slots("10.0.0.1", 2, release)
+        with pytest.raises(HTTPException) as per_ip:
+            async with password_service._admit("10.0.0.1"):
+                pass
+        tasks += await hold_slots("10.0.0.2", 1, release)
+        with pytest.raises(HTTPException) as busy:
+            async with password_service._admit("10.0.0.3"):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+        return per_ip.value, busy.value
+
+    per_ip, busy = asyncio.run(run())
+    assert per_ip.status_code == busy.status_code == 429
+    assert "login attempts" in per_ip.detail and "busy" in busy.detail
+    assert password_service._pending == 0
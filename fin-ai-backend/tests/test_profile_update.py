@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+
+import httpx
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+
+from app.routes import auth as auth_routes
+from app.services import mongo_service, recommendation_cache, user_cache
+from app.services.auth_service import get_current_user
+
+USER_ID = ObjectId()
+
+
+class FakeCollection:
+    """In-memory stand-in for the few motor calls the profile path makes."""
+
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+        self.finds = 0
+
+    async def find_one(self, query, projection=None):
+        self.finds += 1
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc:
+            doc.update(update["$set"])
+        return type("UpdateResult", (), {"matched_count": int(doc is not None)})()
+
+    async def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    users = FakeCollection([{
+        "_id": USER_ID, "email": "a@example.com", "name": "Old Name",
+        "occupation": "Engineer", "currentSalary": 90000.0,
+    }])
+    recommendations = FakeCollection([{"_id": str(USER_ID), "profile_hash": "x", "text": "old advice"}])
+    monkeypatch.setattr(mongo_service, "users_collection", users)
+    monkeypatch.setattr(recommendation_cache, "recommendations_collection", recommendations)
+    monkeypatch.setattr(user_cache, "_users", user_cache.OrderedDict())
+    return users, recommendations
+
+
+@pytest.fixture
+def api():
+    app = FastAPI()
+    app.include_router(auth_routes.router, prefix="/api/auth")
+
+    async def current_user():
+        return await mongo_service.get_user_by_id_str(str(USER_ID))
+
+    app.dependency_overrides[get_current_user] = current_user
+    return app
+
+
+async def patch_user(app, body):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.patch("/api/auth/user", json=body)
+
+
+def test_profile_update_invalidates_user_and_recommendations(stores, api):
+    users, recommendations = stores
+
+    async def run():
+        # Warm the process cache with the old document
+        assert (await mongo_service.get_user_by_id_str(str(USER_ID)))["name"] == "Old Name"
+        response = await patch_user(api, {"name": "New Name", "currentSalary": 120000, "dateOfBirth": "1990-05-01"})
+        cached = await mongo_service.get_user_by_id_str(str(USER_ID))
+        return response, cached
+
+    response, cached = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.json()["name"] == "New Name"
+    assert cached["name"] == "New Name" and cached["currentSalary"] == 120000
+    assert users.docs[USER_ID]["dateOfBirth"] == datetime.datetime(1990, 5, 1)
+    assert users.docs[USER_ID]["occupation"] == "Engineer"
+    assert recommendations.docs == {}
+
+
+@pytest.mark.parametrize("body, status", [({}, 400), ({"name": None}, 400), ({"currentSalary": -5}, 422)])
+def test_profile_update_rejects_empty_or_invalid_bodies(stores, api, body, status):
+    users, recommendations = stores
+    response = asyncio.run(patch_user(api, body))
+    assert response.status_code == status
+    assert users.docs[USER_ID]["name"] == "Old Name"
+    assert str(USER_ID) in recommendations.docs
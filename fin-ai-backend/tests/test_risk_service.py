@@ -0,0 +1,106 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import risk_service, yfinance_service
+from app.services.risk_service import compute_beta, compute_risk_score
+
+
+def daily_returns(values, start="2024-01-01"):
+    return pd.Series(values, index=pd.bdate_range(start, periods=len(values)))
+
+
+def history_for(returns):
+    close = 100 * (1 + returns).cumprod()
+    return pd.DataFrame({"Close": np.concatenate([[100.0], close.to_numpy()])},
+                        index=pd.bdate_range(returns.index[0] - pd.offsets.BDay(1), periods=len(returns) + 1))
+
+
+def test_compute_beta_matches_covariance():
+    rng = np.random.default_rng(0)
+    bench = daily_returns(rng.normal(0, 0.01, 120))
+    stock = 1.5 * bench + daily_returns(rng.normal(0, 0.002, 120))
+    beta, correlation = compute_beta(stock, bench)
+    cov = np.cov(stock, bench)
+    assert beta == pytest.approx(cov[0, 1] / cov[1, 1])
+    assert correlation == pytest.approx(stock.corr(bench))
+
+
+@pytest.mark.parametrize("stock, bench", [
+    (daily_returns([0.01, -0.02] * 5), daily_returns([0.01, -0.01] * 5)),   # 10 days of overlap
+    (daily_returns([0.01, -0.02] * 30), daily_returns([0.0] * 60)),         # flat benchmark
+    (daily_returns([0.01] * 60), daily_returns([0.01, -0.01] * 30, start="2030-01-01")),  # no overlap
+])
+def test_compute_beta_is_missing_without_an_estimate(stock, bench):
+    assert compute_beta(stock, bench) == (None, None)
+
+
+def test_risk_score_without_beta_assumes_no_market_beta():
+    with_beta = compute_risk_score(0.3, 1.0, 100000)
+    without = compute_risk_score(0.3, None, 100000)
+    assert with_beta - without == pytest.approx(3.0)
+
+
+def test_stock_metrics_report_missing_beta_when_benchmark_fails(monkeypatch):
+    returns = daily_returns(np.random.default_rng(1).normal(0, 0.01, 60))
+
+    async def fetch(ticker, period, interval):
+        return history_for(returns)
+
+    async def benchmark(symbol, period="1y"):
+        raise ConnectionError("yahoo down")
+
+    monkeypatch.setattr(risk_service, "fetch_stock_data_async", fetch)
+    monkeypatch.setattr(risk_service, "get_benchmark_returns_async", benchmark)
+    metrics = asyncio.run(risk_service.get_stock_metrics("ABC"))
+    assert metrics["beta"] is None and metrics["correlation"] is None
+    assert metrics["volatility"] > 0
+
+
+def test_benchmark_cache_is_keyed_by_period(monkeypatch):
+    fetched = []
+
+    def fetch(symbol, period, interval):
+        fetched.append(period)
+        days = {"1y": 252, "5y": 1260}[period]
+        return pd.DataFrame({"Close": np.linspace(100, 120, days)}, index=pd.bdate_range("2020-01-01", periods=days))
+
+    monkeypatch.setattr(yfinance_service, "fetch_stock_data_sync", fetch)
+    monkeypatch.setattr(yfinance_service, "_benchmark_cache", {})
+    one_year = yfinance_service.get_benchmark_returns_sync("SPY")
+    five_years = asyncio.run(yfinance_service.get_benchmark_returns_async("SPY", period="5y"))
+    assert len(one_year) == 251 and len(five_years) == 1259
+    assert yfinance_service.get_benchmark_returns_sync("SPY", "5y") is five_years
+    assert fetched == ["1y", "5y"]
+
+
+def test_metrics_cache_is_bounded_lru_and_drops_expired(monkeypatch):
+    loads = []
+
+    async def load(ticker):
+        loads.append(ticker)
+        return {"as_of": "2024-06-03", "ticker": ticker}, 0.0
+
+    monkeypatch.setattr(risk_service, "_load_metrics", load)
+    monkeypatch.setattr(risk_service, "_metrics_cache", risk_service.OrderedDict())
+    monkeypatch.setattr(risk_service, "METRICS_CACHE_SIZE", 3)
+
+    async def run(tickers):
+        for t in tickers:
+            await risk_service.get_cached_metrics(t)
+
+    asyncio.run(run(["AAA", "BBB", "CCC", "AAA", "DDD"]))
+    # BBB was least recently used when DDD arrived
+    assert list(risk_service._metrics_cache) == ["CCC", "AAA", "DDD"]
+    assert loads == ["AAA", "BBB", "CCC", "DDD"]
+
+    async def failing_load(ticker):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(risk_service, "METRICS_CACHE_SECONDS", 0.0)
+    monkeypatch.setattr(risk_service, "_load_metrics", failing_load)
+    with pytest.raises(RuntimeError):
+        asyncio.run(run(["CCC"]))
+    assert "CCC" not in risk_service._metrics_cache
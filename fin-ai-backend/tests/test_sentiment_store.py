@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.services import sentiment_store
+
+
+class FrozenDatetime(datetime):
+    """23:30 UTC on June 3rd: still June 3rd in UTC, already June 4th east of it."""
+
+    @classmethod
+    def now(cls, tz=None):
+        moment = datetime(2024, 6, 3, 23, 30, tzinfo=timezone.utc)
+        return moment.astimezone(tz) if tz else moment.astimezone().replace(tzinfo=None)
+
+
+class RecordingCollection:
+    def __init__(self, result):
+        self.result = result
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        result = self.result
+
+        class Cursor:
+            async def to_list(self, length):
+                return result
+
+        return Cursor()
+
+
+def test_latest_sentiment_window_uses_utc_days(monkeypatch):
+    collection = RecordingCollection([{"_id": "2024-06-03", "score_sum": 1.5, "count": 3}])
+    monkeypatch.setattr(sentiment_store, "datetime", FrozenDatetime)
+    monkeypatch.setattr(sentiment_store, "headline_sentiment_collection", collection)
+    monkeypatch.setattr(sentiment_store, "_configured_symbols", {"AAPL"})
+    monkeypatch.setattr(sentiment_store, "MAX_STALENESS_DAYS", 2)
+
+    assert asyncio.run(sentiment_store.get_latest_sentiment("aapl")) == 0.5
+    match = collection.pipelines[0][0]["$match"]
+    assert match == {"symbol": "AAPL", "date": {"$gte": "2024-06-01", "$lte": "2024-06-03"}}
@@ -0,0 +1,63 @@
+import pytest
+
+from app.services.symbol_index import COMPANY_NAMES, EXTRA_TICKERS, SymbolIndex, build_symbol_index
+from app.services.universe_service import DEFAULT_UNIVERSE
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SymbolIndex(DEFAULT_UNIVERSE + EXTRA_TICKERS, COMPANY_NAMES)
+
+
+@pytest.mark.parametrize("message", [
+    "WHAT IS THE COST OF INVESTING?",
+    "I'M A BEGINNER AND I NEED A TEAM",
+    "HOW DO I SPOT A SCAM?",
+    "SHOULD I DASH TO BUY BONDS OR WAIT?",
+    "MY KIDS ARE IN THE HOOD ON A SNOW DAY",
+    "IS THE MARKET A RIOT RIGHT NOW? I'M ON PINS AND NEEDLES",
+    "WHAT IS THE SPOT PRICE OF GOLD AND THE COST PRICE OF MY FUND?",
+    "IT IS ALL GO FOR MY SIP",
+])
+def test_word_like_tickers_need_a_cue(index, message):
+    assert index.extract(message) == []
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Should I buy COST?", ["COST"]),
+    ("How is TEAM stock doing this week?", ["TEAM"]),
+    ("I hold shares of HOOD and AAPL", ["HOOD", "AAPL"]),
+    ("What's the price of SNOW?", ["SNOW"]),
+    ("RIOT earnings next week", ["RIOT"]),
+    ("Compare $SPOT and $PINS", ["SPOT", "PINS"]),
+    ("My position in DASH is down", ["DASH"]),
+    ("Is costco a good buy?", ["COST"]),
+])
+def test_word_like_tickers_with_cue_or_dollar(index, message, expected):
+    assert index.extract(message) == expected
+
+
+def test_plain_tickers_and_names_need_no_cue(index):
+    assert index.extract("NVDA or AMD or microsoft?") == ["NVDA", "AMD", "MSFT"]
+    assert index.extract("thoughts on the metadata of apple") == ["AAPL"]
+    # Lowercase words are never tickers, cue or not
+    assert index.extract("the cost of a team") == []
+
+
+def test_every_word_like_default_ticker_is_guarded(index):
+    for ticker in ["COST", "TEAM", "SPOT", "DASH", "PINS", "RIOT", "HUM", "SNOW", "HOOD"]:
+        assert index.extract(f"I LIKE THE {ticker} HERE") == [], ticker
+        assert index.extract(f"I LIKE ${ticker} HERE") == [ticker]
+
+
+def test_wordlist_file_guards_custom_universe_tickers(tmp_path, monkeypatch):
+    universe = tmp_path / "universe.txt"
+    universe.write_text("AAPL\nFUN\nJOB\n")
+    words = tmp_path / "words"
+    words.write_text("fun\njob\napple\n")
+    monkeypatch.setenv("RISK_UNIVERSE_FILE", str(universe))
+    monkeypatch.setenv("SYMBOL_WORDLIST_FILE", str(words))
+
+    index = build_symbol_index()
+    assert index.extract("IS INVESTING FUN? I LOST MY JOB") == []
+    assert index.extract("BUY FUN AND AAPL") == ["FUN", "AAPL"]
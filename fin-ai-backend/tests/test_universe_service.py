@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from app.services import universe_service
+from app.services.correlation_service import RollingCorrelation
+
+TICKERS = ["AAA", "BBB", "CCC"]
+
+
+def make_closes(days: int = 200) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    returns = rng.normal(0, 0.01, size=(days, len(TICKERS)))
+    return pd.DataFrame(
+        100 * np.cumprod(1 + returns, axis=0),
+        index=pd.bdate_range("2024-01-01", periods=days),
+        columns=TICKERS,
+    )
+
+
+def test_advance_correlation_publishes_only_synced_trackers(monkeypatch):
+    published_during_sync = []
+
+    class CheckingCorrelation(RollingCorrelation):
+        def sync(self, returns):
+            published_during_sync.append(universe_service.get_correlation_tracker() is self)
+            return super().sync(returns)
+
+    monkeypatch.setattr(universe_service, "RollingCorrelation", CheckingCorrelation)
+    monkeypatch.setattr(universe_service, "_correlation", None)
+    closes = make_closes()
+
+    universe_service._advance_correlation(closes.iloc[:100], TICKERS)
+    first = universe_service.get_correlation_tracker()
+    assert first is not None and first.last_date == closes.index[99]
+    first_corr = first.correlations_for("AAA")
+
+    universe_service._advance_correlation(closes.iloc[:150], TICKERS)
+    second = universe_service.get_correlation_tracker()
+
+    # A new tracker was swapped in; the one readers already held is untouched
+    assert second is not first
+    assert second.last_date == closes.index[149]
+    assert first.last_date == closes.index[99]
+    pd.testing.assert_series_equal(first.correlations_for("AAA"), first_corr)
+    assert published_during_sync == [False, False]
+
+
+def test_advance_correlation_starts_over_when_tickers_change(monkeypatch):
+    monkeypatch.setattr(universe_service, "_correlation", None)
+    closes = make_closes()
+    universe_service._advance_correlation(closes, TICKERS)
+    universe_service._advance_correlation(closes, TICKERS[:2])
+    assert universe_service.get_correlation_tracker().tickers == TICKERS[:2]
@@ -1,18 +1,33 @@
 import os
+import json
 import joblib
 import numpy as np
 import pandas as pd
 import yfinance as yf
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, date
 from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from scipy.special import softmax
 import warnings
 warnings.filterwarnings('ignore')
 
+from app.services.model_registry import publish_model
+from training_data import (
+    FEATURE_COLUMNS,
+    CACHE_DIR,
+    PREP_WORKERS,
+    calculate_technical_indicators,
+    cache_path,
+    load_sentiment_history,
+    join_sentiment_point_in_time,
+    prepare_symbol_features,
+    save_training_matrix,
+    time_ordered_split,
+)
+
 class StockPredictor:
     """
     Advanced Stock Predictor using Hugging Face FinBERT and real-time data
@@ -29,6 +44,8 @@ class StockPredictor:
         # Technical indicator model (to be trained)
         self.technical_model = None
         self.scaler = StandardScaler()
+        # {'train_end', 'test_start'} of the last fit, published as registry metadata
+        self.training_window = None
         
         print("FinBERT loaded successfully!")
     
@@ -57,103 +74,79 @@ class StockPredictor:
             print(f"Sentiment analysis error: {e}")
             return 0.0
     
+    def get_sentiment_scores(self, texts, batch_size=16):
+        """
+        Batched FinBERT scoring; returns one score in [-1, 1] per text
+        """
+        scores = []
+        texts = [t if t and t.strip() else '' for t in texts]
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            try:
+                inputs = self.sentiment_tokenizer(batch, return_tensors="pt", truncation=True, max_length=512, padding=True)
+                with torch.no_grad():
+                    logits = self.sentiment_model(**inputs).logits.detach().numpy()
+                probs = softmax(logits, axis=1)
+                batch_scores = probs[:, 2] - probs[:, 0]
+                scores.extend(0.0 if not t else float(s) for t, s in zip(batch, batch_scores))
+            except Exception as e:
+                print(f"Sentiment analysis error: {e}")
+                scores.extend(0.0 for _ in batch)
+        return scores
+    
     def calculate_technical_indicators(self, df):
         """
         Calculate technical indicators from price data
         """
-        # Returns
-        df['Returns'] = df['Close'].pct_change()
-        
-        # Moving averages
-        df['SMA_5'] = df['Close'].rolling(window=5).mean()
-        df['SMA_10'] = df['Close'].rolling(window=10).mean()
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        
-        # Exponential moving averages
-        df['EMA_5'] = df['Close'].ewm(span=5, adjust=False).mean()
-        df['EMA_20'] = df['Close'].ewm(span=20, adjust=False).mean()
-        
-        # Volatility
-        df['Volatility'] = df['Returns'].rolling(window=20).std()
-        
-        # RSI (Relative Strength Index)
-        delta = df['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        
-        # Bollinger Bands
-        df['BB_Middle'] = df['Close'].rolling(window=20).mean()
-        bb_std = df['Close'].rolling(window=20).std()
-        df['BB_Upper'] = df['BB_Middle'] + (bb_std * 2)
-        df['BB_Lower'] = df['BB_Middle'] - (bb_std * 2)
-        df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle']
-        
-        # Volume indicators
-        df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
-        df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
-        
-        # Price momentum
-        df['Momentum'] = df['Close'] - df['Close'].shift(10)
-        
-        # Rate of Change
-        df['ROC'] = ((df['Close'] - df['Close'].shift(10)) / df['Close'].shift(10)) * 100
-        
-        return df
+        return calculate_technical_indicators(df)
     
-    def fetch_and_prepare_data(self, symbols, period='2y'):
+    def fetch_and_prepare_data(self, symbols, period='2y', cache_dir=CACHE_DIR, workers=PREP_WORKERS):
         """
-        Fetch data for multiple symbols and prepare training dataset
+        Fetch data for multiple symbols and prepare training dataset.
+        Downloads and indicators run in a process pool; both are cached on disk
+        per symbol and date range, so reruns on the same day only redo sentiment.
         """
         all_data = []
-        
-        for symbol in symbols:
-            print(f"Fetching data for {symbol}...")
-            try:
-                stock = yf.Ticker(symbol)
-                df = stock.history(period=period)
-                
-                if df.empty:
-                    continue
-                
-                # Calculate technical indicators
-                df = self.calculate_technical_indicators(df)
-                
-                # Get recent news and sentiment
-                try:
-                    news = stock.news[:5]  # Last 5 news items
-                    sentiments = []
-                    
-                    for item in news:
-                        title = item.get('title', '')
-                        summary = item.get('summary', '')
-                        text = f"{title}. {summary}"
-                        sentiment = self.get_sentiment_score(text)
-                        sentiments.append(sentiment)
-                    
-                    avg_sentiment = np.mean(sentiments) if sentiments else 0.0
-                    df['News_Sentiment'] = avg_sentiment
-                    
-                except:
-                    df['News_Sentiment'] = 0.0
-                
-                # Create target: 1 if next 5 days average return > 0, 0 otherwise
-                df['Future_Returns'] = df['Close'].shift(-5) / df['Close'] - 1
-                df['Target'] = (df['Future_Returns'] > 0.01).astype(int)  # >1% gain
-                
-                df['Symbol'] = symbol
+        end_date = date.today().isoformat()
+        
+        print(f"Preparing {len(symbols)} symbols with {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                prepare_symbol_features,
+                symbols,
+                [period] * len(symbols),
+                [end_date] * len(symbols),
+                [cache_dir] * len(symbols),
+            ))
+        
+        sentiment_history = load_sentiment_history(symbols)
+        print(f"Point-in-time sentiment history for {len(sentiment_history)}/{len(symbols)} symbols")
+        
+        for symbol, df, texts in results:
+            if df is None or df.empty:
+                continue
+            df = df.copy()
+            
+            if symbol.upper() in sentiment_history:
+                # Join the daily sentiment store point-in-time
+                df['News_Sentiment'] = join_sentiment_point_in_time(df, sentiment_history[symbol.upper()])
                 all_data.append(df)
-                
-            except Exception as e:
-                print(f"Error fetching {symbol}: {e}")
                 continue
+            
+            # No stored history: fall back to today's headlines (cached alongside the features)
+            sentiment_path = cache_path(cache_dir, 'sentiment', symbol, period, end_date, 'json')
+            if os.path.exists(sentiment_path):
+                with open(sentiment_path) as f:
+                    avg_sentiment = json.load(f)['News_Sentiment']
+            else:
+                sentiments = self.get_sentiment_scores(texts)
+                avg_sentiment = float(np.mean(sentiments)) if sentiments else 0.0
+                os.makedirs(os.path.dirname(sentiment_path), exist_ok=True)
+                with open(sentiment_path, 'w') as f:
+                    json.dump({'News_Sentiment': avg_sentiment}, f)
+            
+            df['News_Sentiment'] = avg_sentiment
+            all_data.append(df)
         
         combined_df = pd.concat(all_data, ignore_index=False)
         combined_df = combined_df.dropna()
@@ -179,25 +172,26 @@ class StockPredictor:
         
         print(f"Total samples: {len(df)}")
         
-        # Select features
-        feature_columns = [
-            'Returns', 'SMA_5', 'SMA_10', 'SMA_20', 'EMA_5', 'EMA_20',
-            'Volatility', 'RSI', 'MACD', 'Signal_Line', 'BB_Width',
-            'Volume_Ratio', 'Momentum', 'ROC', 'News_Sentiment'
-        ]
+        # Select features (memory-mapped from the saved training matrix)
+        feature_columns = FEATURE_COLUMNS
+        matrix = save_training_matrix(df)
         
-        X = df[feature_columns].values
-        y = df['Target'].values
+        X = matrix['X']
+        y = matrix['y']
         
         print(f"\n2. Feature matrix shape: {X.shape}")
         print(f"   Positive samples: {np.sum(y)} ({np.mean(y)*100:.2f}%)")
         print(f"   Negative samples: {len(y) - np.sum(y)} ({(1-np.mean(y))*100:.2f}%)")
         
-        # Split data
+        # Split data (time-ordered; a random split leaks future rows into training)
         print("\n3. Splitting data...")
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        train_idx, test_idx = time_ordered_split(matrix['dates'])
+        self.training_window = {
+            'train_end': str(matrix['dates'][train_idx].max()),
+            'test_start': str(matrix['dates'][test_idx].min()),
+        }
+        X_train, X_test = X[train_idx], X[test_idx]
+        y_train, y_test = y[train_idx], y[test_idx]
         
         # Scale features
         print("\n4. Scaling features...")
@@ -245,16 +239,16 @@ class StockPredictor:
         model_data = {
             'technical_model': self.technical_model,
             'scaler': self.scaler,
-            'feature_columns': [
-                'Returns', 'SMA_5', 'SMA_10', 'SMA_20', 'EMA_5', 'EMA_20',
-                'Volatility', 'RSI', 'MACD', 'Signal_Line', 'BB_Width',
-                'Volume_Ratio', 'Momentum', 'ROC', 'News_Sentiment'
-            ]
+            'feature_columns': FEATURE_COLUMNS
         }
         
         joblib.dump(model_data, path)
         print(f"\n8. Model saved to: {path}")
         print(f"   File size: {os.path.getsize(path) / 1024:.2f} KB")
+        
+        # Publish to the registry; running API workers pick it up without a restart
+        version = publish_model(model_data, metadata=self.training_window)
+        print(f"   Published to model registry as {version}")
     
     def predict_realtime(self, symbol):
         """
@@ -0,0 +1,258 @@
+# Data preparation shared by train_hf_model.py and the offline evaluation scripts.
+# Kept free of torch/transformers so worker processes start quickly.
+import os
+import json
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FEATURE_COLUMNS = [
+    'Returns', 'SMA_5', 'SMA_10', 'SMA_20', 'EMA_5', 'EMA_20',
+    'Volatility', 'RSI', 'MACD', 'Signal_Line', 'BB_Width',
+    'Volume_Ratio', 'Momentum', 'ROC', 'News_Sentiment'
+]
+
+# On-disk caches so retraining does not re-download or recompute unchanged symbols
+CACHE_DIR = os.getenv("TRAINING_CACHE_DIR", "./data/cache")
+TRAINING_MATRIX_DIR = os.getenv("TRAINING_MATRIX_DIR", "./data/training_matrix")
+PREP_WORKERS = int(os.getenv("TRAINING_PREP_WORKERS", str(os.cpu_count() or 1)))
+
+# Target looks this many trading days ahead (see prepare_symbol_features)
+TARGET_HORIZON = 5
+
+
+def calculate_technical_indicators(df):
+    """
+    Calculate technical indicators from price data
+    """
+    # Returns
+    df['Returns'] = df['Close'].pct_change()
+    
+    # Moving averages
+    df['SMA_5'] = df['Close'].rolling(window=5).mean()
+    df['SMA_10'] = df['Close'].rolling(window=10).mean()
+    df['SMA_20'] = df['Close'].rolling(window=20).mean()
+    
+    # Exponential moving averages
+    df['EMA_5'] = df['Close'].ewm(span=5, adjust=False).mean()
+    df['EMA_20'] = df['Close'].ewm(span=20, adjust=False).mean()
+    
+    # Volatility
+    df['Volatility'] = df['Returns'].rolling(window=20).std()
+    
+    # RSI (Relative Strength Index)
+    delta = df['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    df['RSI'] = 100 - (100 / (1 + rs))
+    
+    # MACD
+    exp1 = df['Close'].ewm(span=12, adjust=False).mean()
+    exp2 = df['Close'].ewm(span=26, adjust=False).mean()
+    df['MACD'] = exp1 - exp2
+    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    
+    # Bollinger Bands
+    df['BB_Middle'] = df['Close'].rolling(window=20).mean()
+    bb_std = df['Close'].rolling(window=20).std()
+    df['BB_Upper'] = df['BB_Middle'] + (bb_std * 2)
+    df['BB_Lower'] = df['BB_Middle'] - (bb_std * 2)
+    df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle']
+    
+    # Volume indicators
+    df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
+    df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
+    
+    # Price momentum
+    df['Momentum'] = df['Close'] - df['Close'].shift(10)
+    
+    # Rate of Change
+    df['ROC'] = ((df['Close'] - df['Close'].shift(10)) / df['Close'].shift(10)) * 100
+    
+    return df
+
+
+def cache_path(cache_dir, kind, symbol, period, end_date, ext):
+    """Cache file for one symbol over one date range (period ending on end_date)."""
+    safe_symbol = symbol.replace('^', '_').replace('/', '_')
+    return os.path.join(cache_dir, kind, f"{safe_symbol}_{period}_{end_date}.{ext}")
+
+
+def fetch_raw_data(symbol, period, end_date, cache_dir=CACHE_DIR):
+    """
+    Download price history and recent headlines for a symbol, or load them from the disk cache
+    """
+    path = cache_path(cache_dir, 'raw', symbol, period, end_date, 'pkl')
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    
+    stock = yf.Ticker(symbol)
+    history = stock.history(period=period)
+    
+    texts = []
+    try:
+        for item in stock.news[:5]:  # Last 5 news items
+            title = item.get('title', '')
+            summary = item.get('summary', '')
+            texts.append(f"{title}. {summary}")
+    except Exception:
+        texts = []
+    
+    raw = {'history': history, 'news': texts}
+    if not history.empty:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pd.to_pickle(raw, path)
+    return raw
+
+
+def prepare_symbol_features(symbol, period, end_date, cache_dir=CACHE_DIR):
+    """
+    Worker entry point: fetch one symbol and compute its indicators and target.
+    Runs in a separate process, so it must not touch FinBERT. Returns
+    (symbol, feature frame or None, news texts).
+    """
+    try:
+        raw = fetch_raw_data(symbol, period, end_date, cache_dir)
+        
+        path = cache_path(cache_dir, 'features', symbol, period, end_date, 'pkl')
+        if os.path.exists(path):
+            return symbol, pd.read_pickle(path), raw['news']
+        
+        df = raw['history'].copy()
+        if df.empty:
+            return symbol, None, []
+        
+        # Exchange-local timestamps -> naive dates so symbols from different markets concat cleanly
+        if getattr(df.index, 'tz', None) is not None:
+            df.index = df.index.tz_localize(None)
+        
+        # Calculate technical indicators
+        df = calculate_technical_indicators(df)
+        
+        # Create target: 1 if next 5 days average return > 0, 0 otherwise
+        df['Future_Returns'] = df['Close'].shift(-TARGET_HORIZON) / df['Close'] - 1
+        df['Target'] = (df['Future_Returns'] > 0.01).astype(int)  # >1% gain
+        df['Symbol'] = symbol
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_pickle(path)
+        return symbol, df, raw['news']
+    
+    except Exception as e:
+        print(f"Error fetching {symbol}: {e}")
+        return symbol, None, []
+
+
+def load_sentiment_history(symbols):
+    """
+    Daily aggregated sentiment from the API's sentiment store (headline_sentiment collection).
+    Returns {symbol: Series of scores indexed by date}; {} if the store is not reachable.
+    """
+    uri = os.getenv("MONGODB_URI")
+    if not uri:
+        return {}
+    try:
+        from pymongo import MongoClient
+        client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+        collection = client[os.getenv("MONGO_DB_NAME", "Financial-AI-Authentication")]["headline_sentiment"]
+        rows = list(collection.aggregate([
+            {"$match": {"symbol": {"$in": [s.upper() for s in symbols]}}},
+            {"$group": {
+                "_id": {"symbol": "$symbol", "date": "$date"},
+                "score_sum": {"$sum": "$score"},
+                "count": {"$sum": 1},
+            }},
+            {"$project": {"_id": 0, "symbol": "$_id.symbol", "date": "$_id.date", "score_sum": 1, "count": 1}},
+        ]))
+        client.close()
+    except Exception as e:
+        print(f"Sentiment store unavailable, falling back to current headlines: {e}")
+        return {}
+    
+    if not rows:
+        return {}
+    frame = pd.DataFrame(rows)
+    frame['date'] = pd.to_datetime(frame['date'])
+    frame['score'] = frame['score_sum'] / frame['count']
+    return {
+        symbol: group.set_index('date')['score'].sort_index()
+        for symbol, group in frame.groupby('symbol')
+    }
+
+
+def join_sentiment_point_in_time(df, history, max_staleness_days=7):
+    """
+    News_Sentiment per row = latest stored daily score on or before that row's date,
+    so no row sees headlines published after it. 0.0 when nothing is recent enough.
+    """
+    left = pd.DataFrame({'date': pd.DatetimeIndex(df.index).normalize()})
+    right = pd.DataFrame({'date': history.index, 'score': history.values})
+    merged = pd.merge_asof(
+        left, right, on='date', direction='backward',
+        tolerance=pd.Timedelta(days=max_staleness_days)
+    )
+    return merged['score'].fillna(0.0).to_numpy()
+
+
+def save_training_matrix(df, out_dir=TRAINING_MATRIX_DIR):
+    """
+    Write the final training matrix as .npy files and return them memory-mapped.
+    Rows keep the order of df: grouped by symbol, dates ascending within each symbol.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    symbols = sorted(df['Symbol'].unique())
+    symbol_index = {s: i for i, s in enumerate(symbols)}
+    
+    X = np.lib.format.open_memmap(
+        os.path.join(out_dir, 'X.npy'), mode='w+', dtype=np.float64,
+        shape=(len(df), len(FEATURE_COLUMNS))
+    )
+    X[:] = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    X.flush()
+    del X
+    
+    dates = pd.DatetimeIndex(df.index).values.astype('datetime64[D]')
+    np.save(os.path.join(out_dir, 'y.npy'), df['Target'].to_numpy(dtype=np.int8))
+    np.save(os.path.join(out_dir, 'dates.npy'), dates)
+    np.save(os.path.join(out_dir, 'symbol_ids.npy'), df['Symbol'].map(symbol_index).to_numpy(dtype=np.int32))
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump({'symbols': symbols, 'feature_columns': FEATURE_COLUMNS, 'rows': len(df)}, f)
+    
+    return load_training_matrix(out_dir)
+
+
+def load_training_matrix(out_dir=TRAINING_MATRIX_DIR):
+    """
+    Memory-map a training matrix written by save_training_matrix.
+    Returns a dict with X, y, dates, symbol_ids and the meta information.
+    """
+    with open(os.path.join(out_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    return {
+        'X': np.load(os.path.join(out_dir, 'X.npy'), mmap_mode='r'),
+        'y': np.load(os.path.join(out_dir, 'y.npy'), mmap_mode='r'),
+        'dates': np.load(os.path.join(out_dir, 'dates.npy'), mmap_mode='r'),
+        'symbol_ids': np.load(os.path.join(out_dir, 'symbol_ids.npy'), mmap_mode='r'),
+        'symbols': meta['symbols'],
+        'feature_columns': meta['feature_columns'],
+    }
+
+
+def time_ordered_split(dates, test_size=0.2, embargo=TARGET_HORIZON):
+    """
+    Chronological train/test split across all symbols.
+    Returns (train_idx, test_idx). The last `embargo` trading days before the
+    test period are dropped from training because their targets overlap it.
+    """
+    unique_dates = np.unique(dates)
+    cut = int(len(unique_dates) * (1 - test_size))
+    test_start = unique_dates[cut]
+    train_end = unique_dates[max(cut - embargo, 0)]
+    
+    train_idx = np.flatnonzero(dates < train_end)
+    test_idx = np.flatnonzero(dates >= test_start)
+    return train_idx, test_idx
@@ -0,0 +1,171 @@
+import os
+import argparse
+import itertools
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, precision_score, roc_auc_score
+
+from training_data import TRAINING_MATRIX_DIR, TARGET_HORIZON, load_training_matrix
+
+# Baseline configuration used by StockPredictor.train_model
+BASE_PARAMS = {
+    'n_estimators': 200,
+    'learning_rate': 0.1,
+    'max_depth': 5,
+    'min_samples_split': 50,
+    'min_samples_leaf': 20,
+    'subsample': 0.8,
+    'random_state': 42,
+}
+
+DEFAULT_GRID = {
+    'n_estimators': [100, 200, 400],
+    'learning_rate': [0.03, 0.1],
+    'max_depth': [3, 5],
+    'min_samples_leaf': [20, 50],
+}
+
+
+def build_param_grid(grid=None):
+    """
+    Expand a {param: [values]} grid into a list of full GradientBoosting configs
+    """
+    grid = grid or DEFAULT_GRID
+    keys = list(grid)
+    configs = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(BASE_PARAMS)
+        params.update(zip(keys, values))
+        configs.append(params)
+    return configs
+
+
+def build_walk_forward_folds(dates, n_folds=5, min_train_fraction=0.4, embargo=TARGET_HORIZON):
+    """
+    Expanding-window folds over the trading calendar shared by all symbols.
+    Each fold trains on every row before its test block (minus an embargo of
+    `embargo` trading days whose targets overlap the test block) and tests on
+    the next block. Returns a list of (train_idx, test_idx) index arrays.
+    """
+    unique_dates = np.unique(dates)
+    first_test = int(len(unique_dates) * min_train_fraction)
+    edges = np.linspace(first_test, len(unique_dates), n_folds + 1).astype(int)
+
+    folds = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        train_end = unique_dates[max(start - embargo, 0)]
+        test_start = unique_dates[start]
+        test_stop = unique_dates[end] if end < len(unique_dates) else None
+
+        train_idx = np.flatnonzero(dates < train_end)
+        if test_stop is None:
+            test_idx = np.flatnonzero(dates >= test_start)
+        else:
+            test_idx = np.flatnonzero((dates >= test_start) & (dates < test_stop))
+        if len(train_idx) and len(test_idx):
+            folds.append((train_idx, test_idx))
+    return folds
+
+
+def evaluate_fold(matrix_dir, params, train_idx, test_idx):
+    """
+    Train and score one (config, fold) pair. Runs in a worker process; the
+    training matrix is memory-mapped, so workers share its pages instead of
+    each receiving a copy.
+    """
+    matrix = load_training_matrix(matrix_dir)
+    X, y = matrix['X'], matrix['y']
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_test, y_test = X[test_idx], y[test_idx]
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    model = GradientBoostingClassifier(**params)
+    model.fit(X_train_scaled, y_train)
+
+    proba = model.predict_proba(X_test_scaled)[:, 1]
+    pred = (proba > 0.5).astype(int)
+    try:
+        auc = roc_auc_score(y_test, proba)
+    except ValueError:
+        # Only one class present in this test block
+        auc = float('nan')
+
+    return {
+        'accuracy': float(accuracy_score(y_test, pred)),
+        'precision': float(precision_score(y_test, pred, zero_division=0)),
+        'roc_auc': float(auc),
+        'test_rows': int(len(test_idx)),
+    }
+
+
+def run_walk_forward(matrix_dir=TRAINING_MATRIX_DIR, configs=None, n_folds=5, n_jobs=-1):
+    """
+    Evaluate every config on every walk-forward fold in parallel.
+    Returns one summary per config, best mean ROC AUC first.
+    """
+    configs = configs or [dict(BASE_PARAMS)]
+    matrix = load_training_matrix(matrix_dir)
+    folds = build_walk_forward_folds(np.asarray(matrix['dates']), n_folds=n_folds)
+    if not folds:
+        raise ValueError("Not enough history to build walk-forward folds")
+
+    print(f"Evaluating {len(configs)} configs x {len(folds)} folds "
+          f"on {matrix['X'].shape[0]} rows ({len(matrix['symbols'])} symbols)...")
+
+    tasks = [(c, f) for c in range(len(configs)) for f in range(len(folds))]
+    scores = Parallel(n_jobs=n_jobs, verbose=5)(
+        delayed(evaluate_fold)(matrix_dir, configs[c], *folds[f]) for c, f in tasks
+    )
+
+    summaries = []
+    for c, params in enumerate(configs):
+        fold_scores = [s for (tc, _), s in zip(tasks, scores) if tc == c]
+        summaries.append({
+            'params': params,
+            'folds': fold_scores,
+            'mean_accuracy': float(np.mean([s['accuracy'] for s in fold_scores])),
+            'mean_precision': float(np.mean([s['precision'] for s in fold_scores])),
+            'mean_roc_auc': float(np.nanmean([s['roc_auc'] for s in fold_scores])),
+        })
+
+    summaries.sort(key=lambda s: -np.nan_to_num(s['mean_roc_auc'], nan=-1.0))
+    return summaries
+
+
+def main():
+    """
+    Walk-forward model selection over the saved training matrix
+    """
+    parser = argparse.ArgumentParser(description="Walk-forward evaluation of the stock prediction model")
+    parser.add_argument('--matrix-dir', default=TRAINING_MATRIX_DIR)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=-1, help="Parallel workers (-1 = all cores)")
+    parser.add_argument('--baseline-only', action='store_true', help="Evaluate only the current training config")
+    parser.add_argument('--top', type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.matrix_dir, 'meta.json')):
+        print(f"No training matrix in {args.matrix_dir}; run train_hf_model.py first.")
+        return
+
+    configs = [dict(BASE_PARAMS)] if args.baseline_only else build_param_grid()
+    summaries = run_walk_forward(args.matrix_dir, configs, n_folds=args.folds, n_jobs=args.jobs)
+
+    print("\n" + "="*60)
+    print("WALK-FORWARD RESULTS")
+    print("="*60)
+    for rank, s in enumerate(summaries[:args.top], start=1):
+        tuned = {k: v for k, v in s['params'].items() if k in DEFAULT_GRID}
+        print(f"{rank}. AUC {s['mean_roc_auc']:.4f}  acc {s['mean_accuracy']*100:.2f}%  "
+              f"prec {s['mean_precision']*100:.2f}%  {tuned}")
+
+
+if __name__ == "__main__":
+    main()